@@ -1,5 +1,9 @@
-from ._kdtree import KDTree
+from ._kdtree import KDTree, KDTreeConfig
+from ._vptree import VPTree
+from ._window import WindowedKDTree
+from ._sharded import ShardedKDTree
+from ._profiling import Tracer
 from . import _utils
 from ._kdtree_type import KDTreeType
 
-__all__ = ['KDTree', '_utils', 'KDTreeType']
+__all__ = ['KDTree', 'KDTreeConfig', 'VPTree', 'WindowedKDTree', 'ShardedKDTree', 'Tracer', '_utils', 'KDTreeType']
@@ -0,0 +1,167 @@
+# coding=utf-8
+
+"""Kernel Density Estimation over KDTrees"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import heapq
+import itertools
+import numpy as np
+
+from . import _utils as utils
+
+def kernel_density(tree, points, bandwidth, kernel='gaussian', atol=0.0, rtol=0.0):
+	"""
+	Estimate the kernel density of `tree` at each of `points`,
+	weighting its points if it keeps weights.
+	See `KDTree.kernel_density`.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree of the points of the density.
+
+	points : array-like, shape (n_points, k)
+		The query points, where the last axis denotes the features.
+
+	bandwidth : float
+		Bandwidth of the kernel.
+
+	kernel : {'gaussian', 'tophat', 'epanechnikov', 'exponential', 'linear'}, default='gaussian'
+		The kernel to estimate the density with.
+
+	atol : float, default=0.0
+		Absolute tolerance of the estimated densities.
+
+	rtol : float, default=0.0
+		Relative tolerance of the estimated densities.
+
+	Returns
+	-------
+	density : ndarray, shape (n_points,)
+		The estimated density at each of `points`.
+	"""
+	if tree.config.accept is not None:
+		raise ValueError("Kernel density cannot be estimated if accept is used")
+	if bandwidth <= 0:
+		raise ValueError("Bandwidth must be positive")
+	if kernel not in utils.KERNELS:
+		raise ValueError("Kernel must be one of " + str(utils.KERNELS))
+	if atol < 0 or rtol < 0:
+		raise ValueError("Tolerances must be non-negative")
+	points = np.asarray(points, dtype=np.float64)
+	if points.ndim != 2 or tree.config.k != utils.check_dimensionality(points):
+		raise ValueError("Points must be same dimensionality as the KDTree")
+	if tree.weight_sum == 0:
+		raise ValueError("Weights of the KDTree must not all be zero")
+	norm = utils.kernel_norm(tree.config.k, bandwidth, kernel) / tree.weight_sum
+	estimate = _KernelSum(bandwidth, kernel, atol / norm, rtol)
+	density = np.empty(len(points))
+	for i, point in enumerate(points):
+		density[i] = estimate.total(tree, point)
+	return density * norm
+
+class _KernelSum:
+	"""
+	Best-first refinement of the sum of a kernel over the points
+	of a KDTree, weighted by their weights, within a tolerance.
+
+	Parameters
+	----------
+	bandwidth : float
+		Bandwidth of the kernel.
+
+	kernel : str
+		The kernel to sum.
+
+	atol : float
+		Absolute tolerance of the kernel sum.
+
+	rtol : float
+		Relative tolerance of the kernel sum.
+	"""
+	__slots__ = ('bandwidth', 'kernel', 'atol', 'rtol')
+
+	def __init__(self, bandwidth, kernel, atol, rtol):
+		self.bandwidth = bandwidth
+		self.kernel = kernel
+		self.atol = atol
+		self.rtol = rtol
+
+	def total(self, tree, point):
+		"""
+		Sum the kernel at `point` over the points of `tree`.
+
+		Subtrees are refined starting from those whose bounds are
+		loosest, until the bounds on the sum are within the tolerance.
+		Remaining subtrees are approximated as if their points lay
+		at their centroid.
+
+		Parameters
+		----------
+		tree : KDTree
+			The KDTree of the points to sum over.
+
+		point : ndarray
+			The query point, where the last axis denotes the features.
+
+		Returns
+		-------
+		total : float
+			The sum of the kernel over the points of `tree`.
+		"""
+		total = 0.0
+		lower, upper = self.bounds(tree, point)
+		heap, counter = [(lower - upper, 0, tree, lower, upper)], itertools.count(1)
+		while heap and upper - lower > self.atol + self.rtol * lower:
+			_, _, node, node_lower, node_upper = heapq.heappop(heap)
+			value = float(utils.kernel(np.linalg.norm(point - node.coords), self.bandwidth, self.kernel))
+			if node.weight is not None:
+				value *= node.weight
+			total += value
+			lower += value - node_lower
+			upper += value - node_upper
+			for child in (node.right, node.left):
+				if child:
+					child_lower, child_upper = self.bounds(child, point)
+					lower += child_lower
+					upper += child_upper
+					if child_upper > child_lower:
+						heapq.heappush(heap, (child_lower - child_upper, next(counter),
+									child, child_lower, child_upper))
+					else:
+						total += child_lower
+		# The centroid lies within the bounding box, so the kernel
+		# at the centroid is bounded as well.
+		for _, _, node, _, _ in heap:
+			dist = np.linalg.norm(point - node.centroid)
+			total += node.weight_sum * float(utils.kernel(dist, self.bandwidth, self.kernel))
+		return total
+
+	def bounds(self, tree, point):
+		"""
+		Bound the sum of the kernel over the points of `tree`
+		from the distances between `point` and its bounding box.
+
+		Parameters
+		----------
+		tree : KDTree
+			The KDTree of the points to bound.
+
+		point : ndarray
+			The query point, where the last axis denotes the features.
+
+		Returns
+		-------
+		lower : float
+			Lower bound of the sum of the kernel.
+
+		upper : float
+			Upper bound of the sum of the kernel.
+		"""
+		near, far = utils.box_distances(point, point, tree.lower, tree.upper)
+		weight_sum = tree.weight_sum
+		lower = weight_sum * float(utils.kernel(far, self.bandwidth, self.kernel))
+		upper = weight_sum * float(utils.kernel(near, self.bandwidth, self.kernel))
+		return lower, upper
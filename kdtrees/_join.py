@@ -0,0 +1,308 @@
+# coding=utf-8
+
+"""Dual-Tree Joins of KDTrees"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import heapq
+import numpy as np
+
+from . import _utils as utils
+from ._pairs import PairBlocks, children, row_offsets
+
+def query_tree(tree, other, d, return_distance=False):
+	"""
+	Determine all pairs of points, one from `tree` and one
+	from `other`, that are within `d` distance of each other.
+	See `KDTree.query_tree`.
+
+	Parameters
+	----------
+	tree : KDTree
+		The first KDTree of the join.
+
+	other : KDTree
+		The KDTree to join with.
+
+	d : float
+		The maximum acceptable distance between paired points.
+
+	return_distance : bool, default=False
+		Return the distances between paired points.
+
+	Returns
+	-------
+	offsets : ndarray, shape (n_nodes + 1,)
+		Offsets into `indices` in compressed sparse row form.
+
+	indices : ndarray, shape (n_pairs,)
+		Positions of the points of `other` in each pair,
+		sorted within each row.
+
+	distances : ndarray, shape (n_pairs,)
+		Distances between the points of each pair.
+		Only returned if `return_distance` is True.
+	"""
+	check_join(tree, other)
+	if d < 0:
+		raise ValueError("Distance must be non-negative")
+	join = _RangeJoin(d)
+	join.join((tree, 0), (other, 0))
+	rows, cols = join.blocks.expand()
+	if other is tree:
+		keep = rows != cols
+		rows, cols = rows[keep], cols[keep]
+	order = np.lexsort((cols, rows))
+	rows, cols = rows[order], cols[order]
+	offsets = row_offsets(rows, tree.nodes)
+	if return_distance:
+		diff = np.subtract(tree.to_array()[rows], other.to_array()[cols], dtype=np.float64)
+		return offsets, cols, np.linalg.norm(diff, axis=-1)
+	return offsets, cols
+
+def closest_pairs(tree, other, n=1):
+	"""
+	Determine the `n` closest pairs of points, one from `tree`
+	and one from `other`, and their distances.
+	See `KDTree.closest_pairs`.
+
+	Parameters
+	----------
+	tree : KDTree
+		The first KDTree of the join.
+
+	other : KDTree
+		The KDTree to join with.
+
+	n : int, default=1
+		The number of pairs to search for.
+
+	Returns
+	-------
+	rows : ndarray, shape (n_pairs,)
+		Positions of the points of `tree` in each pair.
+
+	cols : ndarray, shape (n_pairs,)
+		Positions of the points of `other` in each pair.
+
+	distances : ndarray, shape (n_pairs,)
+		Distances between the points of each pair, sorted
+		based on proximity.
+	"""
+	check_join(tree, other)
+	if n < 1:
+		raise ValueError("Number of pairs must be positive")
+	join = _ClosestJoin(n, other is tree)
+	join.join((tree, 0), (other, 0))
+	pairs = sorted((-dist, i, j) for dist, i, j in join.heap)
+	rows = np.asarray([i for _, i, _ in pairs], dtype=np.intp)
+	cols = np.asarray([j for _, _, j in pairs], dtype=np.intp)
+	return rows, cols, np.asarray([dist for dist, _, _ in pairs], dtype=np.float64)
+
+def check_join(tree, other):
+	"""
+	Validate `other` as the second KDTree of a join.
+
+	Parameters
+	----------
+	tree : KDTree
+		The first KDTree of the join.
+
+	other : KDTree
+		The KDTree to join with.
+	"""
+	if not isinstance(other, type(tree)):
+		raise ValueError("Other must be a KDTree")
+	if tree.config.accept is not None or other.config.accept is not None:
+		raise ValueError("KDTrees cannot be joined if accept is used")
+	if tree.config.k != other.config.k:
+		raise ValueError("Other must be same dimensionality as the KDTree")
+
+class _RangeJoin:
+	"""
+	Dual-tree traversal of `query_tree`, pairing points within
+	`d` distance. KDTree nodes are passed with their positions
+	in the order given by `collect` of their root KDTree.
+
+	Parameters
+	----------
+	d : float
+		The maximum acceptable distance between paired points.
+
+	Attributes
+	----------
+	blocks : PairBlocks
+		Blocks of pairs found so far.
+	"""
+	__slots__ = ('d', 'blocks')
+
+	def __init__(self, d):
+		self.d = d
+		self.blocks = PairBlocks()
+
+	def join(self, node, other):
+		"""
+		Pair the points of two KDTrees within `d` distance.
+
+		Parameters
+		----------
+		node : tuple
+			A KDTree of the first KDTree of the join and its position.
+
+		other : tuple
+			A KDTree of the second KDTree of the join and its position.
+		"""
+		(tree, offset), (other_tree, other_offset) = node, other
+		near, far = utils.box_distances(tree.lower, tree.upper, other_tree.lower, other_tree.upper)
+		if near > self.d:
+			return
+		elif far <= self.d:
+			self.blocks.add(offset, tree.nodes, other_offset, other_tree.nodes)
+			return
+		# Split the larger subtree into its own point and its children.
+		if tree.nodes >= other_tree.nodes:
+			self.pair_point(tree.coords, offset, other, False)
+			for child in children(node):
+				self.join(child, other)
+		else:
+			self.pair_point(other_tree.coords, other_offset, node, True)
+			for child in children(other):
+				self.join(node, child)
+
+	def pair_point(self, point, position, node, transpose):
+		"""
+		Pair a single point with the points of a KDTree within `d` distance.
+
+		Parameters
+		----------
+		point : ndarray
+			The point to pair.
+
+		position : int
+			Position of `point` in the order given by `collect`
+			of its root KDTree.
+
+		node : tuple
+			The KDTree to pair `point` with and its position.
+
+		transpose : bool
+			True if `point` belongs to the second KDTree of the join.
+		"""
+		tree, offset = node
+		near, far = utils.box_distances(point, point, tree.lower, tree.upper)
+		if near > self.d:
+			return
+		elif far <= self.d:
+			self.blocks.add(position, 1, offset, tree.nodes, transpose)
+			return
+		if np.linalg.norm(np.subtract(point, tree.coords, dtype=np.float64)) <= self.d:
+			self.blocks.add(position, 1, offset, 1, transpose)
+		for child in children(node):
+			self.pair_point(point, position, child, transpose)
+
+class _ClosestJoin:
+	"""
+	Dual-tree traversal of `closest_pairs`, visiting nearer pairs
+	of subtrees first. KDTree nodes are passed with their positions
+	in the order given by `collect` of their root KDTree.
+
+	Parameters
+	----------
+	n : int
+		The number of pairs to search for.
+
+	same : bool
+		True if both KDTrees are the same KDTree, such that each
+		unordered pair is considered once.
+
+	Attributes
+	----------
+	heap : list
+		Heap of the `n` closest pairs found so far, as tuples of
+		the negated distance and the positions of the pair.
+	"""
+	__slots__ = ('n', 'same', 'heap')
+
+	def __init__(self, n, same):
+		self.n = n
+		self.same = same
+		self.heap = []
+
+	def pruned(self, near):
+		"""
+		Determine if pairs at least `near` apart cannot be
+		among the `n` closest pairs.
+
+		Parameters
+		----------
+		near : float
+			Lower bound of the distance of the pairs.
+
+		Returns
+		-------
+		pruned : bool
+			True if the pairs can be skipped.
+		"""
+		return len(self.heap) == self.n and near > -self.heap[0][0]
+
+	def join(self, node, other):
+		"""
+		Pair the points of two KDTrees, keeping the `n` closest pairs.
+
+		Parameters
+		----------
+		node : tuple
+			A KDTree of the first KDTree of the join and its position.
+
+		other : tuple
+			A KDTree of the second KDTree of the join and its position.
+		"""
+		(tree, offset), (other_tree, other_offset) = node, other
+		if self.pruned(utils.box_distances(tree.lower, tree.upper, other_tree.lower, other_tree.upper)[0]):
+			return
+		if tree.nodes >= other_tree.nodes:
+			self.pair_point(tree.coords, offset, other, False)
+			pairs = [(child, other) for child in children(node)]
+		else:
+			self.pair_point(other_tree.coords, other_offset, node, True)
+			pairs = [(node, child) for child in children(other)]
+		pairs.sort(key=lambda pair: utils.box_distances(pair[0][0].lower, pair[0][0].upper,
+					pair[1][0].lower, pair[1][0].upper)[0])
+		for pair in pairs:
+			self.join(*pair)
+
+	def pair_point(self, point, position, node, transpose):
+		"""
+		Pair a single point with the points of a KDTree,
+		keeping the `n` closest pairs.
+
+		Parameters
+		----------
+		point : ndarray
+			The point to pair.
+
+		position : int
+			Position of `point` in the order given by `collect`
+			of its root KDTree.
+
+		node : tuple
+			The KDTree to pair `point` with and its position.
+
+		transpose : bool
+			True if `point` belongs to the second KDTree of the join.
+		"""
+		tree, offset = node
+		if self.pruned(utils.box_distances(point, point, tree.lower, tree.upper)[0]):
+			return
+		i, j = (offset, position) if transpose else (position, offset)
+		if not self.same or i < j:
+			dist = np.linalg.norm(np.subtract(point, tree.coords, dtype=np.float64))
+			if len(self.heap) < self.n:
+				heapq.heappush(self.heap, (-dist, i, j))
+			elif dist < -self.heap[0][0]:
+				heapq.heapreplace(self.heap, (-dist, i, j))
+		nearest = sorted(children(node), key=lambda child: utils.box_distances(
+					point, point, child[0].lower, child[0].upper)[0])
+		for child in nearest:
+			self.pair_point(point, position, child, transpose)
@@ -5,8 +5,18 @@
 # Authors: Jeffrey Wang
 # License: BSD 3 clause
 
+import functools
+import heapq
+import itertools
 import numpy as np
+import threading
+from contextlib import contextmanager
 
+from . import _density as density
+from . import _join as join
+from . import _parallel as parallel
+from . import _radius as radius
+from . import _rebuilds as rebuilds
 from . import _utils as utils
 from ._kdtree_type import KDTreeType
 
@@ -31,8 +41,48 @@ class KDTree:
 	accept : KDTreeType or None
 		Override and allow custom types to be accepted.
 
+	dtype : data-type or None, default=None
+		Storage data-type of the points. None stores points
+		as given.
+
+	index : dict or None, default=None
+		Hash index of the KDTree mapping the key of each point,
+		from `_utils.point_key`, to its KDTree node. The node
+		registers itself in `index`.
+
+	split : {'round_robin', 'max_spread', 'sliding_midpoint'}, default='round_robin'
+		Rule used to choose the axis and point of discrimination
+		when the KDTree is rebuilt.
+
+	config : KDTreeConfig or None, default=None
+		Configuration shared by all KDTree nodes of the KDTree.
+		If given, `k`, `accept`, `dtype`, `index` and `split`
+		are ignored.
+
+	coords : ndarray or None, default=None
+		Numeric coordinates of `value` along each axis. If None,
+		they are `value` itself, or extracted from `value` with
+		`_utils.coordinates` if `accept` is used.
+
+	label : hashable or None, default=None
+		Label of `value`, kept if the KDTree keeps labels.
+
+	weight : float or None, default=None
+		Weight of `value`, kept if the KDTree keeps weights.
+
+	point_id : int or None, default=None
+		ID of `value`, by which masks refer to it. If None,
+		`value` takes the next ID of `config`.
+
 	Attributes
 	----------
+	coords : ndarray
+		Numeric coordinates of `value`, compared in place of
+		`value` to discriminate points during traversals.
+		Points of KDTrees without `accept` are their own coordinates,
+		at the storage data-type, and only KDTreeType points
+		keep a separate float64 copy.
+
 	left : KDTree
 		Left child of the KDTree.
 
@@ -42,17 +92,113 @@ class KDTree:
 	nodes : int
 		Number of nodes in the KDTree, including itself.
 
-	accept : KDTreeType or None
-		Override and allow a custom type to be accepted.
+	height : int
+		Number of KDTree nodes on the longest path from
+		the KDTree node to a leaf, including both.
+
+	path_length : int
+		Internal path length of the KDTree, the sum of the depths
+		of all KDTree nodes below the KDTree node.
+
+	config : KDTreeConfig
+		Configuration shared by all KDTree nodes of the KDTree,
+		through which `k`, `accept`, `dtype`, `index` and `split`
+		are read.
+
+	aggregates : ndarray, shape (3, k) or (3, k + 1) or None
+		Lower and upper corners of the bounding box of the points
+		in the KDTree and their sum, stacked in one array. If the
+		KDTree keeps weights, each point is weighted in the sum and
+		extended by its weight, so that the last column holds the
+		smallest and largest weights and the sum of the weights.
+		They are calculated when first read through `lower`, `upper`,
+		`total` and `weight_sum`, as by `kernel_density` and joins,
+		and discarded when the KDTree is modified. None until then,
+		if the KDTree node is a leaf, whose aggregates are its
+		coordinates, or if `accept` is used.
+
+	label_bits : int or None
+		Bitmask of the labels of the points in the KDTree, with
+		the bits of `config.labels`. None if the KDTree keeps no labels.
+
+	point_id : int
+		ID of `value`, which it keeps until it is deleted,
+		even as the KDTree is modified or rebuilt.
 	"""
-	def __init__(self, value, k=1, axis=0, accept=None):
+	SPLITS = ('round_robin', 'max_spread', 'sliding_midpoint')
+
+	__slots__ = ('value', 'coords', 'axis', 'left', 'right', 'nodes', 'height', 'path_length',
+				'aggregates', 'label', 'label_bits', 'weight', 'point_id', 'config')
+
+	def __init__(self, value, k=1, axis=0, accept=None, dtype=None, index=None, split='round_robin',
+				config=None, coords=None, label=None, weight=None, point_id=None):
+		if config is None:
+			config = KDTreeConfig(k=k, accept=accept, dtype=dtype, index=index, split=split)
+		if coords is None and config.accept is None:
+			coords = np.asarray(value)
+		elif coords is None:
+			coords = utils.coordinates(value, config.k, accept=config.accept)
 		self.value = value
-		self.k = k
+		self.coords = coords
 		self.axis = axis
 		self.left = None
 		self.right = None
 		self.nodes = 1
-		self.accept = accept
+		self.height = 1
+		self.path_length = 0
+		if point_id is None:
+			point_id = config.new_id()
+		self.label = label
+		self.weight = weight
+		self.point_id = point_id
+		self.config = config
+		self.aggregates = None
+		self._recalculate_labels()
+		if config.index is not None:
+			config.index[utils.point_key(value, accept=config.accept)] = self
+
+	@property
+	def k(self):
+		"""
+		Dimensionality of the KDTree.
+		"""
+		return self.config.k
+
+	@property
+	def accept(self):
+		"""
+		Custom type accepted by the KDTree, or None.
+		"""
+		return self.config.accept
+
+	@property
+	def dtype(self):
+		"""
+		Storage data-type of the points, or None.
+		"""
+		return self.config.dtype
+
+	@property
+	def index(self):
+		"""
+		Hash index shared by all KDTree nodes of the KDTree, or None.
+		"""
+		return self.config.index
+
+	@property
+	def split(self):
+		"""
+		Rule used to choose the axis and point of discrimination.
+		"""
+		return self.config.split
+
+	@property
+	def next_id(self):
+		"""
+		ID that the next point inserted takes, which is
+		the number of entries of masks over point IDs.
+		"""
+		return self.config.next_id
 
 	def visualize(self, depth=0):
 		"""
@@ -74,18 +220,30 @@ class KDTree:
 			print('\t' * (depth+1) + "None")
 
 	@staticmethod
-	def initialize(points, k=None, init_axis=0, accept=None):
+	def initialize(points, k=None, init_axis=0, accept=None, n_jobs=None, dtype=None, index=False,
+				split='round_robin', max_quality=None, background=None, labels=None, weights=None):
 		"""
 		Initialize a KDTree from a list of points by presorting `points`
 		by each of the axes of discrimination. Initialization attempts
 		balancing by selecting the median along each axis of discrimination
 		as the root.
 
+		The axis of discrimination is chosen according to `split`:
+		'round_robin' cycles through the axes starting at `init_axis`;
+		'max_spread' chooses the axis along which the points spread the most;
+		'sliding_midpoint' also chooses the axis of maximum spread, but
+		splits at the first point past the midpoint of that spread rather
+		than at the median. Each KDTree node keeps its own axis.
+		As sliding midpoint splits do not guarantee the secondary invariant,
+		subtrees rebuilt by `balance` use the 'max_spread' rule instead.
+
 		Parameters
 		----------
 		points : array-like, shape (n_points, *)
 			List of points to build a KDTree where the last axis denotes the features.
 			If `accept` is a KDTreeType, list can contain this type.
+			Equal points are kept once, as with `insert`. Each point
+			takes its position in `points` as its ID.
 
 		k : int or None, default=None
 			Dimensionality of the points. If None, `initialize` will self-detect.
@@ -96,6 +254,54 @@ class KDTree:
 		accept : KDTreeType or None
 			Override and allow a custom type to be accepted.
 
+		n_jobs : int or None, default=None
+			Number of processes used to build independent subtrees
+			concurrently. The top levels are built in this process and
+			the subtrees below them in worker processes, which receive
+			only the coordinates of the points.
+			None or 1 builds in this process; negative values count
+			back from the number of CPUs, such that -1 uses all CPUs.
+
+		dtype : data-type or None, default=None
+			Storage data-type of the points, such as float32.
+			Points inserted later are cast to `dtype`, while distances
+			accumulate in at least float32. Points that `dtype` cannot
+			represent, such as non-integral points for an integer `dtype`
+			or points beyond its range, raise a ValueError when stored
+			and match no point in `search`, `delete` and `update`.
+			Cannot be used with `accept`.
+
+		index : bool, default=False
+			Maintain a hash index beside the KDTree for constant-time
+			`search` and membership. If `accept` is used, it must
+			implement `__hash__` consistently with `__eq__`.
+
+		split : {'round_robin', 'max_spread', 'sliding_midpoint'}, default='round_robin'
+			Rule used to choose the axis and point of discrimination.
+
+		max_quality : float or None, default=None
+			Largest `quality` tolerated by `balance` before a subtree
+			is rebuilt, such as 1.5. None only enforces the secondary invariant.
+
+		background : int or None, default=None
+			Smallest number of nodes of a subtree that `balance` holds
+			only to `max_quality`, rebuilding it in a background thread
+			rather than immediately. Requires `max_quality`.
+			None rebuilds all subtrees immediately.
+
+		labels : array-like, shape (n_points,) or None, default=None
+			Hashable label of each point, such as a category or tenant,
+			kept on its KDTree node. Neighbor queries can then be
+			restricted to points with given labels, skipping subtrees
+			that hold none of them. Equal points keep the label of
+			their first occurrence. None keeps no labels.
+
+		weights : array-like, shape (n_points,) or None, default=None
+			Non-negative weight of each point, kept on its KDTree node
+			and summed over each subtree, such that `kernel_density`
+			weights the points by them. Equal points keep the weight
+			of their first occurrence. None keeps no weights.
+
 		Returns
 		-------
 		tree : KDTree
@@ -103,324 +309,2218 @@ class KDTree:
 		"""
 		if accept is not None and not issubclass(accept, KDTreeType):
 			raise ValueError("Accept must be a subclass of KDTreeType")
+		if accept is not None and dtype is not None:
+			raise ValueError("dtype cannot be used with accept")
+		if accept is not None and index and accept.__hash__ is None:
+			raise ValueError("Accept must implement __hash__ to be indexed")
+		if split not in KDTree.SPLITS:
+			raise ValueError("Split must be one of " + ", ".join(KDTree.SPLITS))
+		if max_quality is not None and not max_quality >= 1:
+			raise ValueError("max_quality must be at least 1 or None")
+		if background is not None and (not isinstance(background, (int, np.integer)) or background < 1):
+			raise ValueError("background must be a positive int or None")
+		if background is not None and max_quality is None:
+			raise ValueError("background requires max_quality")
+		if labels is not None and len(labels) != len(points):
+			raise ValueError("Labels must have one entry per point")
+		if weights is not None:
+			weights = np.asarray(weights, dtype=np.float64)
+			if weights.shape != (len(points),):
+				raise ValueError("Weights must have one entry per point")
+			if not np.all(np.isfinite(weights) & (weights >= 0)):
+				raise ValueError("Weights must be finite and non-negative")
 		if k is None:
 			k = utils.check_dimensionality(*points, accept=accept)
-		sorted_points = []
-		for axis in range(k):
-			sorted_points.append(sorted(points, key=lambda x: x[axis]))
-		sorted_points = np.asarray(sorted_points)
-		return KDTree._initialize_recursive(sorted_points, k, init_axis, accept)
+		config = KDTreeConfig(k=k, accept=accept, dtype=dtype, index={} if index else None, split=split,
+					max_quality=max_quality, background=background, labels=None if labels is None else {},
+					weights=weights is not None)
+		return KDTree._initialize(points, init_axis, config, n_jobs, labels=labels, weights=weights)
 
 	@staticmethod
-	def _initialize_recursive(sorted_points, k, axis, accept):
+	def _initialize(points, init_axis, config, n_jobs=None, split=None, labels=None, weights=None):
 		"""
-		Internal recursive initialization based on an array of points
-		presorted in all axes.
+		Internal initialization from a list of points that
+		have already been validated.
 
 		This function should not be called externally. Use `initialize`
 		instead.
 
 		Parameters
 		----------
-		sorted_points : list
-			List of ndarrays of points (KDTreeType if `accept` is used),
-			each sorted on each of the axes of discrimination.
+		points : array-like, shape (n_points, *)
+			List of points to build a KDTree where the last axis denotes the features.
 
-		k : int
-			Dimensionality of the points.
+		init_axis : int
+			Initial axis to generate the KDTree.
 
-		axis : int
-			Axis of discrimination.
+		config : KDTreeConfig
+			Configuration shared by all KDTree nodes of the KDTree.
 
-		accept : KDTreeType or None
-			Override and allow a custom type to be accepted.
+		n_jobs : int or None, default=None
+			Number of processes used to build independent subtrees.
+
+		split : str or None, default=None
+			Rule used to choose the axis and point of discrimination.
+			None uses the rule of `config`.
+
+		labels : array-like, shape (n_points,) or None, default=None
+			Label of each point, if `config` keeps labels.
+
+		weights : ndarray, shape (n_points,) or None, default=None
+			Weight of each point, if `config` keeps weights.
 
 		Returns
 		-------
 		tree : KDTree
-			The root of the KDTree built from `points`
-		"""
-		median = len(sorted_points[axis]) // 2
-		tree = KDTree(sorted_points[axis][median], k=k, axis=axis, accept=accept)
-		sorted_right_points = []
-		sorted_left_points = []
-		right_points = sorted_points[axis][median+1:]
-		left_points = sorted_points[axis][:median]
-		for points in sorted_points:
-			if accept:
-				right_mask = np.isin(points, right_points)
-				left_mask = np.isin(points, left_points)
-			else:
-				right_dim_masks = [np.isin(points[:,x], right_points[:,x]) for x in range(k)]
-				right_mask = np.all(np.stack(right_dim_masks, axis=-1), axis=-1)
-				left_dim_masks = [np.isin(points[:,x], left_points[:,x]) for x in range(k)]
-				left_mask = np.all(np.stack(left_dim_masks, axis=-1), axis=-1)
-			sorted_right_points.append(points[right_mask])
-			sorted_left_points.append(points[left_mask])
-		sorted_right_points = np.asarray(sorted_right_points)
-		sorted_left_points = np.asarray(sorted_left_points)
-		axis = axis + 1 if axis + 1 < k else 0
-		if len(sorted_points[axis][median+1:]) > 0:
-			tree.right = KDTree._initialize_recursive(sorted_right_points, k, axis, accept)
-		if len(sorted_points[axis][:median]) > 0:
-			tree.left = KDTree._initialize_recursive(sorted_left_points, k, axis, accept)
-		tree._recalculate_nodes()
-		return tree
+			The root of the KDTree built from `points`.
+		"""
+		split = config.split if split is None else split
+		k, accept = config.k, config.accept
+		if accept is None:
+			values = utils.storage_point(points, config.dtype)
+			if values is None:
+				raise ValueError("Points cannot be represented by the dtype of the KDTree")
+			coords = np.asarray(values, dtype=np.float64)
+		else:
+			values = np.empty(len(points), dtype=object)
+			for i, point in enumerate(points):
+				values[i] = point
+			coords = np.empty((len(values), k), dtype=np.float64)
+			for i, point in enumerate(values):
+				coords[i] = utils.coordinates(point, k, accept=accept)
+		if labels is not None:
+			point_labels = np.empty(len(labels), dtype=object)
+			for i, label in enumerate(labels):
+				point_labels[i] = label
+			labels = point_labels
+		ids = np.arange(config.next_id, config.next_id + len(values))
+		config.next_id += len(values)
+		unique = KDTree._unique(values, coords, accept)
+		if len(unique) < len(values):
+			values = values[unique]
+			coords = np.asarray(values, dtype=np.float64) if accept is None else coords[unique]
+			ids = ids[unique]
+			labels = None if labels is None else labels[unique]
+			weights = None if weights is None else weights[unique]
+		build = _Build(values, coords, config, split, ids, labels, weights)
+		return KDTree._build(build, None, init_axis, n_jobs)
 
-	def _recalculate_nodes(self):
+	@staticmethod
+	def _unique(values, coords, accept=None):
 		"""
-		Recalculate the number of nodes of the KDTree,
-		assuming that the KDTree's children are correctly
-		calculated.
+		Determine the first occurrence of each distinct point,
+		as `insert` keeps a single KDTree node for equal points.
+
+		Parameters
+		----------
+		values : ndarray, shape (n_points, k) or (n_points,)
+			Points to build the KDTree from, as objects if `accept` is used.
+
+		coords : ndarray, shape (n_points, k)
+			Numeric coordinates of `values`.
+
+		accept : KDTreeType or None, default=None
+			Custom type of `values`, whose points are equal if
+			their coordinates and values compare equal.
+
+		Returns
+		-------
+		unique : ndarray
+			Indices of the first occurrence of each distinct point, in order.
 		"""
-		nodes = 0
-		if self.right:
-			nodes += self.right.nodes
-		if self.left:
-			nodes += self.left.nodes
-		self.nodes = nodes + 1
+		if accept is None:
+			# Add 0.0 to fold -0.0 into 0.0, as in `_utils.point_key`.
+			_, unique = np.unique(coords + 0.0, axis=0, return_index=True)
+			return np.sort(unique)
+		unique, seen = [], {}
+		for i, value in enumerate(values):
+			matches = seen.setdefault((coords[i] + 0.0).tobytes(), [])
+			if not any(values[j] == value for j in matches):
+				matches.append(i)
+				unique.append(i)
+		return np.asarray(unique, dtype=np.intp)
 
-	def insert(self, point):
+	@staticmethod
+	def _build(build, orders, init_axis, n_jobs=None):
 		"""
-		Insert a point into the KDTree.
+		Internal initialization from points with their coordinates
+		and, if known, the order of the points along each axis.
+
+		This function should not be called externally. Use `initialize`
+		instead.
 
 		Parameters
 		----------
-		point : array-like or object
-			The point (KDTreeType if `accept` is used) to be inserted,
-			where the last axis denotes the features.
+		build : _Build
+			The points to build the KDTree from and their settings.
+
+		orders : ndarray, shape (k, n_points) or None
+			Indices of `build.values` sorted along each axis.
+			If None, they are sorted from `build.coords`.
+
+		init_axis : int
+			Initial axis to generate the KDTree.
+
+		n_jobs : int or None, default=None
+			Number of processes used to build independent subtrees.
 
 		Returns
 		-------
 		tree : KDTree
-			The root of the KDTree with `point` inserted.
+			The root of the KDTree built from `build.values`.
 		"""
-		if self.accept is None:
-			point = np.asarray(point)
-		if self.k != utils.check_dimensionality(point, accept=self.accept):
-			raise ValueError("Point must be same dimensionality as the KDTree")
-		axis = self.axis + 1 if self.axis + 1 < self.k else 0
-		if np.all(self.value == point):
-			return self
-		elif point[self.axis] >= self.value[self.axis]:
-			if self.right is None:
-				self.right = KDTree(value=point, k=self.k, axis=axis, accept=self.accept)
-			else:
-				self.right = self.right.insert(point)
-		elif point[self.axis] < self.value[self.axis]:
-			if self.left is None:
-				self.left = KDTree(value=point, k=self.k, axis=axis, accept=self.accept)
-			else:
-				self.left = self.left.insert(point)
-		self._recalculate_nodes()
-		return self.balance()
+		if orders is None:
+			orders = np.stack([np.argsort(build.coords[:,axis], kind='stable')
+						for axis in range(build.config.k)])
+		n_jobs = utils.effective_n_jobs(n_jobs)
+		if n_jobs == 1:
+			return KDTree._initialize_recursive(build, orders, init_axis)
+		return parallel.initialize(KDTree, build, orders, init_axis, n_jobs)
 
-	def search(self, point):
+	@staticmethod
+	def _initialize_recursive(build, orders, axis):
 		"""
-		Search the KDTree for a point.
-		Returns the KDTree node if found, None otherwise.
+		Internal recursive initialization based on the order
+		of the points along each of the axes of discrimination.
+
+		This function should not be called externally. Use `initialize`
+		instead.
 
 		Parameters
 		----------
-		point : array-like or scalar
-			The point (KDTreeType if `accept` is used) being searched,
-			where the last axis denotes the features.
+		build : _Build
+			The points being built and their settings.
+
+		orders : ndarray, shape (k, n_subtree)
+			Indices of the points of this subtree in `build.values`,
+			sorted along each axis.
+
+		axis : int
+			Axis of discrimination.
 
 		Returns
 		-------
-		tree : KDTree or None
-			The KDTree node whose value matches the point.
-			None if the point was not found in the tree.
+		tree : KDTree
+			The root of the KDTree built from `orders`.
 		"""
-		if self.accept is None:
-			point = np.asarray(point)
-		if self.k != utils.check_dimensionality(point, accept=self.accept):
-			raise ValueError("Point must be same dimensionality as the KDTree")
-		elif np.all(self.value == point):
-			return self
-		elif point[self.axis] >= self.value[self.axis]:
-			if self.right is None:
-				return None
-			else:
-				return self.right.search(point)
-		else:
-			if self.left is None:
-				return None
-			else:
-				return self.left.search(point)
+		if len(orders[0]) == 1:
+			# Leaves need no partitioning, and a single point
+			# spreads along no axis.
+			return build.node(orders[0][0], axis if build.split == 'round_robin' else 0)
+		tree, right_orders, left_orders = KDTree._partition(build, orders, axis)
+		if len(right_orders[0]) > 0:
+			tree.right = KDTree._initialize_recursive(build, right_orders, tree._next_axis())
+		if len(left_orders[0]) > 0:
+			tree.left = KDTree._initialize_recursive(build, left_orders, tree._next_axis())
+		tree._recalculate_nodes()
+		return tree
 
-	def delete(self, point):
+	@staticmethod
+	def _partition(build, orders, axis):
 		"""
-		Delete a point from the KDTree and return the new
-		KDTree. Returns the same tree if the point was not found.
+		Create the KDTree node of a subtree at its point of discrimination
+		and partition the remaining points into its children.
 
 		Parameters
 		----------
-		point : array-like or scalar
-			The point to be deleted, where the last axis denotes the features.
+		build : _Build
+			The points being built and their settings.
+
+		orders : ndarray, shape (k, n_subtree)
+			Indices of the points of the subtree in `build.values`,
+			sorted along each axis.
+
+		axis : int
+			Axis of discrimination under the round-robin rule.
 
 		Returns
 		-------
 		tree : KDTree
-			The root of the KDTree with `point` removed.
+			The KDTree node of the subtree, without children.
+
+		right_orders : ndarray, shape (k, n_right)
+			Indices of the points of the right subtree, sorted along each axis.
+
+		left_orders : ndarray, shape (k, n_left)
+			Indices of the points of the left subtree, sorted along each axis.
 		"""
-		if self.accept is None:
-			point = np.asarray(point)
-		if self.k != utils.check_dimensionality(point, accept=self.accept):
-			raise ValueError("Point must be same dimensionality as the KDTree")
-		if np.all(self.value == point):
-			values = self.collect()
-			if len(values) > 1:
-				values.remove(point)
-				new_tree = KDTree.initialize(values, k=self.k, init_axis=self.axis, accept=self.accept)
-				return new_tree
-			return None
-		elif point[self.axis] >= self.value[self.axis]:
-			if self.right is None:
-				return self
-			else:
-				new_tree = self.right.delete(point)
-				self.right = new_tree
-				self._recalculate_nodes()
-				return self.balance()
-		else:
-			if self.left is None:
-				return self
-			else:
-				new_tree = self.left.delete(point)
-				self.left = new_tree
-				self._recalculate_nodes()
-				return self.balance()
+		coords, side = build.coords, build.side
+		if build.split != 'round_robin':
+			axis = KDTree._spread_axis(coords, orders)
+		median = KDTree._split_index(coords[orders[axis], axis], build.split)
+		node = orders[axis][median]
+		right, left = orders[axis][median+1:], orders[axis][:median]
+		side[node] = 0
+		side[right] = 1
+		side[left] = -1
+		sides = side[orders]
+		right_orders = orders[sides == 1].reshape(len(orders), len(right))
+		left_orders = orders[sides == -1].reshape(len(orders), len(left))
+		return build.node(node, axis), right_orders, left_orders
 
-	def collect(self):
+	@staticmethod
+	def _spread_axis(coords, orders):
 		"""
-		Collect all values in the KDTree as a list,
-		ordered in a depth-first manner.
+		Determine the axis along which points spread the most.
+
+		Parameters
+		----------
+		coords : ndarray, shape (n_points, k)
+			Numeric coordinates of all points.
+
+		orders : ndarray, shape (k, n_subtree)
+			Indices of the points in question sorted along each axis.
 
 		Returns
 		-------
-		values : list
-			A list of all the values in the KDTree.
+		axis : int
+			The axis of maximum spread.
 		"""
-		values = []
-		values.append(self.value)
-		if self.right is not None:
-			values += self.right.collect()
-		if self.left is not None:
-			values += self.left.collect()
-		return values
+		axes = np.arange(len(orders))
+		spreads = coords[orders[:,-1], axes] - coords[orders[:,0], axes]
+		return int(np.argmax(spreads))
 
-	def balance(self):
+	@staticmethod
+	def _split_index(coords, split):
 		"""
-		Balance the KDTree if the secondary invariant is not satisfied.
+		Determine the index of the point of discrimination among
+		sorted coordinates along the axis of discrimination. The index
+		never falls within a run of equal coordinates, so that all
+		points before it are strictly less along the axis.
+
+		Parameters
+		----------
+		coords : ndarray
+			Sorted coordinates of the points along the axis of discrimination.
+
+		split : str
+			Rule used to choose the point of discrimination.
 
 		Returns
 		-------
-		tree : KDTree
-			The root of the newly pseudo-balanced KDTree
+		median : int
+			The index of the point of discrimination.
 		"""
-		if not self.invariant():
-			values = self.collect()
-			return KDTree.initialize(values, k=self.k, init_axis=self.axis, accept=self.accept)
-		return self
+		if split == 'sliding_midpoint':
+			midpoint = coords[0] + (coords[-1] - coords[0]) / 2
+			return int(np.searchsorted(coords, midpoint, side='left'))
+		median = len(coords) // 2
+		if median == 0 or coords[median-1] < coords[median]:
+			return median
+		start = int(np.searchsorted(coords, coords[median], side='left'))
+		end = int(np.searchsorted(coords, coords[median], side='right'))
+		if end < len(coords) and end - median < median - start:
+			return end
+		return start
 
-	def invariant(self):
+	def _next_axis(self):
 		"""
-		Verify that the KDTree satisfies the secondary invariant.
+		Determine the axis of discrimination for a child
+		of this KDTree node under the round-robin rule.
 
 		Returns
 		-------
-		valid : bool
-			True if the KDTree satisfies the secondary invariant.
+		axis : int
+			The axis following the axis of this KDTree node.
 		"""
-		ln, rn = 0, 0
-		if self.left:
-			ln = self.left.nodes
-		if self.right:
-			rn = self.right.nodes
-		return np.abs(ln - rn) <= self.k
+		return self.axis + 1 if self.axis + 1 < self.config.k else 0
 
-	def nearest_neighbor(self, point, n=1, neighbors=[]):
+	def _rebuild(self, split=None):
 		"""
-		Determine the `n` nearest KDTree nodes to `point` and their distances.
+		Build a new KDTree from the points of this KDTree sharing
+		its configuration, starting on the axis of this KDTree node.
+		The points keep their cached coordinates, so that they
+		are neither converted nor validated again.
 
 		Parameters
 		----------
-		point : array-like or scalar
-			The query point, where the last axis denotes the features.
-
-		n : int, default=1
-			The number of neighbors to search for.
-
-		neighbors : list, default=[]
-			The list of `n` tuples, referring to `n` nearest neighbors,
-			sorted based on proximity. The first value in the tuple is the
-			point, while the second is the distance to `point`.
+		split : str or None, default=None
+			Rule used to choose the axis and point of discrimination.
+			None uses the rule of this KDTree.
 
 		Returns
 		-------
-		neighbors : list, shape (n_neighbors, 2)
-			The list of `n` tuples, referring to `n` nearest neighbors.
+		tree : KDTree
+			The root of the rebuilt KDTree.
 		"""
-		if self.accept is None:
-			point = np.asarray(point)
-		if self.k != utils.check_dimensionality(point, accept=self.accept):
-			raise ValueError("Point must be same dimensionality as the KDTree")
-		if len(neighbors) != n:
-			neighbors = [(None, np.inf)] * n
-		neighbors = np.asarray(neighbors)
-		dist = utils.distance(point, self.value, accept=self.accept)
-		idx = neighbors[:,1].searchsorted(dist)
-		if idx < len(neighbors):
-			neighbors = np.insert(neighbors, idx, np.asarray((self.value, dist)), axis=0)[:n]
-		if point[self.axis] + neighbors[-1,1] >= self.value[self.axis] and self.right:
-			neighbors = self.right.nearest_neighbor(point, n=n, neighbors=neighbors)
-		if point[self.axis] - neighbors[-1,1] < self.value[self.axis] and self.left:
-			neighbors = self.left.nearest_neighbor(point, n=n, neighbors=neighbors)
-		return neighbors
+		return KDTree._build(self._snapshot(split), None, self.axis)
 
-	def proximal_neighbor(self, point, d=0, neighbors=[]):
+	def _snapshot(self, split=None, config=None):
 		"""
-		Determine the KDTree nodes that are within `d` distance
-		to `point` and their distances.
+		Take the points of the KDTree with their cached coordinates,
+		IDs, labels and weights, to be built into a new KDTree.
 
 		Parameters
 		----------
-		point : array-like or scalar
-			The query point, where the last axis denotes the features.
+		split : str or None, default=None
+			Rule used to choose the axis and point of discrimination.
+			None uses the rule of this KDTree.
 
-		d : int, default=0
-			The maximum acceptable distance for neighbors.
+		config : KDTreeConfig or None, default=None
+			Configuration of the new KDTree. None shares the
+			configuration of this KDTree.
 
-		neighbors : list, default=[]
-			The list of `n` tuples, referring to proximal neighbors within
-			`d` distance from `point`, sorted based on proximity.
-			The first value in the tuple is the point, while the
-			second is the distance to `point`.
+		Returns
+		-------
+		build : _Build
+			The points of the KDTree and their settings.
+		"""
+		values, coords, ids, labels, weights = self._gather()
+		split = self.config.split if split is None else split
+		config = self.config if config is None else config
+		return _Build(values, coords, config, split, ids, labels, weights)
+
+	def _gather(self):
+		"""
+		Gather the points of the KDTree with their cached
+		coordinates, IDs, labels and weights, in the order given by `collect`.
 
 		Returns
 		-------
-		neighbors : list, shape (n_neighbors, 2)
-			The list of `n` tuples, referring to proximal neighbors within
-			`d` distance from `point`.
+		values : ndarray, shape (n_points, k) or (n_points,)
+			The points of the KDTree, as objects if `accept` is used.
+
+		coords : ndarray, shape (n_points, k)
+			Numeric coordinates of `values`.
+
+		ids : ndarray, shape (n_points,)
+			IDs of `values`.
+
+		labels : ndarray, shape (n_points,) or None
+			Labels of `values`, or None if the KDTree keeps no labels.
+
+		weights : ndarray, shape (n_points,) or None
+			Weights of `values`, or None if the KDTree keeps no weights.
 		"""
-		if self.accept is None:
-			point = np.asarray(point)
-		if self.k != utils.check_dimensionality(point, accept=self.accept):
-			raise ValueError("Point must be same dimensionality as the KDTree")
-		if d == 0:
-			exists = self.search(point)
-			return [(exists, 0.0)] if exists else []
-		neighbors = np.asarray(neighbors)
-		dist = utils.distance(point, self.value, accept=self.accept)
-		if dist <= d and not np.array_equal(point, self.value):
-			if len(neighbors) > 0:
-				idx = neighbors[:,1].searchsorted(dist)
-				neighbors = np.insert(neighbors, idx, np.asarray([self.value, dist]), axis=0)
-			else:
-				neighbors = np.asarray([[self.value, dist]])
-		if self.right and point[self.axis] + d >= self.value[self.axis]:
-			neighbors = self.right.proximal_neighbor(point, d=d, neighbors=neighbors)
-		if self.left and point[self.axis] - d < self.value[self.axis]:
-			neighbors = self.left.proximal_neighbor(point, d=d, neighbors=neighbors)
-		return neighbors
+		nodes, stack = [], [self]
+		while stack:
+			node = stack.pop()
+			nodes.append(node)
+			if node.left:
+				stack.append(node.left)
+			if node.right:
+				stack.append(node.right)
+		labels = None
+		if self.config.labels is not None:
+			labels = np.empty(len(nodes), dtype=object)
+			for i, node in enumerate(nodes):
+				labels[i] = node.label
+		ids = np.array([node.point_id for node in nodes], dtype=np.intp)
+		weights = None
+		if self.config.weights:
+			weights = np.array([node.weight for node in nodes], dtype=np.float64)
+		if self.config.accept is None:
+			values = np.array([node.value for node in nodes], dtype=self.config.dtype)
+			# Points stored as float64 share their array with their coordinates.
+			return values, np.asarray(values, dtype=np.float64), ids, labels, weights
+		values = np.empty(len(nodes), dtype=object)
+		for i, node in enumerate(nodes):
+			values[i] = node.value
+		return values, np.array([node.coords for node in nodes], dtype=np.float64), ids, labels, weights
+
+	def _recalculate_nodes(self):
+		"""
+		Recalculate the number of nodes, the depth statistics
+		and the labels of the KDTree, assuming that the KDTree's
+		children are correctly calculated, and discard its aggregates.
+		"""
+		nodes, height, path_length = 0, 0, 0
+		for child in (self.right, self.left):
+			if child:
+				nodes += child.nodes
+				height = max(height, child.height)
+				path_length += child.path_length + child.nodes
+		self.nodes = nodes + 1
+		self.height = height + 1
+		self.path_length = path_length
+		self.aggregates = None
+		self._recalculate_labels()
+
+	def _aggregates(self):
+		"""
+		Determine the bounding box and the sum of the points of the
+		KDTree, calculating the aggregates of the KDTree nodes that
+		have none since they were last modified.
+
+		Returns
+		-------
+		aggregates : ndarray, shape (3, k) or (3, k + 1) or tuple of ndarray
+			The lower and upper corners of the bounding box and
+			the sum of the points, extended by their weights if
+			the KDTree keeps weights, as in `aggregates`.
+		"""
+		if self.aggregates is not None:
+			return self.aggregates
+		if self.weight is None:
+			point = total = self.coords
+		else:
+			point = np.append(self.coords, self.weight)
+			total = np.append(np.multiply(self.coords, self.weight), self.weight)
+		if not (self.right or self.left):
+			return point, point, total
+		aggregates = np.empty((3, len(point)))
+		aggregates[:2] = point
+		aggregates[2] = total
+		lower, upper, total = aggregates
+		for child in (self.right, self.left):
+			if child:
+				child_lower, child_upper, child_total = child._aggregates()
+				np.minimum(lower, child_lower, out=lower)
+				np.maximum(upper, child_upper, out=upper)
+				np.add(total, child_total, out=total)
+		self.aggregates = aggregates
+		return aggregates
+
+	def _recalculate_labels(self):
+		"""
+		Recalculate the bitmask of the labels of the points
+		in the KDTree, assuming that the KDTree's children
+		are correctly calculated. Labels are not summarized
+		if the KDTree keeps no labels.
+		"""
+		if self.config.labels is None:
+			self.label_bits = None
+			return
+		label_bits = self.config.label_bit(self.label)
+		for child in (self.right, self.left):
+			if child:
+				label_bits |= child.label_bits
+		self.label_bits = label_bits
+
+	@property
+	def lower(self):
+		"""
+		Lower corner of the bounding box of the points in the KDTree.
+		None if `accept` is used.
+		"""
+		return self._aggregate(0)
+
+	@property
+	def upper(self):
+		"""
+		Upper corner of the bounding box of the points in the KDTree.
+		None if `accept` is used.
+		"""
+		return self._aggregate(1)
+
+	@property
+	def total(self):
+		"""
+		Sum of the points in the KDTree, each multiplied by its
+		weight if the KDTree keeps weights. None if `accept` is used.
+		"""
+		return self._aggregate(2)
+
+	@property
+	def weight_sum(self):
+		"""
+		Sum of the weights of the points in the KDTree, which is
+		`nodes` if the KDTree keeps no weights. None if `accept` is used.
+		"""
+		if self.config.accept is not None:
+			return None
+		elif not self.config.weights:
+			return self.nodes
+		return float(self._aggregates()[2][-1])
+
+	@property
+	def centroid(self):
+		"""
+		Mean of the points in the KDTree, weighted by their weights
+		if the KDTree keeps weights. None if `accept` is used.
+		"""
+		if self.total is None:
+			return None
+		return self.total / self.weight_sum
+
+	def _aggregate(self, row):
+		"""
+		Determine a row of the aggregates of the KDTree,
+		without the weights if the KDTree keeps weights.
+
+		Parameters
+		----------
+		row : int
+			Row of the aggregates, as in `aggregates`.
+
+		Returns
+		-------
+		aggregate : ndarray or None
+			The row of the aggregates. None if `accept` is used.
+		"""
+		if self.config.accept is not None:
+			return None
+		aggregate = self._aggregates()[row]
+		return aggregate[:self.config.k] if self.config.weights else aggregate
+
+	@property
+	def quality(self):
+		"""
+		Ratio of the mean number of KDTree nodes visited by a search
+		for a point in the KDTree to that of a complete binary tree
+		of the same size. A ratio of 1 is optimal.
+		"""
+		n = self.nodes
+		m = n.bit_length() - 1
+		# Internal path length of a complete binary tree of n nodes.
+		optimal = (n + 1) * m - 2 ** (m + 1) + 2
+		return (self.path_length + n) / (optimal + n)
+
+	def insert(self, point, label=None, weight=None):
+		"""
+		Insert a point into the KDTree. The point takes the next ID,
+		`next_id`, even if it is already in the KDTree, which keeps
+		its ID, such that each insertion takes one ID.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) to be inserted,
+			where the last axis denotes the features.
+
+		label : hashable or None, default=None
+			Label of `point`, if the KDTree keeps labels.
+			A point already in the KDTree keeps its label.
+
+		weight : float or None, default=None
+			Non-negative weight of `point`, if the KDTree keeps weights.
+			None weighs `point` as 1. A point already in the KDTree
+			keeps its weight.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the KDTree with `point` inserted.
+		"""
+		if label is not None and self.config.labels is None:
+			raise ValueError("KDTree does not keep labels")
+		if weight is not None and not self.config.weights:
+			raise ValueError("KDTree does not keep weights")
+		if self.config.weights:
+			weight = 1.0 if weight is None else float(weight)
+			if not (np.isfinite(weight) and weight >= 0):
+				raise ValueError("Weight must be finite and non-negative")
+		point, coords = self._store(point)
+		tags = {'point_id': self.config.new_id(), 'label': label, 'weight': weight}
+		return self._insert(point, coords, rebalance=not self.config.deferred, tags=tags)
+
+	def _store(self, point):
+		"""
+		Validate a point to be stored in the KDTree,
+		casting it to the storage data-type.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) to be stored,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		point : array-like or object
+			The point as it is stored.
+
+		coords : ndarray
+			Numeric coordinates of `point`, which are `point`
+			itself if `accept` is not used.
+		"""
+		if self.config.accept is None:
+			point = np.asarray(point)
+		if self.config.k != utils.check_dimensionality(point, accept=self.config.accept):
+			raise ValueError("Point must be same dimensionality as the KDTree")
+		if self.config.accept is not None:
+			return point, utils.coordinates(point, self.config.k, accept=self.config.accept)
+		point = utils.storage_point(point, self.config.dtype)
+		if point is None:
+			raise ValueError("Point cannot be represented by the dtype of the KDTree")
+		return point, point
+
+	def _tags(self):
+		"""
+		Determine the attributes of the point of this KDTree node
+		that it keeps as it moves, such as by `update`.
+
+		Returns
+		-------
+		tags : dict
+			The ID, label and weight of the point, as keyword
+			arguments of `KDTree`.
+		"""
+		return {'point_id': self.point_id, 'label': self.label, 'weight': self.weight}
+
+	def _insert(self, point, coords, rebalance=True, tags=None):
+		"""
+		Internal recursion for `insert`, which
+		assumes that `point` has already been validated.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) to be inserted,
+			where the last axis denotes the features.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		rebalance : bool, default=True
+			Balance each KDTree node along the path of insertion.
+
+		tags : dict or None, default=None
+			ID, label and weight of `point`, as in `_tags`.
+			None gives `point` the next ID.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the KDTree with `point` inserted.
+		"""
+		tags = {} if tags is None else tags
+		if self.config.pending:
+			tree = rebuilds.claim(self, 'insert', point, coords, tags)
+			if tree is not self:
+				return tree._insert(point, coords, rebalance, tags)
+		axis = self._next_axis()
+		if self._matches(point, coords):
+			return self
+		elif coords[self.axis] >= self.coords[self.axis]:
+			if self.right is None:
+				self.right = KDTree(value=point, axis=axis, config=self.config, coords=coords, **tags)
+			else:
+				self.right = self.right._insert(point, coords, rebalance, tags)
+		elif coords[self.axis] < self.coords[self.axis]:
+			if self.left is None:
+				self.left = KDTree(value=point, axis=axis, config=self.config, coords=coords, **tags)
+			else:
+				self.left = self.left._insert(point, coords, rebalance, tags)
+		self._recalculate_nodes()
+		return self.balance() if rebalance else self
+
+	def search(self, point):
+		"""
+		Search the KDTree for a point.
+		Returns the KDTree node if found, None otherwise.
+
+		If the KDTree maintains a hash index, the search is a
+		constant-time lookup across the whole KDTree.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point (KDTreeType if `accept` is used) being searched,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : KDTree or None
+			The KDTree node whose value matches the point.
+			None if the point was not found in the tree.
+		"""
+		point, coords = self._lookup(point)
+		if point is None:
+			return None
+		return self._find(point, coords)
+
+	def __contains__(self, point):
+		"""
+		Determine if a point is in the KDTree.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point (KDTreeType if `accept` is used) in question,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		contains : bool
+			True if the point is in the KDTree.
+		"""
+		return self.search(point) is not None
+
+	def _lookup(self, point):
+		"""
+		Validate a point to be matched exactly against the points
+		of the KDTree, casting it to `dtype` as it would be stored.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) in question,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		point : array-like or object or None
+			The point as it would be stored, or None if `dtype` cannot
+			represent it, such that no point of the KDTree matches it.
+
+		coords : ndarray or None
+			Numeric coordinates of `point`.
+		"""
+		if self.config.accept is None:
+			query = np.asarray(point)
+			if self.config.k != utils.check_dimensionality(query):
+				raise ValueError("Point must be same dimensionality as the KDTree")
+			point = utils.storage_point(query, self.config.dtype)
+			if point is None:
+				return None, None
+		elif self.config.k != utils.check_dimensionality(point, accept=self.config.accept):
+			raise ValueError("Point must be same dimensionality as the KDTree")
+		return point, utils.coordinates(point, self.config.k, accept=self.config.accept)
+
+	def _find(self, point, coords):
+		"""
+		Search the KDTree for a point that has already been validated,
+		using the hash index if the KDTree maintains one.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point (KDTreeType if `accept` is used) being searched,
+			where the last axis denotes the features.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		Returns
+		-------
+		tree : KDTree or None
+			The KDTree node whose value matches the point.
+			None if the point was not found in the tree.
+		"""
+		if self.config.index is not None:
+			return self.config.index.get(utils.point_key(point, accept=self.config.accept))
+		tree = self
+		while tree is not None:
+			if tree._matches(point, coords):
+				return tree
+			tree = tree.right if coords[tree.axis] >= tree.coords[tree.axis] else tree.left
+		return None
+
+	def _matches(self, point, coords):
+		"""
+		Determine if the value of this KDTree node is `point`,
+		comparing the cached coordinates before the values.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) in question.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		Returns
+		-------
+		matches : bool
+			True if the value of this KDTree node is `point`.
+		"""
+		if not (self.coords == coords).all():
+			return False
+		return self.config.accept is None or self.value == point
+
+	@staticmethod
+	def _insert_candidate(neighbors, value, dist, n=None):
+		"""
+		Insert a candidate neighbor into the candidate neighbors,
+		which are sorted based on proximity.
+
+		Parameters
+		----------
+		neighbors : ndarray
+			The candidate neighbors, as rows of the neighbor and
+			its distance.
+
+		value : array-like or object
+			The candidate neighbor.
+
+		dist : float
+			Distance of `value` from the query point.
+
+		n : int or None, default=None
+			The number of candidate neighbors to keep.
+			If None, all candidate neighbors are kept.
+
+		Returns
+		-------
+		neighbors : ndarray
+			The candidate neighbors, including `value` unless
+			it is farther than the `n` nearest.
+		"""
+		if len(neighbors) == 0:
+			return np.asarray([[value, dist]])
+		idx = neighbors[:,1].searchsorted(dist)
+		if n is None:
+			return np.insert(neighbors, idx, np.asarray([value, dist]), axis=0)
+		elif idx < len(neighbors):
+			return np.insert(neighbors, idx, np.asarray((value, dist)), axis=0)[:n]
+		return neighbors
+
+	def delete(self, point):
+		"""
+		Delete a point from the KDTree and return the new
+		KDTree. Returns the same tree if the point was not found.
+
+		The KDTree node holding the point takes on the minimum
+		along its axis from its right subtree, which is removed
+		recursively. If there is no right subtree, the left subtree
+		becomes the right subtree first. Only the KDTree nodes along
+		the path are then balanced.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point to be deleted, where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the KDTree with `point` removed.
+		"""
+		point, coords = self._lookup(point)
+		if point is None or self.config.index is not None and self._find(point, coords) is None:
+			return self
+		tree = self._delete(point, coords, rebalance=not self.config.deferred)
+		return self._keep_root(tree)
+
+	def _delete(self, point, coords, rebalance=True):
+		"""
+		Internal recursion for `delete`, which
+		assumes that `point` has already been validated.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point to be deleted, where the last axis denotes the features.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		rebalance : bool, default=True
+			Balance each KDTree node along the path of deletion.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the KDTree with `point` removed.
+		"""
+		if self.config.pending:
+			tree = rebuilds.claim(self, 'delete', point, coords)
+			if tree is not self:
+				return tree._delete(point, coords, rebalance)
+		if self._matches(point, coords):
+			if self.config.index is not None:
+				self.config.index.pop(utils.point_key(point, accept=self.config.accept), None)
+			if self.right is None and self.left is None:
+				return None
+			elif self.right is None:
+				# Values in the left subtree are no smaller than its minimum,
+				# so it can become the right subtree of the replacement.
+				self.right, self.left = self.left, None
+			replacement = self.right._axis_min(self.axis)
+			self.point_id, self.label, self.weight = replacement.point_id, replacement.label, replacement.weight
+			replacement, replacement_coords = replacement.value, replacement.coords
+			self.right = self.right._delete(replacement, replacement_coords, rebalance)
+			self.value, self.coords = replacement, replacement_coords
+			if self.config.index is not None:
+				self.config.index[utils.point_key(replacement, accept=self.config.accept)] = self
+			self._recalculate_nodes()
+			return self.balance() if rebalance else self
+		elif coords[self.axis] >= self.coords[self.axis]:
+			if self.right is None:
+				return self
+			else:
+				new_tree = self.right._delete(point, coords, rebalance)
+				self.right = new_tree
+				self._recalculate_nodes()
+				return self.balance() if rebalance else self
+		else:
+			if self.left is None:
+				return self
+			else:
+				new_tree = self.left._delete(point, coords, rebalance)
+				self.left = new_tree
+				self._recalculate_nodes()
+				return self.balance() if rebalance else self
+
+	def update(self, point, new_point):
+		"""
+		Move a point in the KDTree to `new_point` and return the new
+		KDTree. Returns the same tree if the point was not found.
+
+		The point is changed in place when `new_point` remains within
+		the region of its KDTree node and still separates the node's
+		children. Otherwise it is removed and `new_point` is inserted
+		into the lowest ancestor whose region contains it. The moved
+		point keeps its ID, label and weight, unless `new_point` is already
+		in the KDTree, which keeps the ID, label and weight of `new_point`.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point (KDTreeType if `accept` is used) to be moved,
+			where the last axis denotes the features.
+
+		new_point : array-like or scalar
+			The point (KDTreeType if `accept` is used) to move to,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the KDTree with `point` moved to `new_point`.
+		"""
+		new_point, new_coords = self._store(new_point)
+		point, coords = self._lookup(point)
+		node = None if point is None else self._find(point, coords)
+		if node is None:
+			return self
+		if np.all(point == new_point):
+			return self
+		if self._find(new_point, new_coords) is not None:
+			tree = self._delete(point, coords, rebalance=not self.config.deferred)
+			return self._keep_root(tree)
+		lower, upper = [None] * self.config.k, [None] * self.config.k
+		tree, _ = self._update(point, coords, new_point, new_coords, lower, upper,
+					rebalance=not self.config.deferred, tags=node._tags())
+		return self._keep_root(tree)
+
+	def _update(self, point, coords, new_point, new_coords, lower, upper, rebalance=True, tags=None):
+		"""
+		Internal recursion for `update`, which assumes that both
+		points have been validated, that `point` is in the KDTree,
+		and that `new_point` is not.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point to be moved, where the last axis denotes the features.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		new_point : array-like or scalar
+			The point to move to, where the last axis denotes the features.
+
+		new_coords : ndarray
+			Numeric coordinates of `new_point`.
+
+		lower : list
+			Inclusive lower bound of the region of this KDTree node
+			along each axis, None where unbounded.
+
+		upper : list
+			Exclusive upper bound of the region of this KDTree node
+			along each axis, None where unbounded.
+
+		rebalance : bool, default=True
+			Balance each KDTree node along the path of the update.
+
+		tags : dict or None, default=None
+			ID, label and weight of `point`, as in `_tags`,
+			which `new_point` takes on.
+
+		Returns
+		-------
+		tree : KDTree or None
+			The root of the KDTree with `point` moved.
+
+		placed : bool
+			True if `new_point` has been placed in the KDTree.
+		"""
+		if self.config.pending:
+			tree = rebuilds.claim(self, 'update')
+			if tree is not self:
+				return tree._update(point, coords, new_point, new_coords, lower, upper, rebalance, tags)
+		contains = KDTree._contains(new_coords, lower, upper)
+		if self._matches(point, coords):
+			if contains and self._separates(new_coords):
+				if self.config.index is not None:
+					self.config.index.pop(utils.point_key(point, accept=self.config.accept), None)
+					self.config.index[utils.point_key(new_point, accept=self.config.accept)] = self
+				self.value, self.coords = new_point, new_coords
+				self._recalculate_nodes()
+				return self, True
+			tree = self._delete(point, coords, rebalance)
+			if not contains:
+				return tree, False
+			elif tree is None:
+				return KDTree(value=new_point, axis=self.axis, config=self.config, coords=new_coords,
+							**tags), True
+			return tree._insert(new_point, new_coords, rebalance, tags), True
+		elif coords[self.axis] >= self.coords[self.axis]:
+			child_lower = list(lower)
+			child_lower[self.axis] = self.coords[self.axis]
+			self.right, placed = self.right._update(point, coords, new_point, new_coords,
+						child_lower, upper, rebalance, tags)
+		else:
+			child_upper = list(upper)
+			child_upper[self.axis] = self.coords[self.axis]
+			self.left, placed = self.left._update(point, coords, new_point, new_coords,
+						lower, child_upper, rebalance, tags)
+		self._recalculate_nodes()
+		if not placed and contains:
+			return self._insert(new_point, new_coords, rebalance, tags), True
+		return (self.balance() if rebalance else self), placed
+
+	@staticmethod
+	def _contains(coords, lower, upper):
+		"""
+		Determine if a point lies within a region of the KDTree.
+
+		Parameters
+		----------
+		coords : ndarray
+			Numeric coordinates of the point in question.
+
+		lower : list
+			Inclusive lower bound of the region along each axis,
+			None where unbounded.
+
+		upper : list
+			Exclusive upper bound of the region along each axis,
+			None where unbounded.
+
+		Returns
+		-------
+		contains : bool
+			True if the point lies within the region.
+		"""
+		for axis in range(len(lower)):
+			if lower[axis] is not None and coords[axis] < lower[axis]:
+				return False
+			if upper[axis] is not None and not coords[axis] < upper[axis]:
+				return False
+		return True
+
+	def _separates(self, coords):
+		"""
+		Determine if a point could replace the value of this KDTree node
+		while keeping its children on the correct sides of the node.
+
+		Parameters
+		----------
+		coords : ndarray
+			Numeric coordinates of the point in question.
+
+		Returns
+		-------
+		separates : bool
+			True if the point separates the children of this KDTree node.
+		"""
+		if self.left and not self.left._axis_max(self.axis).coords[self.axis] < coords[self.axis]:
+			return False
+		if self.right and self.right._axis_min(self.axis).coords[self.axis] < coords[self.axis]:
+			return False
+		return True
+
+	def _axis_min(self, axis):
+		"""
+		Find the KDTree node with the smallest value along `axis`.
+
+		Parameters
+		----------
+		axis : int
+			The axis along which to compare values.
+
+		Returns
+		-------
+		tree : KDTree
+			The KDTree node with the smallest value along `axis`.
+		"""
+		best = self
+		children = [self.left] if self.axis == axis else [self.left, self.right]
+		for child in children:
+			if child:
+				candidate = child._axis_min(axis)
+				if candidate.coords[axis] < best.coords[axis]:
+					best = candidate
+		return best
+
+	def _axis_max(self, axis):
+		"""
+		Find the KDTree node with the largest value along `axis`.
+
+		Parameters
+		----------
+		axis : int
+			The axis along which to compare values.
+
+		Returns
+		-------
+		tree : KDTree
+			The KDTree node with the largest value along `axis`.
+		"""
+		best = self
+		children = [self.right] if self.axis == axis else [self.left, self.right]
+		for child in children:
+			if child:
+				candidate = child._axis_max(axis)
+				if best.coords[axis] < candidate.coords[axis]:
+					best = candidate
+		return best
+
+	def collect(self):
+		"""
+		Collect all values in the KDTree as a list,
+		ordered in a depth-first manner.
+
+		Returns
+		-------
+		values : list
+			A list of all the values in the KDTree.
+		"""
+		return list(self)
+
+	def __iter__(self):
+		"""
+		Lazily iterate over all values in the KDTree,
+		ordered in a depth-first manner as in `collect`.
+
+		Returns
+		-------
+		values : generator
+			Generator of all the values in the KDTree.
+		"""
+		stack = [self]
+		while stack:
+			tree = stack.pop()
+			yield tree.value
+			if tree.left is not None:
+				stack.append(tree.left)
+			if tree.right is not None:
+				stack.append(tree.right)
+
+	def to_array(self, chunk_size=None):
+		"""
+		Export all values in the KDTree as an ndarray, ordered
+		in a depth-first manner as in `collect`. Values are written
+		directly into preallocated arrays without building a list.
+
+		Parameters
+		----------
+		chunk_size : int or None, default=None
+			Maximum number of points per exported array.
+			If None, all points are exported as one array.
+
+		Returns
+		-------
+		values : ndarray, shape (n_points, k) or generator
+			Array of all the values in the KDTree, with shape (n_points,)
+			of objects if `accept` is used. If `chunk_size` is given,
+			a generator of such arrays of at most `chunk_size` points.
+		"""
+		if chunk_size is None:
+			return next(self._to_array(self.nodes))
+		if chunk_size < 1:
+			raise ValueError("chunk_size must be a positive int")
+		return self._to_array(chunk_size)
+
+	def _to_array(self, chunk_size):
+		"""
+		Internal generator for `to_array`.
+
+		Parameters
+		----------
+		chunk_size : int
+			Maximum number of points per exported array.
+
+		Returns
+		-------
+		values : generator
+			Generator of arrays of at most `chunk_size` points.
+		"""
+		if self.config.accept is None:
+			dtype = self.config.dtype
+			if dtype is None:
+				dtype = functools.reduce(np.promote_types, (np.asarray(v).dtype for v in self))
+			shape = (self.config.k,)
+		else:
+			dtype, shape = object, ()
+		remaining = self.nodes
+		values = iter(self)
+		while remaining > 0:
+			size = min(chunk_size, remaining)
+			chunk = np.empty((size,) + shape, dtype=dtype)
+			for i in range(size):
+				chunk[i] = next(values)
+			remaining -= size
+			yield chunk
+
+	def balance(self):
+		"""
+		Balance the KDTree if the secondary invariant is not satisfied,
+		or if its `quality` exceeds the `max_quality` of the KDTree.
+
+		A KDTree with at least `background` nodes is only held to
+		`max_quality`, as the secondary invariant would rebuild it
+		too often, and is rebuilt in a background thread while this
+		KDTree is returned. The rebuilt KDTree is swapped in by the
+		next modification that reaches this KDTree node after the
+		rebuild completes, or by `wait_rebuilds`.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the newly pseudo-balanced KDTree
+		"""
+		config = self.config
+		split = 'max_spread' if config.split == 'sliding_midpoint' else config.split
+		if config.background is not None and self.nodes >= config.background:
+			if self.quality > config.max_quality:
+				rebuilds.schedule(self, split)
+			return self
+		if self.invariant() and (config.max_quality is None or self.quality <= config.max_quality):
+			return self
+		tree = self._rebuild(split=split)
+		if config.pending:
+			rebuilds.discard(self)
+		return tree
+
+	def wait_rebuilds(self):
+		"""
+		Wait for all background rebuilds of the KDTree and swap
+		in those that remain valid.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the KDTree with all rebuilds swapped in.
+		"""
+		return rebuilds.wait_rebuilds(self)
+
+	@contextmanager
+	def deferred_balance(self):
+		"""
+		Context manager that suspends balancing of the KDTree
+		during a burst of insertions and deletions. On exit, only the
+		highest KDTree nodes that fail the secondary invariant are
+		rebuilt. Queries remain correct within the context, as the
+		KDTree invariant is always maintained.
+
+		The KDTree must be the root, and it remains the root
+		throughout and after the context.
+
+		Returns
+		-------
+		tree : KDTree
+			This KDTree, to be modified within the context.
+		"""
+		self.config.deferred += 1
+		try:
+			yield self
+		finally:
+			self.config.deferred -= 1
+			if not self.config.deferred:
+				tree = self._balance_recursive()
+				if tree is not self:
+					self._assign(tree)
+
+	def _balance_recursive(self):
+		"""
+		Balance the KDTree top-down, rebuilding the highest
+		KDTree nodes that fail the secondary invariant and
+		leaving all other KDTree nodes in place.
+
+		Returns
+		-------
+		tree : KDTree
+			The root of the pseudo-balanced KDTree.
+		"""
+		if not self.invariant():
+			return self.balance()
+		if self.right:
+			self.right = self.right._balance_recursive()
+		if self.left:
+			self.left = self.left._balance_recursive()
+		return self
+
+	def _keep_root(self, tree):
+		"""
+		Resolve the root returned by a modification of this KDTree.
+		Within `deferred_balance`, the root is kept in place so that
+		the context continues to refer to this KDTree.
+
+		Parameters
+		----------
+		tree : KDTree or None
+			The root of the modified KDTree.
+
+		Returns
+		-------
+		tree : KDTree or None
+			The root of the modified KDTree.
+		"""
+		if self.config.deferred and tree is not None and tree is not self:
+			self._assign(tree)
+			return self
+		return tree
+
+	def _assign(self, tree):
+		"""
+		Take on the value and children of `tree` in place, such that
+		references to this KDTree node observe the structure of `tree`.
+
+		Parameters
+		----------
+		tree : KDTree
+			The KDTree whose structure to adopt.
+		"""
+		if self.config.pending:
+			rebuilds.mark_stale(self)
+		self.value = tree.value
+		self.coords = tree.coords
+		self.axis = tree.axis
+		self.left = tree.left
+		self.right = tree.right
+		self.nodes = tree.nodes
+		self.height = tree.height
+		self.path_length = tree.path_length
+		self.aggregates = tree.aggregates
+		self.label = tree.label
+		self.label_bits = tree.label_bits
+		self.weight = tree.weight
+		self.point_id = tree.point_id
+		if self.config.index is not None:
+			self.config.index[utils.point_key(self.value, accept=self.config.accept)] = self
+
+	def invariant(self):
+		"""
+		Verify that the KDTree satisfies the secondary invariant.
+		A KDTree node whose children differ in size only because
+		points equal along its axis must share a side satisfies
+		the invariant, as rebuilding it would choose the same split.
+
+		Returns
+		-------
+		valid : bool
+			True if the KDTree satisfies the secondary invariant.
+		"""
+		ln, rn = 0, 0
+		if self.left:
+			ln = self.left.nodes
+		if self.right:
+			rn = self.right.nodes
+		return np.abs(ln - rn) <= self.config.k or self._tied()
+
+	def _tied(self):
+		"""
+		Determine if `_split_index` would choose the point of discrimination
+		of this KDTree node again along its axis, because the median falls
+		within a run of points equal along the axis.
+
+		Returns
+		-------
+		tied : bool
+			True if this KDTree node is split as evenly as its ties allow.
+		"""
+		axis, ln = self.axis, self.left.nodes if self.left else 0
+		median = self.nodes // 2
+		if median >= ln:
+			# Points equal to this KDTree node along the axis are on the right.
+			start = ln
+			end = ln + 1 + (self.right._count_equal(axis, self.coords[axis]) if self.right else 0)
+		else:
+			# Points equal to the largest point on the left are all on the left.
+			top = self.left._axis_max(axis).coords[axis]
+			start, end = ln - self.left._count_equal(axis, top), ln
+		if not start <= median < end:
+			return False
+		if end < self.nodes and end - median < median - start:
+			return end == ln
+		return start == ln
+
+	def _count_equal(self, axis, value):
+		"""
+		Count the points of the KDTree equal to `value` along `axis`.
+
+		Parameters
+		----------
+		axis : int
+			The axis along which to compare values.
+
+		value : float
+			The coordinate in question.
+
+		Returns
+		-------
+		count : int
+			The number of points whose coordinate along `axis` is `value`.
+		"""
+		count, stack = 0, [self]
+		while stack:
+			node = stack.pop()
+			coord = node.coords[axis]
+			count += coord == value
+			if node.right and (node.axis != axis or coord <= value):
+				stack.append(node.right)
+			if node.left and (node.axis != axis or coord > value):
+				stack.append(node.left)
+		return int(count)
+
+	def nearest_neighbor(self, point, n=1, neighbors=[], predicate=None, mask=None, labels=None):
+		"""
+		Determine the `n` nearest KDTree nodes to `point` and their distances.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		n : int, default=1
+			The number of neighbors to search for.
+
+		neighbors : list, default=[]
+			The list of `n` tuples, referring to `n` nearest neighbors,
+			sorted based on proximity. The first value in the tuple is the
+			point, while the second is the distance to `point`.
+
+		predicate : callable or None, default=None
+			Function of a point returning True if the point may be
+			a neighbor. Evaluated during traversal.
+
+		mask : array-like of bool or None, default=None
+			Mask over the point IDs of the KDTree, with `next_id`
+			entries, of points that may be neighbors. Points keep
+			their IDs as the KDTree is modified, such that a mask
+			stays valid until the next insertion.
+
+		labels : iterable or None, default=None
+			Labels of points that may be neighbors. Subtrees without
+			any of these labels are skipped. Requires a KDTree
+			that keeps labels.
+
+		Returns
+		-------
+		neighbors : list, shape (n_neighbors, 2)
+			The list of `n` tuples, referring to `n` nearest neighbors.
+		"""
+		if self.config.accept is None:
+			point = np.asarray(point)
+		if self.config.k != utils.check_dimensionality(point, accept=self.config.accept):
+			raise ValueError("Point must be same dimensionality as the KDTree")
+		keep = self._filter(predicate, mask, labels)
+		coords = utils.coordinates(point, self.config.k, accept=self.config.accept)
+		return self._nearest_neighbor(point, coords, n, neighbors, keep)
+
+	def _nearest_neighbor(self, point, coords, n, neighbors, keep):
+		"""
+		Internal recursion for `nearest_neighbor`, which
+		assumes that `point` has already been validated.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		n : int
+			The number of neighbors to search for.
+
+		neighbors : list
+			The list of `n` tuples, referring to `n` nearest neighbors.
+
+		keep : _Filter or None
+			Filter from `_filter` of points that may be neighbors.
+
+		Returns
+		-------
+		neighbors : list, shape (n_neighbors, 2)
+			The list of `n` tuples, referring to `n` nearest neighbors.
+		"""
+		if len(neighbors) != n:
+			neighbors = [(None, np.inf)] * n
+		neighbors = np.asarray(neighbors)
+		if keep is not None and keep.skips(self):
+			return neighbors
+		if keep is None or keep.keeps(self):
+			dist = utils.distance(point, self.value, accept=self.config.accept, dtype=self.config.dtype)
+			neighbors = KDTree._insert_candidate(neighbors, self.value, dist, n)
+		if coords[self.axis] + neighbors[-1,1] >= self.coords[self.axis] and self.right:
+			neighbors = self.right._nearest_neighbor(point, coords, n, neighbors, keep)
+		if coords[self.axis] - neighbors[-1,1] < self.coords[self.axis] and self.left:
+			neighbors = self.left._nearest_neighbor(point, coords, n, neighbors, keep)
+		return neighbors
+
+	def _filter(self, predicate=None, mask=None, labels=None):
+		"""
+		Combine `predicate`, `mask` and `labels` into a single filter
+		of points that may be returned by a neighbor query.
+
+		Parameters
+		----------
+		predicate : callable or None, default=None
+			Function of a point returning True if the point may be
+			a neighbor.
+
+		mask : array-like of bool or None, default=None
+			Mask over the point IDs of the KDTree, with `next_id`
+			entries, of points that may be neighbors.
+
+		labels : iterable or None, default=None
+			Labels of points that may be neighbors.
+
+		Returns
+		-------
+		keep : _Filter or None
+			The filter of points that may be neighbors.
+			None if there is nothing to filter.
+		"""
+		if mask is not None:
+			mask = np.asarray(mask, dtype=bool)
+			if mask.shape != (self.config.next_id,):
+				raise ValueError("Mask must have one entry per point ID of the KDTree")
+		if labels is not None:
+			if self.config.labels is None:
+				raise ValueError("KDTree does not keep labels")
+			labels = set(labels)
+		if predicate is None and mask is None and labels is None:
+			return None
+		bits = None if labels is None else self.config.label_mask(labels)
+		return _Filter(predicate, mask, labels, bits)
+
+	def incremental_neighbor(self, point):
+		"""
+		Lazily iterate over the KDTree nodes in order of
+		nondecreasing distance to `point`.
+
+		Nodes are visited best-first through a priority queue
+		keyed on a lower bound of the distance to each subtree,
+		so only as much of the KDTree is traversed as is needed
+		to produce the neighbors consumed so far.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		Returns
+		-------
+		neighbors : generator
+			Generator of tuples, where the first value is the point
+			and the second is the distance to `point`.
+		"""
+		if self.config.accept is None:
+			point = np.asarray(point)
+		if self.config.k != utils.check_dimensionality(point, accept=self.config.accept):
+			raise ValueError("Point must be same dimensionality as the KDTree")
+		coords = utils.coordinates(point, self.config.k, accept=self.config.accept)
+		return self._incremental_neighbor(point, coords)
+
+	def _incremental_neighbor(self, point, coords):
+		"""
+		Internal generator for `incremental_neighbor`, which
+		assumes that `point` has already been validated.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		Returns
+		-------
+		neighbors : generator
+			Generator of tuples, where the first value is the point
+			and the second is the distance to `point`.
+		"""
+		counter = itertools.count()
+		queue = [(0.0, next(counter), False, self)]
+		while queue:
+			bound, _, is_point, item = heapq.heappop(queue)
+			if is_point:
+				yield item, bound
+				continue
+			dist = utils.distance(point, item.value, accept=item.config.accept, dtype=item.config.dtype)
+			heapq.heappush(queue, (dist, next(counter), True, item.value))
+			diff = coords[item.axis] - item.coords[item.axis]
+			if item.right:
+				right_bound = bound if diff >= 0 else max(bound, -diff)
+				heapq.heappush(queue, (right_bound, next(counter), False, item.right))
+			if item.left:
+				left_bound = max(bound, diff) if diff >= 0 else bound
+				heapq.heappush(queue, (left_bound, next(counter), False, item.left))
+
+	def proximal_neighbor(self, point, d=0, neighbors=[], predicate=None, mask=None, labels=None):
+		"""
+		Determine the KDTree nodes that are within `d` distance
+		to `point` and their distances.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		d : int, default=0
+			The maximum acceptable distance for neighbors.
+
+		neighbors : list, default=[]
+			The list of `n` tuples, referring to proximal neighbors within
+			`d` distance from `point`, sorted based on proximity.
+			The first value in the tuple is the point, while the
+			second is the distance to `point`.
+
+		predicate : callable or None, default=None
+			Function of a point returning True if the point may be
+			a neighbor. Evaluated during traversal.
+
+		mask : array-like of bool or None, default=None
+			Mask over the point IDs of the KDTree, with `next_id`
+			entries, of points that may be neighbors. Points keep
+			their IDs as the KDTree is modified, such that a mask
+			stays valid until the next insertion.
+
+		labels : iterable or None, default=None
+			Labels of points that may be neighbors. Subtrees without
+			any of these labels are skipped. Requires a KDTree
+			that keeps labels.
+
+		Returns
+		-------
+		neighbors : list, shape (n_neighbors, 2)
+			The list of `n` tuples, referring to proximal neighbors within
+			`d` distance from `point`.
+		"""
+		if self.config.accept is None:
+			point = np.asarray(point)
+		if self.config.k != utils.check_dimensionality(point, accept=self.config.accept):
+			raise ValueError("Point must be same dimensionality as the KDTree")
+		keep = self._filter(predicate, mask, labels)
+		if d == 0:
+			point, coords = self._lookup(point)
+			exists = None if point is None else self._find(point, coords)
+			if exists and (keep is None or keep.keeps(exists)):
+				return [(exists, 0.0)]
+			return []
+		coords = utils.coordinates(point, self.config.k, accept=self.config.accept)
+		return self._proximal_neighbor(point, coords, d, neighbors, keep)
+
+	def _proximal_neighbor(self, point, coords, d, neighbors, keep):
+		"""
+		Internal recursion for `proximal_neighbor`, which
+		assumes that `point` has already been validated.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		coords : ndarray
+			Numeric coordinates of `point`.
+
+		d : int
+			The maximum acceptable distance for neighbors.
+
+		neighbors : list
+			The list of `n` tuples, referring to proximal neighbors within
+			`d` distance from `point`, sorted based on proximity.
+
+		keep : _Filter or None
+			Filter from `_filter` of points that may be neighbors.
+
+		Returns
+		-------
+		neighbors : list, shape (n_neighbors, 2)
+			The list of `n` tuples, referring to proximal neighbors within
+			`d` distance from `point`.
+		"""
+		neighbors = np.asarray(neighbors)
+		if keep is not None and keep.skips(self):
+			return neighbors
+		if keep is None or keep.keeps(self):
+			dist = utils.distance(point, self.value, accept=self.config.accept, dtype=self.config.dtype)
+			if dist <= d and not self._matches(point, coords):
+				neighbors = KDTree._insert_candidate(neighbors, self.value, dist)
+		if self.right and coords[self.axis] + d >= self.coords[self.axis]:
+			neighbors = self.right._proximal_neighbor(point, coords, d, neighbors, keep)
+		if self.left and coords[self.axis] - d < self.coords[self.axis]:
+			neighbors = self.left._proximal_neighbor(point, coords, d, neighbors, keep)
+		return neighbors
+
+	def kernel_density(self, points, bandwidth, kernel='gaussian', atol=0.0, rtol=0.0):
+		"""
+		Estimate the kernel density of the KDTree at each of `points`.
+
+		Subtrees are refined best-first, starting from those whose
+		bounding box bounds the kernel most loosely, until the bounds
+		on the density are within `atol` + `rtol` * density. All
+		remaining subtrees are approximated as if their points lay
+		at their centroid. Subtrees over which the kernel is constant,
+		such as those outside its support, are never refined.
+		If the KDTree keeps weights, each point counts by its weight,
+		and whole subtrees by the sum of their weights.
+
+		Parameters
+		----------
+		points : array-like, shape (n_points, k)
+			The query points, where the last axis denotes the features.
+
+		bandwidth : float
+			Bandwidth of the kernel.
+
+		kernel : {'gaussian', 'tophat', 'epanechnikov', 'exponential', 'linear'}, default='gaussian'
+			The kernel to estimate the density with.
+
+		atol : float, default=0.0
+			Absolute tolerance of the estimated densities.
+
+		rtol : float, default=0.0
+			Relative tolerance of the estimated densities.
+
+		Returns
+		-------
+		density : ndarray, shape (n_points,)
+			The estimated density at each of `points`.
+		"""
+		return density.kernel_density(self, points, bandwidth, kernel, atol, rtol)
+
+	def query_tree(self, other, d, return_distance=False):
+		"""
+		Determine all pairs of points, one from this KDTree and one
+		from `other`, that are within `d` distance of each other.
+
+		Both KDTrees are traversed together, pruning pairs of subtrees
+		whose bounding boxes are farther than `d` apart and taking
+		all pairs of subtrees whose bounding boxes are entirely within `d`
+		without comparing their points. If `other` is this KDTree,
+		points are not paired with themselves.
+
+		Points are referred to by their positions in the order
+		given by `collect` of their KDTree.
+
+		Parameters
+		----------
+		other : KDTree
+			The KDTree to join with.
+
+		d : float
+			The maximum acceptable distance between paired points.
+
+		return_distance : bool, default=False
+			Return the distances between paired points.
+
+		Returns
+		-------
+		offsets : ndarray, shape (n_nodes + 1,)
+			Offsets into `indices` in compressed sparse row form,
+			such that the points of `other` paired with point `i`
+			are `indices[offsets[i]:offsets[i+1]]`.
+
+		indices : ndarray, shape (n_pairs,)
+			Positions of the points of `other` in each pair,
+			sorted within each row.
+
+		distances : ndarray, shape (n_pairs,)
+			Distances between the points of each pair.
+			Only returned if `return_distance` is True.
+		"""
+		return join.query_tree(self, other, d, return_distance)
+
+	def query_radius(self, points, d, return_distance=False, sort_results=False):
+		"""
+		Determine the points of the KDTree within `d` distance
+		of each of `points`, including points equal to the query.
+
+		All queries share a single traversal of the KDTree, carrying
+		along the queries that remain undecided at each KDTree node.
+		Queries whose distance to the bounding box of a subtree exceeds
+		their radius drop out, while queries for which the whole
+		bounding box lies within their radius take the entire subtree.
+
+		Points are referred to by their positions in the order
+		given by `collect`.
+
+		Parameters
+		----------
+		points : array-like, shape (n_points, k)
+			The query points, where the last axis denotes the features.
+
+		d : float or array-like, shape (n_points,)
+			The maximum acceptable distance for neighbors,
+			either shared by all queries or for each query.
+
+		return_distance : bool, default=False
+			Return the distances of the neighbors to their query.
+
+		sort_results : bool, default=False
+			Sort the neighbors of each query based on proximity
+			instead of their positions.
+
+		Returns
+		-------
+		offsets : ndarray, shape (n_points + 1,)
+			Offsets into `indices` in compressed sparse row form,
+			such that the neighbors of query `i` are
+			`indices[offsets[i]:offsets[i+1]]`.
+
+		indices : ndarray, shape (n_neighbors,)
+			Positions of the neighbors of each query.
+
+		distances : ndarray, shape (n_neighbors,)
+			Distances of the neighbors to their query.
+			Only returned if `return_distance` is True.
+		"""
+		return radius.query_radius(self, points, d, return_distance, sort_results)
+
+	def closest_pairs(self, other, n=1):
+		"""
+		Determine the `n` closest pairs of points, one from this KDTree
+		and one from `other`, and their distances.
+
+		Both KDTrees are traversed together, visiting nearer pairs of
+		subtrees first and pruning pairs of subtrees whose bounding
+		boxes are farther apart than the `n` closest pairs found so far.
+		If `other` is this KDTree, each unordered pair of distinct
+		points is considered once, with the smaller position first.
+
+		Points are referred to by their positions in the order
+		given by `collect` of their KDTree.
+
+		Parameters
+		----------
+		other : KDTree
+			The KDTree to join with.
+
+		n : int, default=1
+			The number of pairs to search for.
+
+		Returns
+		-------
+		rows : ndarray, shape (n_pairs,)
+			Positions of the points of this KDTree in each pair.
+
+		cols : ndarray, shape (n_pairs,)
+			Positions of the points of `other` in each pair.
+
+		distances : ndarray, shape (n_pairs,)
+			Distances between the points of each pair, sorted
+			based on proximity.
+		"""
+		return join.closest_pairs(self, other, n)
+
+class KDTreeConfig:
+	"""
+	Configuration shared by all KDTree nodes of a KDTree,
+	holding the settings that are constant across the KDTree.
+	Only the settings are pickled, without the index, the labels
+	or the state of background rebuilds.
+
+	Parameters
+	----------
+	k : int, default=1
+		Dimensionality of the KDTree.
+
+	accept : KDTreeType or None, default=None
+		Override and allow custom types to be accepted.
+
+	dtype : data-type or None, default=None
+		Storage data-type of the points.
+
+	index : dict or None, default=None
+		Hash index of the KDTree mapping the key of each point,
+		from `_utils.point_key`, to its KDTree node.
+
+	split : {'round_robin', 'max_spread', 'sliding_midpoint'}, default='round_robin'
+		Rule used to choose the axis and point of discrimination.
+
+	max_quality : float or None, default=None
+		Largest `quality` tolerated by `balance` before a subtree
+		is rebuilt. None only enforces the secondary invariant.
+
+	background : int or None, default=None
+		Smallest number of nodes of a subtree that `balance` holds
+		only to `max_quality` and rebuilds in a background thread.
+		None rebuilds all subtrees immediately.
+
+	labels : dict or None, default=None
+		Bit position of each label of the KDTree in the `label_bits`
+		of its KDTree nodes, assigned as labels are first seen.
+		None if the KDTree keeps no labels.
+
+	weights : bool, default=False
+		Keep the weight of each point on its KDTree node.
+
+	Attributes
+	----------
+	next_id : int
+		ID that the next point inserted into the KDTree takes.
+
+	deferred : int
+		Number of `deferred_balance` contexts entered on the KDTree.
+		Balancing is suspended while nonzero.
+
+	executor : ThreadPoolExecutor or None
+		Thread running background rebuilds, created on first use.
+
+	lock : Lock
+		Lock guarding `pending`.
+
+	pending : dict
+		Background rebuilds that have not been swapped in,
+		keyed by the id of the KDTree node being rebuilt.
+	"""
+	__slots__ = ('k', 'accept', 'dtype', 'index', 'split', 'max_quality', 'background', 'labels',
+				'weights', 'next_id', 'deferred', 'executor', 'lock', 'pending')
+
+	def __init__(self, k=1, accept=None, dtype=None, index=None, split='round_robin',
+				max_quality=None, background=None, labels=None, weights=False):
+		self.k = k
+		self.accept = accept
+		self.dtype = dtype
+		self.index = index
+		self.split = split
+		self.max_quality = max_quality
+		self.background = background
+		self.labels = labels
+		self.weights = weights
+		self.next_id = 0
+		self.deferred = 0
+		self.executor = None
+		self.lock = threading.Lock()
+		self.pending = {}
+
+	def __getstate__(self):
+		# Only the settings are pickled, such as for building
+		# subtrees in worker processes.
+		return {'k': self.k, 'accept': self.accept, 'dtype': self.dtype, 'split': self.split,
+					'max_quality': self.max_quality, 'background': self.background, 'weights': self.weights}
+
+	def __setstate__(self, state):
+		self.__init__(**state)
+
+	def unindexed(self):
+		"""
+		Determine the configuration of KDTree nodes that must not
+		register in the index, such as those built in the background
+		until they are swapped in.
+
+		Returns
+		-------
+		config : KDTreeConfig
+			A configuration sharing these settings, labels and weights
+			without the index, or this configuration if it has no index.
+		"""
+		if self.index is None:
+			return self
+		return KDTreeConfig(k=self.k, accept=self.accept, dtype=self.dtype, split=self.split,
+					labels=self.labels, weights=self.weights)
+
+	def new_id(self):
+		"""
+		Take the next point ID.
+
+		Returns
+		-------
+		point_id : int
+			The ID taken.
+		"""
+		point_id = self.next_id
+		self.next_id += 1
+		return point_id
+
+	def label_bit(self, label):
+		"""
+		Determine the bit of `label` in the `label_bits` of KDTree nodes,
+		assigning the next bit position to a label not seen before.
+
+		Parameters
+		----------
+		label : hashable
+			The label in question.
+
+		Returns
+		-------
+		bit : int
+			The bit of `label`.
+		"""
+		return 1 << self.labels.setdefault(label, len(self.labels))
+
+	def label_mask(self, labels):
+		"""
+		Determine the bitmask of a set of labels. Labels not seen
+		before have no point in the KDTree, and so no bit.
+
+		Parameters
+		----------
+		labels : iterable
+			The labels in question.
+
+		Returns
+		-------
+		bits : int
+			The bitmask of `labels`.
+		"""
+		bits = 0
+		for label in labels:
+			if label in self.labels:
+				bits |= 1 << self.labels[label]
+		return bits
+
+class _Build:
+	"""
+	Points being built into a KDTree, shared by the recursion
+	of the build.
+
+	Parameters
+	----------
+	values : ndarray, shape (n_points, k) or (n_points,)
+		All points being built, as objects if `accept` is used.
+
+	coords : ndarray, shape (n_points, k)
+		Numeric coordinates of `values`.
+
+	config : KDTreeConfig
+		Configuration shared by all KDTree nodes of the KDTree.
+
+	split : str
+		Rule used to choose the axis and point of discrimination.
+
+	ids : ndarray, shape (n_points,) or None
+		IDs of `values`, or None to give each point the next ID.
+
+	labels : ndarray, shape (n_points,) or None, default=None
+		Labels of `values`, or None if the KDTree keeps no labels.
+
+	weights : ndarray, shape (n_points,) or None, default=None
+		Weights of `values`, or None if the KDTree keeps no weights.
+
+	Attributes
+	----------
+	side : ndarray, shape (n_points,)
+		Scratch array marking the side of each point relative
+		to the KDTree node that last partitioned it.
+
+	positions : bool
+		True if `values` are the positions of the points rather
+		than the points, as in worker processes. KDTree nodes without
+		`accept` otherwise take their values as their coordinates.
+	"""
+	__slots__ = ('values', 'coords', 'config', 'split', 'ids', 'labels', 'weights', 'side', 'positions')
+
+	def __init__(self, values, coords, config, split, ids, labels=None, weights=None):
+		self.values = values
+		self.coords = coords
+		self.config = config
+		self.split = split
+		self.ids = ids
+		self.labels = labels
+		self.weights = weights
+		self.side = np.zeros(len(values), dtype=np.int8)
+		self.positions = False
+
+	def remote(self, indices):
+		"""
+		Take the points at `indices` for building a subtree in a worker
+		process, by their coordinates with their positions as values.
+		Workers register no KDTree nodes in the index and keep
+		no IDs, labels or weights.
+
+		Parameters
+		----------
+		indices : ndarray
+			Indices of the points of the subtree in `values`.
+
+		Returns
+		-------
+		build : _Build
+			The points of the subtree and their settings.
+		"""
+		config = self.config
+		config = KDTreeConfig(k=config.k, accept=config.accept, dtype=config.dtype, split=self.split)
+		build = _Build(np.arange(len(indices)), self.coords[indices], config, self.split, None)
+		build.positions = True
+		return build
+
+	def node(self, index, axis):
+		"""
+		Create the KDTree node of a point.
+
+		Parameters
+		----------
+		index : int
+			Index of the point in `values`.
+
+		axis : int
+			Axis of discrimination of the KDTree node.
+
+		Returns
+		-------
+		tree : KDTree
+			The KDTree node of the point, without children.
+		"""
+		value = self.values[index]
+		coords = value if self.config.accept is None and not self.positions else self.coords[index]
+		label = None if self.labels is None else self.labels[index]
+		weight = None if self.weights is None else float(self.weights[index])
+		point_id = None if self.ids is None else int(self.ids[index])
+		return KDTree(value, axis=axis, config=self.config, coords=coords, label=label, weight=weight,
+					point_id=point_id)
+
+class _Filter:
+	"""
+	Filter of the points that may be returned by a neighbor query.
+
+	Parameters
+	----------
+	predicate : callable or None
+		Function of a point returning True if the point may be
+		a neighbor.
+
+	mask : ndarray of bool or None
+		Mask over the point IDs of the KDTree of points
+		that may be neighbors.
+
+	labels : set or None
+		Labels of points that may be neighbors.
+
+	bits : int or None
+		Bitmask of `labels` in the `label_bits` of KDTree nodes.
+	"""
+	__slots__ = ('predicate', 'mask', 'labels', 'bits')
+
+	def __init__(self, predicate, mask, labels, bits):
+		self.predicate = predicate
+		self.mask = mask
+		self.labels = labels
+		self.bits = bits
+
+	def skips(self, tree):
+		"""
+		Determine if no point of a KDTree may be a neighbor,
+		as it holds none of `labels`.
+
+		Parameters
+		----------
+		tree : KDTree
+			The KDTree in question.
+
+		Returns
+		-------
+		skips : bool
+			True if the KDTree can be skipped.
+		"""
+		return self.bits is not None and not tree.label_bits & self.bits
+
+	def keeps(self, tree):
+		"""
+		Determine if the point of a KDTree node may be a neighbor.
+
+		Parameters
+		----------
+		tree : KDTree
+			The KDTree node in question.
+
+		Returns
+		-------
+		keeps : bool
+			True if the point of `tree` may be a neighbor.
+		"""
+		if self.labels is not None and tree.label not in self.labels:
+			return False
+		if self.mask is not None and not self.mask[tree.point_id]:
+			return False
+		return self.predicate is None or self.predicate(tree.value)
@@ -82,10 +82,12 @@ class KDTreeType(ABC):
 		"""
 		Return the 'item' and the 'index', `key`, of the `KDTreeType`.
 		This needs to be defined based on the custom implementation.
+		Items must be numeric, as a KDTree reads them once
+		into cached coordinates along each axis.
 
 		Returns
 		-------
-		item : object
+		item : float
 			The 'item' and the 'index', `key`, of the `KDTreeType`.
 		"""
 		raise NotImplementedError("__getitem__ not implemented")
@@ -0,0 +1,143 @@
+# coding=utf-8
+
+"""Pairs of Positions in KDTrees"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import numpy as np
+
+def children(node):
+	"""
+	Iterate over the children of a KDTree with their positions.
+
+	Parameters
+	----------
+	node : tuple
+		The KDTree and its position in the order given by `collect`
+		of the root KDTree.
+
+	Returns
+	-------
+	children : generator
+		Generator of tuples, where the first value is a child
+		and the second is its position in the order given by `collect`.
+	"""
+	tree, offset = node
+	if tree.right:
+		yield tree.right, offset + 1
+	if tree.left:
+		yield tree.left, offset + 1 + (tree.right.nodes if tree.right else 0)
+
+def row_offsets(rows, n_rows):
+	"""
+	Determine the offsets of sorted `rows` in compressed sparse row form.
+
+	Parameters
+	----------
+	rows : ndarray
+		Sorted row of each pair.
+
+	n_rows : int
+		Number of rows.
+
+	Returns
+	-------
+	offsets : ndarray, shape (n_rows + 1,)
+		Offsets such that the pairs of row `i` are
+		those at `offsets[i]:offsets[i+1]`.
+	"""
+	offsets = np.zeros(n_rows + 1, dtype=np.intp)
+	np.cumsum(np.bincount(rows, minlength=n_rows), out=offsets[1:])
+	return offsets
+
+class PairBlocks:
+	"""
+	Pairs of positions found by a join, gathered as blocks that
+	pair consecutive positions in the first KDTree with consecutive
+	positions in the second, so that whole subtrees are paired
+	without enumerating their points.
+
+	Attributes
+	----------
+	blocks : tuple of list
+		Single blocks, as lists of the first row, the number
+		of rows, the first column and the number of columns.
+
+	arrays : tuple of list
+		Batches of blocks, as lists of arrays of the same.
+	"""
+	__slots__ = ('blocks', 'arrays')
+
+	def __init__(self):
+		self.blocks = ([], [], [], [])
+		self.arrays = ([], [], [], [])
+
+	def add(self, row, n_rows, col, n_cols, transpose=False):
+		"""
+		Add a block of pairs, between `n_rows` consecutive points
+		from `row` and `n_cols` consecutive points from `col`.
+
+		Parameters
+		----------
+		row : int
+			First position in the first KDTree.
+
+		n_rows : int
+			Number of positions in the first KDTree.
+
+		col : int
+			First position in the second KDTree.
+
+		n_cols : int
+			Number of positions in the second KDTree.
+
+		transpose : bool, default=False
+			Swap the rows and columns of the block.
+		"""
+		if transpose:
+			row, n_rows, col, n_cols = col, n_cols, row, n_rows
+		for block, value in zip(self.blocks, (row, n_rows, col, n_cols)):
+			block.append(value)
+
+	def add_rows(self, rows, col, n_cols):
+		"""
+		Add blocks of pairs, between each of `rows` and
+		`n_cols` consecutive points from `col`.
+
+		Parameters
+		----------
+		rows : ndarray
+			Rows of the blocks.
+
+		col : int
+			First position in the KDTree.
+
+		n_cols : int
+			Number of positions in the KDTree.
+		"""
+		if len(rows) == 0:
+			return
+		ones = np.ones(len(rows), dtype=np.intp)
+		for array, value in zip(self.arrays, (rows, ones, ones * col, ones * n_cols)):
+			array.append(value)
+
+	def expand(self):
+		"""
+		Expand the blocks of pairs into the positions of each pair.
+
+		Returns
+		-------
+		rows : ndarray, shape (n_pairs,)
+			Position in the first KDTree of each pair.
+
+		cols : ndarray, shape (n_pairs,)
+			Position in the second KDTree of each pair.
+		"""
+		rows, n_rows, cols, n_cols = (np.concatenate([np.asarray(block, dtype=np.intp)] + arrays)
+					for block, arrays in zip(self.blocks, self.arrays))
+		sizes = n_rows * n_cols
+		starts = np.cumsum(sizes) - sizes
+		within = np.arange(sizes.sum()) - np.repeat(starts, sizes)
+		width = np.repeat(n_cols, sizes)
+		return np.repeat(rows, sizes) + within // width, np.repeat(cols, sizes) + within % width
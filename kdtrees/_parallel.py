@@ -0,0 +1,243 @@
+# coding=utf-8
+
+"""Parallel Construction of KDTrees"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from . import _utils as utils
+
+def initialize(cls, build, orders, axis, n_jobs):
+	"""
+	Build a KDTree with the subtrees below its top levels
+	built in `n_jobs` worker processes.
+	See `KDTree._build`.
+
+	Parameters
+	----------
+	cls : type
+		The KDTree class to build.
+
+	build : _Build
+		The points to build the KDTree from and their settings.
+
+	orders : ndarray, shape (k, n_points)
+		Indices of `build.values` sorted along each axis.
+
+	axis : int
+		Initial axis to generate the KDTree.
+
+	n_jobs : int
+		Number of processes used to build independent subtrees.
+
+	Returns
+	-------
+	tree : KDTree
+		The root of the KDTree built from `build.values`.
+	"""
+	# Building KDTree nodes is Python work that holds the GIL, so the
+	# subtrees below the top levels are built in worker processes.
+	# Splitting one level deeper than needed for `n_jobs` subtrees
+	# evens out the work given to each process.
+	depth = int(np.ceil(np.log2(n_jobs))) + 1
+	with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+		tree = initialize_top(cls, build, orders, axis, executor, depth)
+		return resolve(cls, build, tree)
+
+def initialize_top(cls, build, orders, axis, executor, depth):
+	"""
+	Build the top `depth` levels of the KDTree,
+	submitting the subtrees below them to `executor`.
+
+	Parameters
+	----------
+	cls : type
+		The KDTree class to build.
+
+	build : _Build
+		The points being built and their settings.
+
+	orders : ndarray, shape (k, n_subtree)
+		Indices of the points of this subtree in `build.values`,
+		sorted along each axis.
+
+	axis : int
+		Axis of discrimination.
+
+	executor : ProcessPoolExecutor
+		Executor building the subtrees below the top levels.
+
+	depth : int
+		Number of levels to build before submitting subtrees.
+
+	Returns
+	-------
+	tree : KDTree or tuple
+		The root of the top levels, whose children may be
+		placeholders, or a placeholder of (future, indices)
+		of a submitted subtree, to be completed by `resolve`.
+	"""
+	if len(orders[0]) == 1:
+		return cls._initialize_recursive(build, orders, axis)
+	if depth == 0:
+		# Workers receive only the coordinates of their points, by
+		# their positions in increasing order, so that their orders
+		# break ties exactly as the orders of the whole KDTree.
+		indices = np.sort(orders[0])
+		positions = np.empty(len(build.values), dtype=np.intp)
+		positions[indices] = np.arange(len(indices))
+		future = executor.submit(build_layout, cls, build.remote(indices), positions[orders], axis)
+		return future, indices
+	tree, right_orders, left_orders = cls._partition(build, orders, axis)
+	if len(right_orders[0]) > 0:
+		tree.right = initialize_top(cls, build, right_orders, tree._next_axis(), executor, depth - 1)
+	if len(left_orders[0]) > 0:
+		tree.left = initialize_top(cls, build, left_orders, tree._next_axis(), executor, depth - 1)
+	return tree
+
+def resolve(cls, build, tree):
+	"""
+	Replace the placeholders left by `initialize_top` with
+	the subtrees built by the workers, recalculating
+	the KDTree nodes of the top levels.
+
+	Parameters
+	----------
+	cls : type
+		The KDTree class to build.
+
+	build : _Build
+		The points being built and their settings.
+
+	tree : KDTree or tuple
+		The root of the top levels, or a placeholder.
+
+	Returns
+	-------
+	tree : KDTree
+		The root of the completed KDTree.
+	"""
+	if isinstance(tree, tuple):
+		future, indices = tree
+		return from_layout(cls, build, indices, future.result())
+	if tree.right is not None:
+		tree.right = resolve(cls, build, tree.right)
+	if tree.left is not None:
+		tree.left = resolve(cls, build, tree.left)
+	tree._recalculate_nodes()
+	return tree
+
+def layout(tree):
+	"""
+	Describe the structure of a KDTree built from positions
+	as its values, in the order given by `collect`, such that
+	it can be recreated by `from_layout`.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree in question.
+
+	Returns
+	-------
+	layout : ndarray
+		The position, axis, number of nodes, number of nodes on
+		the right, height and internal path length of each KDTree node.
+	"""
+	nodes, stack = [], [tree]
+	while stack:
+		node = stack.pop()
+		nodes.append(node)
+		if node.left:
+			stack.append(node.left)
+		if node.right:
+			stack.append(node.right)
+	return np.array([(node.value, node.axis, node.nodes, node.right.nodes if node.right else 0,
+				node.height, node.path_length) for node in nodes], dtype=np.intp)
+
+def from_layout(cls, build, indices, layout):
+	"""
+	Recreate a KDTree described by `layout` from the points
+	at `indices` in `build.values`.
+
+	Parameters
+	----------
+	cls : type
+		The KDTree class to build.
+
+	build : _Build
+		The points being built and their settings.
+
+	indices : ndarray
+		Indices in `build.values` of the positions in `layout`.
+
+	layout : ndarray
+		The layout of the KDTree from `layout`.
+
+	Returns
+	-------
+	tree : KDTree
+		The root of the recreated KDTree.
+	"""
+	structure = layout.tolist()
+	config, values, coords, ids = build.config, build.values, build.coords, build.ids
+	labels, weights = build.labels, build.weights
+	trees = []
+	for position, axis, nodes, right_nodes, height, path_length in structure:
+		node = indices[position]
+		tree = cls.__new__(cls)
+		tree.value = values[node]
+		tree.coords = tree.value if config.accept is None else coords[node]
+		tree.axis = axis
+		tree.left = tree.right = None
+		tree.nodes, tree.height, tree.path_length = nodes, height, path_length
+		tree.config = config
+		tree.aggregates = None
+		tree.label = None if labels is None else labels[node]
+		tree.label_bits = None
+		tree.weight = None if weights is None else float(weights[node])
+		tree.point_id = int(ids[node])
+		if config.index is not None:
+			config.index[utils.point_key(tree.value, accept=config.accept)] = tree
+		trees.append(tree)
+	# Each KDTree node is followed by its right subtree, then its left subtree.
+	for i, (tree, (_, _, nodes, right_nodes, _, _)) in enumerate(zip(trees, structure)):
+		if right_nodes:
+			tree.right = trees[i + 1]
+		if nodes - 1 > right_nodes:
+			tree.left = trees[i + 1 + right_nodes]
+	if labels is not None:
+		# Workers keep no labels, so the label summaries
+		# are calculated here, children first.
+		for tree in reversed(trees):
+			tree._recalculate_labels()
+	return trees[0]
+
+def build_layout(cls, build, orders, axis):
+	"""
+	Build a subtree in a worker process from the coordinates
+	of its points, taking their positions as values.
+
+	Parameters
+	----------
+	cls : type
+		The KDTree class to build.
+
+	build : _Build
+		The points of the subtree, from `_Build.remote`.
+
+	orders : ndarray, shape (k, n_points)
+		Positions of the points sorted along each axis.
+
+	axis : int
+		Axis of discrimination of the root of the subtree.
+
+	Returns
+	-------
+	layout : ndarray
+		The layout of the subtree from `layout`.
+	"""
+	return layout(cls._initialize_recursive(build, orders, axis))
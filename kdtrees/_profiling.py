@@ -0,0 +1,285 @@
+# coding=utf-8
+
+"""Profiling of KDTree Operations"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import json
+import os
+import threading
+import time
+import numpy as np
+from functools import wraps
+
+from . import _utils as utils
+from ._kdtree import KDTree
+
+class Tracer:
+	"""
+	A context manager recording the wall time and number of calls
+	of KDTree operations and of the phases within them.
+
+	While active, the public operations of KDTree and the functions
+	of each phase are replaced by timed wrappers, which are removed
+	on exit. Outside of a Tracer, KDTree runs unmodified.
+	The replacement is global to the process, so other threads
+	should not run KDTree operations while the Tracer is entered
+	or exited, as they may see partly replaced functions. Only calls
+	made on the thread that entered the Tracer are recorded, while
+	calls from other threads, such as the queries of a ShardedKDTree
+	with `n_jobs`, run untimed.
+
+	Each call is recorded as an event. The time of a phase that is
+	not spent in nested phases is attributed to the innermost enclosing
+	operation, while an operation nested in another, such as `balance`
+	within `insert`, is attributed to it whole. The remaining time
+	of an operation is attributed to 'self', which for neighbor
+	queries covers the traversal, while the maintenance of the
+	candidate neighbors is its own phase, 'candidates'.
+
+	Parameters
+	----------
+	operations : list of str or None, default=None
+		Names of the KDTree methods to trace as operations.
+		If None, `Tracer.OPERATIONS` is used.
+
+	Attributes
+	----------
+	events : list
+		List of (name, category, start, duration, thread) for each
+		recorded call, in order of completion, where `category` is
+		'operation' or 'phase' and times are in seconds.
+
+	Examples
+	--------
+	>>> from kdtrees import KDTree, Tracer
+	>>> with Tracer() as tracer:
+	...     tree = KDTree.initialize([[1, 2], [3, 4], [5, 6]])
+	...     neighbors = tree.nearest_neighbor([2, 2])
+	>>> tracer.summary()['nearest_neighbor']['count']
+	1
+	"""
+	OPERATIONS = ('initialize', 'insert', 'delete', 'update', 'search', 'collect', 'to_array',
+				'balance', 'wait_rebuilds', 'nearest_neighbor', 'proximal_neighbor', 'query_radius',
+				'query_tree', 'closest_pairs', 'kernel_density')
+	PHASES = {
+		'check_dimensionality': (utils, 'check_dimensionality'),
+		'coordinates': (utils, 'coordinates'),
+		'distance': (utils, 'distance'),
+		'rebuild': (KDTree, '_rebuild'),
+		'candidates': (KDTree, '_insert_candidate'),
+	}
+	_active = None
+
+	def __init__(self, operations=None):
+		self.operations = Tracer.OPERATIONS if operations is None else tuple(operations)
+		for name in self.operations:
+			if not callable(getattr(KDTree, name, None)):
+				raise ValueError("KDTree has no operation " + str(name))
+		self.events = []
+		self._stats = {}
+		self._lock = threading.Lock()
+		self._local = threading.local()
+		self._originals = []
+		self._origin = None
+		self._thread = None
+
+	def __enter__(self):
+		if Tracer._active is not None:
+			raise ValueError("Another Tracer is already active")
+		Tracer._active = self
+		self._origin = time.perf_counter()
+		self._thread = threading.get_ident()
+		for name in self.operations:
+			self._patch(KDTree, name, name, 'operation')
+		for phase, (owner, name) in Tracer.PHASES.items():
+			self._patch(owner, name, phase, 'phase')
+		return self
+
+	def __exit__(self, *exc):
+		for owner, name, original in reversed(self._originals):
+			setattr(owner, name, original)
+		self._originals = []
+		Tracer._active = None
+		return False
+
+	def _patch(self, owner, attr, name, category):
+		"""
+		Replace a function with a timed wrapper until the Tracer exits.
+
+		Parameters
+		----------
+		owner : class or module
+			Owner of the function.
+
+		attr : str
+			Attribute of the function on `owner`.
+
+		name : str
+			Name to record calls under.
+
+		category : {'operation', 'phase'}
+			Category of the calls.
+		"""
+		original = owner.__dict__[attr]
+		static = isinstance(original, staticmethod)
+		func = original.__func__ if static else original
+		tracer = self
+
+		@wraps(func)
+		def traced(*args, **kwargs):
+			return tracer._call(func, name, category, args, kwargs)
+
+		self._originals.append((owner, attr, original))
+		setattr(owner, attr, staticmethod(traced) if static else traced)
+
+	def _call(self, func, name, category, args, kwargs):
+		"""
+		Call a traced function, recording its event.
+
+		Parameters
+		----------
+		func : callable
+			The original function.
+
+		name : str
+			Name to record the call under.
+
+		category : {'operation', 'phase'}
+			Category of the call.
+
+		args : tuple
+			Positional arguments of the call.
+
+		kwargs : dict
+			Keyword arguments of the call.
+
+		Returns
+		-------
+		result : object
+			The result of the call.
+		"""
+		if threading.get_ident() != self._thread:
+			return func(*args, **kwargs)
+		stack = getattr(self._local, 'stack', None)
+		if stack is None:
+			stack = self._local.stack = []
+		# Recursive calls are part of the outermost call.
+		if any(frame[0] == name for frame in stack):
+			return func(*args, **kwargs)
+		frame = [name, category, 0.0]
+		stack.append(frame)
+		start = time.perf_counter()
+		try:
+			return func(*args, **kwargs)
+		finally:
+			duration = time.perf_counter() - start
+			stack.pop()
+			if stack:
+				stack[-1][2] += duration
+			parent = next((f[0] for f in reversed(stack) if f[1] == 'operation'), None)
+			with self._lock:
+				self.events.append((name, category, start - self._origin, duration,
+							threading.get_ident()))
+				if category == 'operation':
+					self._add(name, None, duration)
+					self._add(name, 'self', duration - frame[2])
+					if stack:
+						self._add(parent, name, duration)
+				else:
+					self._add(parent, name, duration - frame[2])
+
+	def _add(self, operation, phase, duration):
+		"""
+		Add a call to the statistics of an operation.
+
+		Parameters
+		----------
+		operation : str or None
+			Name of the operation.
+
+		phase : str or None
+			Name of the phase, or None for the operation as a whole.
+
+		duration : float
+			Time of the call, in seconds.
+		"""
+		calls = self._stats.setdefault(operation, {}).setdefault(phase, [0, 0.0])
+		calls[0] += 1
+		calls[1] += duration
+
+	def summary(self):
+		"""
+		Aggregate the recorded calls of each operation.
+
+		Returns
+		-------
+		summary : dict
+			Dictionary mapping the name of each operation to a dictionary
+			of its 'count' and total 'time' in seconds, and its 'phases',
+			mapping each phase and nested operation to its 'count'
+			and 'time'. Phases called outside of any operation
+			are kept under None.
+		"""
+		summary = {}
+		with self._lock:
+			for operation, stats in self._stats.items():
+				count, total = stats.get(None, (0, 0.0))
+				phases = {phase: {'count': calls[0], 'time': calls[1]}
+							for phase, calls in stats.items() if phase is not None}
+				summary[operation] = {'count': count, 'time': total, 'phases': phases}
+		return summary
+
+	def histogram(self, name, bins=10):
+		"""
+		Compute the histogram of the durations of all calls
+		recorded under `name`.
+
+		Parameters
+		----------
+		name : str
+			Name of the operation or phase.
+
+		bins : int or sequence of scalars, default=10
+			Bins of the histogram, as with `numpy.histogram`.
+
+		Returns
+		-------
+		counts : ndarray
+			Number of calls in each bin.
+
+		edges : ndarray
+			Edges of the bins, in seconds.
+		"""
+		with self._lock:
+			durations = [event[3] for event in self.events if event[0] == name]
+		return np.histogram(durations, bins=bins)
+
+	def to_chrome_trace(self, path=None):
+		"""
+		Export the recorded calls as Chrome trace events, viewable
+		in chrome://tracing or Perfetto.
+
+		Parameters
+		----------
+		path : str or None, default=None
+			File to write the trace to as JSON. If None,
+			the trace is only returned.
+
+		Returns
+		-------
+		trace : dict
+			The trace, with complete events in microseconds
+			under 'traceEvents'.
+		"""
+		pid = os.getpid()
+		with self._lock:
+			events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': start * 1e6,
+						'dur': duration * 1e6, 'pid': pid, 'tid': tid}
+						for name, category, start, duration, tid in self.events]
+		trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+		if path is not None:
+			with open(path, 'w') as f:
+				json.dump(trace, f)
+		return trace
@@ -0,0 +1,124 @@
+# coding=utf-8
+
+"""Batched Radius Queries of KDTrees"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import numpy as np
+
+from . import _utils as utils
+from ._pairs import PairBlocks, children, row_offsets
+
+def query_radius(tree, points, d, return_distance=False, sort_results=False):
+	"""
+	Determine the points of `tree` within `d` distance
+	of each of `points`. See `KDTree.query_radius`.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree to query.
+
+	points : array-like, shape (n_points, k)
+		The query points, where the last axis denotes the features.
+
+	d : float or array-like, shape (n_points,)
+		The maximum acceptable distance for neighbors,
+		either shared by all queries or for each query.
+
+	return_distance : bool, default=False
+		Return the distances of the neighbors to their query.
+
+	sort_results : bool, default=False
+		Sort the neighbors of each query based on proximity
+		instead of their positions.
+
+	Returns
+	-------
+	offsets : ndarray, shape (n_points + 1,)
+		Offsets into `indices` in compressed sparse row form.
+
+	indices : ndarray, shape (n_neighbors,)
+		Positions of the neighbors of each query.
+
+	distances : ndarray, shape (n_neighbors,)
+		Distances of the neighbors to their query.
+		Only returned if `return_distance` is True.
+	"""
+	if tree.config.accept is not None:
+		raise ValueError("Radius queries cannot be batched if accept is used")
+	points = np.asarray(points, dtype=np.float64)
+	if points.ndim != 2 or tree.config.k != utils.check_dimensionality(points):
+		raise ValueError("Points must be same dimensionality as the KDTree")
+	radii = np.broadcast_to(np.asarray(d, dtype=np.float64), (len(points),))
+	if np.any(radii < 0):
+		raise ValueError("Distance must be non-negative")
+	query = _RadiusQuery(points, radii)
+	query.visit((tree, 0), np.arange(len(points)))
+	rows, cols = query.blocks.expand()
+	if return_distance or sort_results:
+		diff = np.subtract(points[rows], tree.to_array()[cols], dtype=np.float64)
+		distances = np.linalg.norm(diff, axis=-1)
+	order = np.lexsort((distances if sort_results else cols, rows))
+	rows, cols = rows[order], cols[order]
+	offsets = row_offsets(rows, len(points))
+	if return_distance:
+		return offsets, cols, distances[order]
+	return offsets, cols
+
+class _RadiusQuery:
+	"""
+	Single traversal of a KDTree shared by all queries of
+	`query_radius`, carrying along the queries that remain
+	undecided at each KDTree node. KDTree nodes are passed with
+	their positions in the order given by `collect`.
+
+	Parameters
+	----------
+	points : ndarray, shape (n_points, k)
+		All query points.
+
+	radii : ndarray, shape (n_points,)
+		The maximum acceptable distance for each query.
+
+	Attributes
+	----------
+	blocks : PairBlocks
+		Blocks of pairs of queries and neighbors found so far.
+	"""
+	__slots__ = ('points', 'radii', 'blocks')
+
+	def __init__(self, points, radii):
+		self.points = points
+		self.radii = radii
+		self.blocks = PairBlocks()
+
+	def visit(self, node, active):
+		"""
+		Pair the queries in `active` with their neighbors in a KDTree.
+
+		Parameters
+		----------
+		node : tuple
+			The KDTree and its position.
+
+		active : ndarray
+			Indices of the queries that may have neighbors
+			in the KDTree.
+		"""
+		tree, offset = node
+		query, radius = self.points[active], self.radii[active]
+		near = np.maximum(np.maximum(tree.lower - query, query - tree.upper), 0)
+		far = np.maximum(np.abs(query - tree.lower), np.abs(query - tree.upper))
+		near, far = np.linalg.norm(near, axis=-1), np.linalg.norm(far, axis=-1)
+		inside = far <= radius
+		self.blocks.add_rows(active[inside], offset, tree.nodes)
+		undecided = (near <= radius) & ~inside
+		active, query, radius = active[undecided], query[undecided], radius[undecided]
+		if len(active) == 0:
+			return
+		dist = np.linalg.norm(query - tree.coords, axis=-1)
+		self.blocks.add_rows(active[dist <= radius], offset, 1)
+		for child in children(node):
+			self.visit(child, active)
@@ -0,0 +1,237 @@
+# coding=utf-8
+
+"""Background Rebuilds of KDTrees"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from . import _utils as utils
+
+def schedule(tree, split):
+	"""
+	Rebuild `tree` from a snapshot of its points in a
+	background thread, unless a rebuild is already pending.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree node to rebuild.
+
+	split : str
+		Rule used to choose the axis and point of discrimination.
+	"""
+	config = tree.config
+	with config.lock:
+		if id(tree) in config.pending:
+			return
+		# Nodes built in the background must not register in the
+		# index until they are swapped in.
+		build = tree._snapshot(split, config.unindexed())
+		if config.executor is None:
+			config.executor = ThreadPoolExecutor(max_workers=1)
+		future = config.executor.submit(type(tree)._build, build, None, tree.axis)
+		config.pending[id(tree)] = _Rebuild(tree, future)
+
+def claim(tree, op=None, point=None, coords=None, tags=None):
+	"""
+	Swap in the completed background rebuild of `tree`,
+	if any. While the rebuild is incomplete, record `op` instead,
+	so that it is replayed onto the rebuilt KDTree.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree node about to be modified.
+
+	op : {'insert', 'delete', 'update'} or None, default=None
+		Modification about to be made to `tree`.
+		Updates may move points out of the KDTree, and so mark
+		the rebuild as stale rather than being recorded.
+
+	point : array-like or object or None, default=None
+		The point inserted or deleted.
+
+	coords : ndarray or None, default=None
+		Numeric coordinates of `point`.
+
+	tags : dict or None, default=None
+		ID, label and weight of the point inserted, as in `KDTree._tags`.
+
+	Returns
+	-------
+	tree : KDTree
+		The rebuilt KDTree if it was swapped in, `tree` otherwise.
+	"""
+	config = tree.config
+	with config.lock:
+		rebuild = config.pending.get(id(tree))
+		if rebuild is None:
+			return tree
+		if not rebuild.future.done():
+			if op == 'update':
+				rebuild.stale = True
+			elif op is not None:
+				rebuild.log.append((op, point, coords, tags))
+			return tree
+		del config.pending[id(tree)]
+	if rebuild.stale:
+		return tree
+	rebuilt = rebuild.future.result()
+	rebalance = not config.deferred
+	for op, point, coords, tags in rebuild.log:
+		if op == 'insert':
+			rebuilt = rebuilt._insert(point, coords, rebalance, tags)
+		else:
+			rebuilt = rebuilt._delete(point, coords, rebalance)
+		if rebuilt is None:
+			# `tree` holds the same points, so it is empty as well.
+			return tree
+	# The index already reflects the replayed modifications,
+	# so only the final points are registered.
+	if rebuilt.config is not config:
+		adopt(rebuilt, config)
+	if config.pending:
+		discard(tree)
+	return rebuilt
+
+def discard(tree):
+	"""
+	Discard the pending background rebuilds of KDTree nodes
+	below `tree`, which has been replaced.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree node that has been replaced.
+	"""
+	config = tree.config
+	with config.lock:
+		for key, rebuild in list(config.pending.items()):
+			current, node = tree, rebuild.node
+			while current is not None and current is not node:
+				current = current.right if node.coords[current.axis] >= current.coords[current.axis] \
+							else current.left
+			if current is node:
+				rebuild.future.cancel()
+				del config.pending[key]
+
+def mark_stale(tree):
+	"""
+	Mark the pending background rebuild of `tree`, if any,
+	as stale, as `tree` has changed in a way that cannot be replayed.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree node that has changed.
+	"""
+	config = tree.config
+	with config.lock:
+		rebuild = config.pending.get(id(tree))
+		if rebuild is not None:
+			rebuild.stale = True
+
+def adopt(tree, config):
+	"""
+	Share `config` across all KDTree nodes of `tree`,
+	registering each KDTree node in its index.
+
+	Parameters
+	----------
+	tree : KDTree
+		The rebuilt KDTree.
+
+	config : KDTreeConfig
+		The configuration to share.
+	"""
+	stack = [tree]
+	while stack:
+		node = stack.pop()
+		node.config = config
+		if config.index is not None:
+			config.index[utils.point_key(node.value, accept=config.accept)] = node
+		stack += [child for child in (node.right, node.left) if child]
+
+def wait_rebuilds(tree):
+	"""
+	Wait for all background rebuilds of `tree` and swap
+	in those that remain valid. See `KDTree.wait_rebuilds`.
+
+	Parameters
+	----------
+	tree : KDTree
+		The root of the KDTree.
+
+	Returns
+	-------
+	tree : KDTree
+		The root of the KDTree with all rebuilds swapped in.
+	"""
+	config = tree.config
+	with config.lock:
+		futures = [rebuild.future for rebuild in config.pending.values()]
+	wait(futures)
+	swapped = swap_recursive(tree)
+	with config.lock:
+		config.pending.clear()
+	return tree._keep_root(swapped)
+
+def swap_recursive(tree):
+	"""
+	Swap in the completed background rebuilds of `tree` top-down,
+	recalculating the KDTree nodes above them.
+
+	Parameters
+	----------
+	tree : KDTree
+		The KDTree in question.
+
+	Returns
+	-------
+	tree : KDTree
+		The root of the KDTree with completed rebuilds swapped in.
+	"""
+	if not tree.config.pending:
+		return tree
+	rebuilt = claim(tree)
+	if rebuilt is not tree:
+		return rebuilt
+	if tree.right:
+		tree.right = swap_recursive(tree.right)
+	if tree.left:
+		tree.left = swap_recursive(tree.left)
+	tree._recalculate_nodes()
+	return tree
+
+class _Rebuild:
+	"""
+	A background rebuild of a KDTree node.
+
+	Parameters
+	----------
+	node : KDTree
+		The KDTree node being rebuilt.
+
+	future : Future
+		Future of the root of the rebuilt KDTree.
+
+	Attributes
+	----------
+	log : list
+		List of ('insert' or 'delete', point, coords, tags) made to the
+		KDTree node since the rebuild started, to be replayed onto
+		the rebuilt KDTree.
+
+	stale : bool
+		True if the KDTree node has changed in a way that cannot be
+		replayed, such that the rebuild must be discarded.
+	"""
+	__slots__ = ('node', 'future', 'log', 'stale')
+
+	def __init__(self, node, future):
+		self.node = node
+		self.future = future
+		self.log = []
+		self.stale = False
@@ -0,0 +1,583 @@
+# coding=utf-8
+
+"""Sharded K-D Tree"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import warnings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from . import _utils as utils
+from ._kdtree import KDTree
+from ._kdtree_type import KDTreeType
+
+class ShardedKDTree:
+	"""
+	An index of points split across independent KDTrees, or shards.
+	Queries fan out to the relevant shards and merge their results,
+	while each shard can be modified or rebuilt without blocking
+	the others.
+
+	Modifications and rebuilds of a shard hold its lock, so that they
+	wait for each other. Queries of a shard hold its query lock, which
+	`insert` and `delete` also hold as they modify the shard in place,
+	so that queries never observe a shard part way through a
+	modification. `rebuild` builds the replacement shard without the
+	query lock, such that queries continue on the previous shard
+	until the rebuilt shard replaces it whole.
+
+	Points are assigned to shards either spatially, by the
+	top levels of median splits along the axes of maximum spread,
+	or by the hash of each point.
+
+	Parameters
+	----------
+	shards : list of KDTree or None
+		The shards of the index. Empty shards are None.
+
+	k : int
+		Dimensionality of the points.
+
+	partition : {'spatial', 'hash'}, default='spatial'
+		Rule used to assign points to shards.
+
+	routing : tuple, int or None, default=None
+		Splits assigning points to shards if `partition` is 'spatial',
+		as nested tuples of (axis, threshold, left, right) ending in
+		the index of a shard.
+
+	accept : KDTreeType or None, default=None
+		Override and allow custom types to be accepted.
+
+	dtype : data-type or None, default=None
+		Storage data-type of the points.
+
+	index : bool, default=False
+		Maintain a hash index beside each shard.
+
+	split : {'round_robin', 'max_spread', 'sliding_midpoint'}, default='round_robin'
+		Rule used to choose the axis and point of discrimination
+		within each shard.
+
+	n_jobs : int or None, default=None
+		Number of threads used to query shards concurrently on
+		free-threaded builds of Python. Traversals of shards are
+		Python code, which threads only interleave while the global
+		interpreter lock is held, so shards are then queried in turn
+		and more than one job warns with a RuntimeWarning.
+		None or 1 queries on a single thread; negative values
+		count back from the number of CPUs.
+	"""
+	PARTITIONS = ('spatial', 'hash')
+
+	def __init__(self, shards, k, partition='spatial', routing=None, accept=None, dtype=None,
+				index=False, split='round_robin', n_jobs=None):
+		if partition not in ShardedKDTree.PARTITIONS:
+			raise ValueError("Partition must be one of " + ", ".join(ShardedKDTree.PARTITIONS))
+		if len(shards) < 1:
+			raise ValueError("Must contain at least one shard")
+		self.shards = list(shards)
+		self.k = k
+		self.partition = partition
+		self.routing = 0 if routing is None else routing
+		self.accept = accept
+		self.dtype = dtype
+		self.index = index
+		self.split = split
+		self._locks = [Lock() for _ in self.shards]
+		self._query_locks = [Lock() for _ in self.shards]
+		n_jobs = utils.effective_n_jobs(n_jobs)
+		self._executor = None
+		if n_jobs > 1 and utils.gil_enabled():
+			warnings.warn("Shards are queried on a single thread, as Python runs "
+						"with the global interpreter lock", RuntimeWarning)
+		elif n_jobs > 1:
+			self._executor = ThreadPoolExecutor(max_workers=n_jobs)
+
+	@staticmethod
+	def initialize(points, n_shards=2, partition='spatial', k=None, accept=None, dtype=None,
+				index=False, split='round_robin', n_jobs=None):
+		"""
+		Initialize a ShardedKDTree from a list of points, building
+		each shard with `KDTree.initialize`.
+
+		Parameters
+		----------
+		points : array-like, shape (n_points, *)
+			List of points to build a ShardedKDTree where the last axis denotes the features.
+			If `accept` is a KDTreeType, list can contain this type.
+
+		n_shards : int, default=2
+			Number of shards.
+
+		partition : {'spatial', 'hash'}, default='spatial'
+			Rule used to assign points to shards.
+
+		k : int or None, default=None
+			Dimensionality of the points. If None, `initialize` will self-detect.
+
+		accept : KDTreeType or None, default=None
+			Override and allow a custom type to be accepted.
+
+		dtype : data-type or None, default=None
+			Storage data-type of the points.
+
+		index : bool, default=False
+			Maintain a hash index beside each shard.
+
+		split : {'round_robin', 'max_spread', 'sliding_midpoint'}, default='round_robin'
+			Rule used to choose the axis and point of discrimination
+			within each shard.
+
+		n_jobs : int or None, default=None
+			Number of processes used to build each shard, as in
+			`KDTree.initialize`, and of threads used to query shards
+			concurrently, as in `ShardedKDTree`, which warns if
+			Python runs with the global interpreter lock.
+
+		Returns
+		-------
+		tree : ShardedKDTree
+			The ShardedKDTree built from `points`.
+		"""
+		if accept is not None and not issubclass(accept, KDTreeType):
+			raise ValueError("Accept must be a subclass of KDTreeType")
+		if partition not in ShardedKDTree.PARTITIONS:
+			raise ValueError("Partition must be one of " + ", ".join(ShardedKDTree.PARTITIONS))
+		if not isinstance(n_shards, (int, np.integer)) or n_shards < 1:
+			raise ValueError("n_shards must be a positive int")
+		n_shards = int(n_shards)
+		if k is None:
+			k = utils.check_dimensionality(*points, accept=accept)
+		if accept is None:
+			points = utils.storage_point(points, dtype)
+			if points is None:
+				raise ValueError("Points cannot be represented by the dtype of the ShardedKDTree")
+		else:
+			values = np.empty(len(points), dtype=object)
+			for i, point in enumerate(points):
+				values[i] = point
+			points = values
+		assignment = np.zeros(len(points), dtype=np.intp)
+		routing = None
+		if partition == 'spatial':
+			coords = np.empty((len(points), k), dtype=np.float64)
+			for i, point in enumerate(points):
+				coords[i] = utils.coordinates(point, k, accept=accept)
+			routing = ShardedKDTree._partition(coords, np.arange(len(points)), 0, n_shards, assignment)
+		else:
+			for i, point in enumerate(points):
+				assignment[i] = hash(utils.point_key(point, accept=accept)) % n_shards
+		tree = ShardedKDTree([None] * n_shards, k, partition=partition, routing=routing,
+					accept=accept, dtype=dtype, index=index, split=split, n_jobs=n_jobs)
+		for i in range(n_shards):
+			if np.any(assignment == i):
+				tree.shards[i] = tree._build(points[assignment == i], n_jobs)
+		return tree
+
+	@staticmethod
+	def _partition(coords, indices, first, n_shards, assignment):
+		"""
+		Recursively split points among `n_shards` shards at the
+		quantile along their axis of maximum spread that
+		is proportional to the number of shards on each side.
+
+		Parameters
+		----------
+		coords : ndarray, shape (n_points, k)
+			Numeric coordinates of all points.
+
+		indices : ndarray
+			Indices of the points to split.
+
+		first : int
+			Index of the first shard to assign points to.
+
+		n_shards : int
+			Number of shards to assign points to.
+
+		assignment : ndarray, shape (n_points,)
+			Shard of each point, assigned in place.
+
+		Returns
+		-------
+		routing : tuple or int
+			Splits assigning points to the shards, as nested tuples
+			of (axis, threshold, left, right) ending in the index of a shard.
+		"""
+		if n_shards == 1 or len(indices) == 0:
+			assignment[indices] = first
+			return first
+		points = coords[indices]
+		axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+		order = np.argsort(points[:,axis], kind='stable')
+		sorted_coords = points[order, axis]
+		n_left = n_shards // 2
+		# Never split within a run of equal coordinates, so that
+		# all points on the left are strictly less along `axis`.
+		median = int(np.searchsorted(sorted_coords, sorted_coords[len(order) * n_left // n_shards]))
+		left = ShardedKDTree._partition(coords, indices[order[:median]], first, n_left, assignment)
+		right = ShardedKDTree._partition(coords, indices[order[median:]], first + n_left,
+					n_shards - n_left, assignment)
+		return (axis, sorted_coords[median], left, right)
+
+	def _build(self, points, n_jobs=None):
+		"""
+		Build a shard from a list of points.
+
+		Parameters
+		----------
+		points : array-like, shape (n_points, *)
+			List of points to build the shard from.
+
+		n_jobs : int or None, default=None
+			Number of processes used to build the shard.
+
+		Returns
+		-------
+		shard : KDTree
+			The shard built from `points`.
+		"""
+		return KDTree.initialize(points, k=self.k, accept=self.accept, dtype=self.dtype,
+					index=self.index, split=self.split, n_jobs=n_jobs)
+
+	def _map(self, func, items):
+		"""
+		Apply `func` to each of `items`, concurrently if the
+		ShardedKDTree queries shards on more than one thread.
+
+		Parameters
+		----------
+		func : callable
+			Function to apply.
+
+		items : iterable
+			Arguments to apply `func` to.
+
+		Returns
+		-------
+		results : list
+			Results of `func` for each of `items`.
+		"""
+		items = list(items)
+		if self._executor is None or len(items) <= 1:
+			return [func(item) for item in items]
+		return list(self._executor.map(func, items))
+
+	def _query(self, i, func):
+		"""
+		Apply `func` to shard `i` while holding its query lock,
+		so that the shard is not modified in place meanwhile.
+
+		Parameters
+		----------
+		i : int
+			Index of the shard to query.
+
+		func : callable
+			Function of the shard to apply.
+
+		Returns
+		-------
+		result : object or None
+			Result of `func`, or None if shard `i` is empty.
+		"""
+		with self._query_locks[i]:
+			shard = self.shards[i]
+			return None if shard is None else func(shard)
+
+	def close(self):
+		"""
+		Release the threads used to query shards concurrently,
+		if any. Later queries run on a single thread.
+		"""
+		if self._executor is not None:
+			self._executor.shutdown()
+			self._executor = None
+
+	@property
+	def nodes(self):
+		"""
+		Number of points in the ShardedKDTree.
+		"""
+		return sum(shard.nodes for shard in self.shards if shard is not None)
+
+	def _check_point(self, point):
+		"""
+		Validate `point` for the ShardedKDTree.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point, where the last axis denotes the features.
+
+		Returns
+		-------
+		point : ndarray or object
+			The validated point, cast to `dtype` by each shard as needed.
+		"""
+		if self.accept is None:
+			point = np.asarray(point)
+		if self.k != utils.check_dimensionality(point, accept=self.accept):
+			raise ValueError("Point must be same dimensionality as the ShardedKDTree")
+		return point
+
+	def _route(self, point):
+		"""
+		Determine the shard that holds or would hold `point`.
+
+		Parameters
+		----------
+		point : array-like or object
+			The validated point.
+
+		Returns
+		-------
+		shard : int
+			Index of the shard for `point`.
+		"""
+		if self.accept is None:
+			# Points are routed as they are stored.
+			point = np.asarray(point, dtype=self.dtype)
+		if self.partition == 'hash':
+			return hash(utils.point_key(point, accept=self.accept)) % len(self.shards)
+		coords = utils.coordinates(point, self.k, accept=self.accept)
+		routing = self.routing
+		while not isinstance(routing, int):
+			axis, threshold, left, right = routing
+			routing = right if coords[axis] >= threshold else left
+		return routing
+
+	def _relevant(self, point, d):
+		"""
+		Determine the shards that may hold points within `d`
+		distance of `point`, from the bounding box of each shard.
+
+		Parameters
+		----------
+		point : array-like or object
+			The validated query point.
+
+		d : float
+			The maximum distance of interest.
+
+		Returns
+		-------
+		shards : list of int
+			Indices of the shards that may hold such points.
+		"""
+		if self.accept is not None:
+			return [i for i, shard in enumerate(self.shards) if shard is not None]
+		coords = utils.coordinates(point, self.k)
+		near = [self._query(i, lambda shard: utils.box_distances(coords, coords,
+					shard.lower, shard.upper)[0]) for i in range(len(self.shards))]
+		return [i for i in range(len(self.shards)) if near[i] is not None and near[i] <= d]
+
+	def insert(self, point):
+		"""
+		Insert a point into the shard that it is assigned to.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) to be inserted,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : ShardedKDTree
+			The ShardedKDTree with `point` inserted.
+		"""
+		point = self._check_point(point)
+		if self.accept is None and utils.storage_point(point, self.dtype) is None:
+			raise ValueError("Point cannot be represented by the dtype of the ShardedKDTree")
+		i = self._route(point)
+		with self._locks[i], self._query_locks[i]:
+			if self.shards[i] is None:
+				self.shards[i] = self._build([point])
+			else:
+				self.shards[i] = self.shards[i].insert(point)
+		return self
+
+	def delete(self, point):
+		"""
+		Delete a point from the shard that it is assigned to.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) to be deleted,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : ShardedKDTree
+			The ShardedKDTree with `point` removed.
+		"""
+		point = self._check_point(point)
+		i = self._route(point)
+		with self._locks[i], self._query_locks[i]:
+			if self.shards[i] is not None:
+				self.shards[i] = self.shards[i].delete(point)
+		return self
+
+	def rebuild(self, i):
+		"""
+		Rebuild shard `i` from its points. Only modifications
+		of shard `i` wait for the rebuild, while queries continue
+		on the previous shard until the rebuilt shard replaces it.
+
+		Parameters
+		----------
+		i : int
+			Index of the shard to rebuild.
+
+		Returns
+		-------
+		tree : ShardedKDTree
+			The ShardedKDTree with shard `i` rebuilt.
+		"""
+		with self._locks[i]:
+			if self.shards[i] is not None:
+				self.shards[i] = self.shards[i]._rebuild()
+		return self
+
+	def collect(self):
+		"""
+		Collect all values in the ShardedKDTree as a list,
+		ordered by shard.
+
+		Returns
+		-------
+		values : list
+			A list of all the values in the ShardedKDTree.
+		"""
+		values = []
+		for i in range(len(self.shards)):
+			values += self._query(i, KDTree.collect) or []
+		return values
+
+	def search(self, point):
+		"""
+		Search the shard that `point` is assigned to.
+		Returns the KDTree node if found, None otherwise.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) being searched,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : KDTree or None
+			The KDTree node whose value matches the point.
+			None if the point was not found.
+		"""
+		point = self._check_point(point)
+		return self._query(self._route(point), lambda shard: shard.search(point))
+
+	def nearest_neighbor(self, point, n=1):
+		"""
+		Determine the `n` nearest points to `point` and their distances.
+
+		The shard that `point` is assigned to is searched first.
+		All other shards are then searched, concurrently if `n_jobs`
+		allows, unless their bounding boxes lie beyond the `n`
+		neighbors found so far.
+
+		Parameters
+		----------
+		point : array-like or object
+			The query point (KDTreeType if `accept` is used),
+			where the last axis denotes the features.
+
+		n : int, default=1
+			The number of neighbors to search for.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n, 2)
+			The array of `n` pairs, referring to `n` nearest neighbors,
+			sorted based on proximity. The first value in the pair is the
+			point, while the second is the distance to `point`.
+		"""
+		point = self._check_point(point)
+		query = lambda shard: shard.nearest_neighbor(point, n=n)
+		first = self._route(point)
+		result = self._query(first, query)
+		results = [] if result is None else [result]
+		bound = results[0][-1,1] if results else np.inf
+		shards = [i for i in self._relevant(point, bound) if i != first]
+		results += self._map(lambda i: self._query(i, query), shards)
+		return ShardedKDTree._merge([result for result in results if result is not None], n)
+
+	def proximal_neighbor(self, point, d=0):
+		"""
+		Determine the points that are within `d` distance
+		to `point` and their distances, searching all shards
+		whose bounding boxes lie within `d`, concurrently
+		if `n_jobs` allows.
+
+		Parameters
+		----------
+		point : array-like or object
+			The query point (KDTreeType if `accept` is used),
+			where the last axis denotes the features.
+
+		d : int, default=0
+			The maximum acceptable distance for neighbors.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n_neighbors, 2)
+			The array of pairs, referring to proximal neighbors within
+			`d` distance from `point`, sorted based on proximity.
+			If `d` is 0, a list of the KDTree node matching `point`
+			and its distance, as with `KDTree.proximal_neighbor`.
+		"""
+		point = self._check_point(point)
+		if d == 0:
+			result = self._query(self._route(point), lambda shard: shard.proximal_neighbor(point, d=0))
+			return [] if result is None else result
+		results = self._map(lambda i: self._query(i, lambda shard: shard.proximal_neighbor(point, d=d)),
+					self._relevant(point, d))
+		return ShardedKDTree._merge([result for result in results if result is not None])
+
+	@staticmethod
+	def _merge(results, n=None):
+		"""
+		Merge the neighbors found in each shard.
+
+		Parameters
+		----------
+		results : list
+			Arrays of pairs of points and their distances, from each shard.
+
+		n : int or None, default=None
+			The number of neighbors to keep, padded with (None, inf).
+			None keeps all neighbors.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n_neighbors, 2)
+			The array of pairs, sorted based on proximity.
+		"""
+		values, dists = [], []
+		for result in results:
+			for value, dist in result:
+				if value is not None:
+					values.append(value)
+					dists.append(dist)
+		order = np.argsort(np.asarray(dists, dtype=np.float64), kind='stable')
+		n = len(order) if n is None else n
+		neighbors = np.empty((n, 2), dtype=object)
+		neighbors[:,0] = None
+		neighbors[:,1] = np.inf
+		for i, j in enumerate(order[:n]):
+			neighbors[i,0] = values[j]
+			neighbors[i,1] = dists[j]
+		return neighbors
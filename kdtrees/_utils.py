@@ -5,8 +5,13 @@
 # Authors: Jeffrey Wang
 # License: BSD 3 clause
 
+import os
+import sys
+import math
 import numpy as np
 
+KERNELS = ('gaussian', 'tophat', 'epanechnikov', 'exponential', 'linear')
+
 def check_dimensionality(*args, accept=None):
 	"""
 	Check that all arguments have the same dimensionality.
@@ -45,7 +50,7 @@ def check_dimensionality(*args, accept=None):
 		print(args)
 		raise AttributeError("Arguments must contain attribute `dim`")
 
-def distance(obj1, obj2, accept=None):
+def distance(obj1, obj2, accept=None, dtype=None):
 	"""
 	Calculate the distance between `obj1` and `obj2`,
 	using norm.
@@ -66,6 +71,10 @@ def distance(obj1, obj2, accept=None):
 	accept : None or object, default=None
 		Accept override type. Use the `distance` function of this type.
 
+	dtype : data-type or None, default=None
+		Storage data-type of `obj1` and `obj2`. The distance is
+		accumulated in `accumulation_dtype(dtype)`.
+
 	Returns
 	-------
 	distance : int
@@ -75,5 +84,254 @@ def distance(obj1, obj2, accept=None):
 		if isinstance(obj1, accept) and isinstance(obj2, accept):
 			return obj1.distance(obj2)
 		raise ValueError("`obj1` and `obj2` must be the same type as `accept`")
+	elif dtype is not None:
+		return np.linalg.norm(np.subtract(obj1, obj2, dtype=accumulation_dtype(dtype)))
 	else:
 		return np.linalg.norm(obj1 - obj2)
+
+def point_key(point, accept=None):
+	"""
+	Determine the hash key of `point`, such that points that
+	compare equal share the same key.
+
+	Parameters
+	----------
+	point : array-like or scalar or object
+		array-like or scalar where the last axis denotes the features.
+		If `accept` is an object, it can be this type.
+
+	accept : None or object, default=None
+		Accept override type. Use `point` itself, hashed with its
+		`__hash__` function.
+
+	Returns
+	-------
+	key : bytes or object
+		The hash key of `point`.
+	"""
+	if accept:
+		return point
+	# Cast to float64 so that equal points of different types share
+	# a key, and add 0.0 to fold -0.0 into 0.0.
+	return (np.asarray(point, dtype=np.float64) + 0.0).tobytes()
+
+def coordinates(point, k, accept=None):
+	"""
+	Extract the numeric coordinates of `point` along each axis.
+
+	Parameters
+	----------
+	point : array-like or object
+		The point (KDTreeType if `accept` is used),
+		where the last axis denotes the features.
+
+	k : int
+		Dimensionality of the point.
+
+	accept : None or object, default=None
+		Accept override type. Coordinates are then read
+		through `__getitem__` along each of the `k` axes.
+
+	Returns
+	-------
+	coords : ndarray, shape (k,)
+		The coordinates of `point` as float64.
+	"""
+	if accept is None:
+		return np.asarray(point, dtype=np.float64)
+	try:
+		return np.asarray([point[axis] for axis in range(k)], dtype=np.float64)
+	except (TypeError, ValueError):
+		raise ValueError("Items of accept types must be numeric")
+
+def storage_point(point, dtype=None):
+	"""
+	Cast `point` to the storage data-type `dtype`, if `dtype` can
+	represent it. Casts between floating types round to the nearest
+	representable point unless they overflow, while all other casts
+	must be exact, so that non-integral or out of range points
+	are not represented by integer types.
+
+	Parameters
+	----------
+	point : array-like or scalar
+		array-like or scalar where the last axis denotes the features.
+
+	dtype : data-type or None, default=None
+		Storage data-type. None stores points as given.
+
+	Returns
+	-------
+	point : ndarray or None
+		`point` as `dtype`, or None if `dtype` cannot represent `point`.
+	"""
+	point = np.asarray(point)
+	if dtype is None:
+		return point
+	with np.errstate(invalid='ignore', over='ignore'):
+		stored = np.asarray(point, dtype=dtype)
+	if np.issubdtype(point.dtype, np.inexact) and np.issubdtype(stored.dtype, np.inexact):
+		return None if np.any(np.isinf(stored) & np.isfinite(point)) else stored
+	return stored if np.array_equal(stored, point) else None
+
+def box_distances(lower, upper, other_lower, other_upper):
+	"""
+	Determine the minimum and maximum distances between
+	points in two bounding boxes.
+
+	Parameters
+	----------
+	lower : ndarray
+		Lower corner of the first bounding box.
+
+	upper : ndarray
+		Upper corner of the first bounding box.
+
+	other_lower : ndarray
+		Lower corner of the second bounding box.
+
+	other_upper : ndarray
+		Upper corner of the second bounding box.
+
+	Returns
+	-------
+	near : float
+		Minimum distance between the bounding boxes.
+
+	far : float
+		Maximum distance between the bounding boxes.
+	"""
+	# Corners of leaves are their coordinates at the storage data-type,
+	# which must not wrap around when subtracted.
+	near = np.maximum(np.maximum(np.subtract(lower, other_upper, dtype=np.float64),
+				np.subtract(other_lower, upper, dtype=np.float64)), 0)
+	far = np.maximum(np.abs(np.subtract(upper, other_lower, dtype=np.float64)),
+				np.abs(np.subtract(other_upper, lower, dtype=np.float64)))
+	return np.linalg.norm(near), np.linalg.norm(far)
+
+def accumulation_dtype(dtype):
+	"""
+	Determine the data-type in which distances between points
+	stored as `dtype` are accumulated. This is `dtype` itself
+	for float32 and wider floats, float32 for half precision,
+	and a float wide enough to hold integer types exactly.
+
+	Parameters
+	----------
+	dtype : data-type
+		Storage data-type of the points.
+
+	Returns
+	-------
+	acc_dtype : dtype
+		The data-type to accumulate distances in.
+	"""
+	return np.result_type(dtype, np.float32)
+
+def effective_n_jobs(n_jobs=None):
+	"""
+	Determine the number of workers to use for `n_jobs`.
+
+	Parameters
+	----------
+	n_jobs : int or None, default=None
+		Requested number of workers. None is interpreted as 1,
+		while negative values count back from the number of CPUs,
+		such that -1 uses all CPUs.
+
+	Returns
+	-------
+	n_jobs : int
+		The number of workers, at least 1.
+	"""
+	if n_jobs is None:
+		return 1
+	if not isinstance(n_jobs, (int, np.integer)) or n_jobs == 0:
+		raise ValueError("n_jobs must be a non-zero int or None")
+	if n_jobs < 0:
+		n_jobs = (os.cpu_count() or 1) + 1 + n_jobs
+	return max(int(n_jobs), 1)
+
+def gil_enabled():
+	"""
+	Determine if Python runs with the global interpreter lock,
+	such that threads cannot run Python code concurrently.
+
+	Returns
+	-------
+	enabled : bool
+		False only on free-threaded builds of Python
+		running without the global interpreter lock.
+	"""
+	return getattr(sys, '_is_gil_enabled', lambda: True)()
+
+def kernel(dist, bandwidth, kernel='gaussian'):
+	"""
+	Evaluate the unnormalized `kernel` at `dist`, which
+	is nonincreasing in `dist` for all kernels.
+
+	Parameters
+	----------
+	dist : float or ndarray
+		Distance(s) from the center of the kernel.
+
+	bandwidth : float
+		Bandwidth of the kernel.
+
+	kernel : {'gaussian', 'tophat', 'epanechnikov', 'exponential', 'linear'}, default='gaussian'
+		The kernel to evaluate.
+
+	Returns
+	-------
+	value : float or ndarray
+		The kernel evaluated at `dist`, equal to 1 at `dist` 0.
+	"""
+	r = np.asarray(dist, dtype=np.float64) / bandwidth
+	if kernel == 'gaussian':
+		return np.exp(-0.5 * r * r)
+	elif kernel == 'tophat':
+		return (r < 1).astype(np.float64)
+	elif kernel == 'epanechnikov':
+		return np.maximum(1 - r * r, 0)
+	elif kernel == 'exponential':
+		return np.exp(-r)
+	elif kernel == 'linear':
+		return np.maximum(1 - r, 0)
+	raise ValueError("kernel must be one of " + str(KERNELS))
+
+def kernel_norm(k, bandwidth, kernel='gaussian'):
+	"""
+	Determine the factor normalizing `kernel` in `k`
+	dimensions to integrate to 1.
+
+	Parameters
+	----------
+	k : int
+		Dimensionality of the points.
+
+	bandwidth : float
+		Bandwidth of the kernel.
+
+	kernel : {'gaussian', 'tophat', 'epanechnikov', 'exponential', 'linear'}, default='gaussian'
+		The kernel to normalize.
+
+	Returns
+	-------
+	norm : float
+		The normalizing factor of `kernel`.
+	"""
+	# Volume of the unit ball in `k` dimensions.
+	volume = math.pi ** (k / 2) / math.gamma(k / 2 + 1)
+	if kernel == 'gaussian':
+		integral = (2 * math.pi) ** (k / 2)
+	elif kernel == 'tophat':
+		integral = volume
+	elif kernel == 'epanechnikov':
+		integral = 2 * volume / (k + 2)
+	elif kernel == 'exponential':
+		integral = math.factorial(k) * volume
+	elif kernel == 'linear':
+		integral = volume / (k + 1)
+	else:
+		raise ValueError("kernel must be one of " + str(KERNELS))
+	return 1 / (integral * bandwidth ** k)
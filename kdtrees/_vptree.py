@@ -0,0 +1,406 @@
+# coding=utf-8
+
+"""Vantage-Point Tree"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import bisect
+import numpy as np
+
+from . import _utils as utils
+from ._kdtree_type import KDTreeType
+
+class VPTree:
+	"""
+	A Vantage-Point Tree, partitioning points only by their distance
+	to a vantage point at each node. Points closer to the vantage point
+	than `mu` are kept inside, while all others are kept outside.
+
+	Unlike the KDTree, the VPTree does not rely on comparing points
+	along an axis, making it suitable for `KDTreeType` points whose
+	`distance` is meaningful but whose `__getitem__` and `__lt__` are not,
+	as well as for high-dimensional data.
+
+	Parameters
+	----------
+	value : array-like or object
+		Vantage point at the VPTree node.
+
+	k : int, default=1
+		Dimensionality of the VPTree.
+
+	mu : float, default=0.0
+		Distance from `value` partitioning the inside and outside
+		of the VPTree node.
+
+	accept : KDTreeType or None
+		Override and allow custom types to be accepted.
+
+	Attributes
+	----------
+	inside : VPTree
+		Child of the VPTree with points closer than `mu` to `value`.
+
+	outside : VPTree
+		Child of the VPTree with points at least `mu` from `value`.
+
+	nodes : int
+		Number of nodes in the VPTree, including itself.
+	"""
+	def __init__(self, value, k=1, mu=0.0, accept=None):
+		self.value = value
+		self.k = k
+		self.mu = mu
+		self.inside = None
+		self.outside = None
+		self.nodes = 1
+		self.accept = accept
+
+	def visualize(self, depth=0):
+		"""
+		Prints a visual representation of the VPTree.
+
+		Parameters
+		----------
+		depth : int, default=0
+			Depth of the VPTree node. A depth of 0 implies the root.
+		"""
+		print('\t' * depth + str(self.value) + ", mu: " + str(self.mu) + ", nodes: " + str(self.nodes))
+		if self.outside:
+			self.outside.visualize(depth=depth+1)
+		else:
+			print('\t' * (depth+1) + "None")
+		if self.inside:
+			self.inside.visualize(depth=depth+1)
+		else:
+			print('\t' * (depth+1) + "None")
+
+	@staticmethod
+	def initialize(points, k=None, accept=None):
+		"""
+		Initialize a VPTree from a list of points. The first point
+		is taken as the vantage point and the median of the distances
+		to all other points as `mu`, recursively. Points equal to
+		the vantage point are kept once.
+
+		Parameters
+		----------
+		points : array-like, shape (n_points, *)
+			List of points to build a VPTree where the last axis denotes the features.
+			If `accept` is a KDTreeType, list can contain this type.
+
+		k : int or None, default=None
+			Dimensionality of the points. If None, `initialize` will self-detect.
+
+		accept : KDTreeType or None
+			Override and allow a custom type to be accepted.
+
+		Returns
+		-------
+		tree : VPTree
+			The root of the VPTree built from `points`.
+		"""
+		if accept is not None and not issubclass(accept, KDTreeType):
+			raise ValueError("Accept must be a subclass of KDTreeType")
+		if k is None:
+			k = utils.check_dimensionality(*points, accept=accept)
+		if accept is None:
+			points = np.asarray(points)
+		else:
+			points = list(points)
+		return VPTree._initialize_recursive(points, k, accept)
+
+	@staticmethod
+	def _initialize_recursive(points, k, accept):
+		"""
+		Internal recursive initialization from a list of points.
+
+		This function should not be called externally. Use `initialize`
+		instead.
+
+		Parameters
+		----------
+		points : ndarray or list
+			Points to build the VPTree from, as an ndarray
+			or as a list if `accept` is used.
+
+		k : int
+			Dimensionality of the points.
+
+		accept : KDTreeType or None
+			Override and allow a custom type to be accepted.
+
+		Returns
+		-------
+		tree : VPTree
+			The root of the VPTree built from `points`.
+		"""
+		tree = VPTree(points[0], k=k, accept=accept)
+		rest = points[1:]
+		if len(rest) == 0:
+			return tree
+		dists = tree._distances(rest)
+		# Drop duplicates of the vantage point, which would otherwise
+		# all be kept outside one level deeper each.
+		if accept is None:
+			distinct = dists > 0
+		else:
+			distinct = np.asarray([dist > 0 or p != points[0] for p, dist in zip(rest, dists)], dtype=bool)
+		if not distinct.all():
+			dists = dists[distinct]
+			rest = rest[distinct] if accept is None else [p for p, i in zip(rest, distinct) if i]
+			if len(rest) == 0:
+				return tree
+		tree.mu = np.median(dists)
+		inside = dists < tree.mu
+		if accept is None:
+			inside_points, outside_points = rest[inside], rest[~inside]
+		else:
+			inside_points = [p for p, i in zip(rest, inside) if i]
+			outside_points = [p for p, i in zip(rest, inside) if not i]
+		if len(inside_points) > 0:
+			tree.inside = VPTree._initialize_recursive(inside_points, k, accept)
+		if len(outside_points) > 0:
+			tree.outside = VPTree._initialize_recursive(outside_points, k, accept)
+		tree._recalculate_nodes()
+		return tree
+
+	def _distances(self, points):
+		"""
+		Determine the distances of points from the vantage point.
+		The build and all queries measure distances here, such that
+		points at exactly `mu` are routed to the same child.
+
+		Parameters
+		----------
+		points : ndarray or list
+			The points to measure, as an ndarray, shape (n_points, k),
+			or as a list if `accept` is used.
+
+		Returns
+		-------
+		dists : ndarray, shape (n_points,)
+			The distances of `points` from `value`.
+		"""
+		if self.accept is None:
+			return np.linalg.norm(np.subtract(points, self.value, dtype=np.float64), axis=-1)
+		return np.asarray([utils.distance(self.value, p, accept=self.accept) for p in points], dtype=np.float64)
+
+	def _recalculate_nodes(self):
+		"""
+		Recalculate the number of nodes of the VPTree,
+		assuming that the VPTree's children are correctly
+		calculated.
+		"""
+		nodes = 0
+		if self.inside:
+			nodes += self.inside.nodes
+		if self.outside:
+			nodes += self.outside.nodes
+		self.nodes = nodes + 1
+
+	def collect(self):
+		"""
+		Collect all values in the VPTree as a list,
+		ordered in a depth-first manner.
+
+		Returns
+		-------
+		values : list
+			A list of all the values in the VPTree.
+		"""
+		values = [self.value]
+		if self.outside is not None:
+			values += self.outside.collect()
+		if self.inside is not None:
+			values += self.inside.collect()
+		return values
+
+	def search(self, point):
+		"""
+		Search the VPTree for a point.
+		Returns the VPTree node if found, None otherwise.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point (KDTreeType if `accept` is used) being searched,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : VPTree or None
+			The VPTree node whose value matches the point.
+			None if the point was not found in the tree.
+		"""
+		point = self._check_point(point)
+		tree = self
+		while tree is not None:
+			if np.all(tree.value == point):
+				return tree
+			dist = tree._distances([point])[0]
+			tree = tree.inside if dist < tree.mu else tree.outside
+		return None
+
+	def nearest_neighbor(self, point, n=1):
+		"""
+		Determine the `n` nearest VPTree nodes to `point` and their distances.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		n : int, default=1
+			The number of neighbors to search for.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n, 2)
+			The array of `n` pairs, referring to `n` nearest neighbors,
+			sorted based on proximity. The first value in the pair is the
+			point, while the second is the distance to `point`.
+		"""
+		point = self._check_point(point)
+		values, dists = [None] * n, [np.inf] * n
+		self._nearest_neighbor(point, n, values, dists)
+		return VPTree._format_neighbors(values, dists)
+
+	def _nearest_neighbor(self, point, n, values, dists):
+		"""
+		Internal recursion for `nearest_neighbor`, updating the
+		`n` nearest neighbors in `values` and `dists` in place.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		n : int
+			The number of neighbors to search for.
+
+		values : list
+			The `n` nearest points found so far.
+
+		dists : list
+			The sorted distances of `values` to `point`.
+		"""
+		dist = self._distances([point])[0]
+		idx = bisect.bisect_right(dists, dist)
+		if idx < n:
+			values.insert(idx, self.value)
+			dists.insert(idx, dist)
+			del values[n:], dists[n:]
+		if dist < self.mu:
+			first, second = self.inside, self.outside
+		else:
+			first, second = self.outside, self.inside
+		if first is not None:
+			first._nearest_neighbor(point, n, values, dists)
+		# Points inside are farther than `dist - mu` and points
+		# outside are farther than `mu - dist` from `point`.
+		if second is not None and abs(dist - self.mu) <= dists[-1]:
+			second._nearest_neighbor(point, n, values, dists)
+
+	def proximal_neighbor(self, point, d=0):
+		"""
+		Determine the VPTree nodes that are within `d` distance
+		to `point` and their distances.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		d : int, default=0
+			The maximum acceptable distance for neighbors.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n_neighbors, 2)
+			The array of pairs, referring to proximal neighbors within
+			`d` distance from `point`, sorted based on proximity.
+			The first value in the pair is the point, while the
+			second is the distance to `point`.
+		"""
+		point = self._check_point(point)
+		if d == 0:
+			exists = self.search(point)
+			return [(exists, 0.0)] if exists else []
+		values, dists = [], []
+		self._proximal_neighbor(point, d, values, dists)
+		return VPTree._format_neighbors(values, dists)
+
+	def _proximal_neighbor(self, point, d, values, dists):
+		"""
+		Internal recursion for `proximal_neighbor`, adding the
+		neighbors within `d` distance to `values` and `dists` in place.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		d : int
+			The maximum acceptable distance for neighbors.
+
+		values : list
+			The points found so far.
+
+		dists : list
+			The sorted distances of `values` to `point`.
+		"""
+		dist = self._distances([point])[0]
+		if dist <= d and not np.all(point == self.value):
+			idx = bisect.bisect_right(dists, dist)
+			values.insert(idx, self.value)
+			dists.insert(idx, dist)
+		if self.inside is not None and dist - d < self.mu:
+			self.inside._proximal_neighbor(point, d, values, dists)
+		if self.outside is not None and dist + d >= self.mu:
+			self.outside._proximal_neighbor(point, d, values, dists)
+
+	def _check_point(self, point):
+		"""
+		Validate `point` as a query of the VPTree.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		Returns
+		-------
+		point : ndarray or object
+			The validated query point.
+		"""
+		if self.accept is None:
+			point = np.asarray(point)
+		if self.k != utils.check_dimensionality(point, accept=self.accept):
+			raise ValueError("Point must be same dimensionality as the VPTree")
+		return point
+
+	@staticmethod
+	def _format_neighbors(values, dists):
+		"""
+		Arrange neighbors as an object array of pairs.
+
+		Parameters
+		----------
+		values : list
+			The neighboring points.
+
+		dists : list
+			The distances of `values` to the query point.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n_neighbors, 2)
+			The array of pairs of points and their distances.
+		"""
+		neighbors = np.empty((len(values), 2), dtype=object)
+		for i in range(len(values)):
+			neighbors[i, 0] = values[i]
+			neighbors[i, 1] = dists[i]
+		return neighbors
@@ -0,0 +1,318 @@
+# coding=utf-8
+
+"""Sliding-Window K-D Tree"""
+
+# Authors: Jeffrey Wang
+# License: BSD 3 clause
+
+import numpy as np
+from collections import deque
+
+from . import _utils as utils
+from ._kdtree import KDTree
+
+class WindowedKDTree:
+	"""
+	An index over the points inserted within a sliding window of time,
+	kept as a sequence of KDTrees that each hold the points of one
+	time slice. Expired slices are dropped whole, so the cost of
+	expiry is proportional to the number of expired slices
+	rather than the number of points.
+
+	Each point is held once, with the timestamp of its latest insertion.
+	Queries only return points within the live window, which spans
+	(`now` - `window`, `now`].
+
+	Parameters
+	----------
+	window : float
+		Duration of the sliding window.
+
+	slice_width : float or None, default=None
+		Duration covered by each KDTree. If None, the window
+		is divided into 8 slices.
+
+	k : int or None, default=None
+		Dimensionality of the points. If None, it is detected
+		from the first point inserted.
+
+	accept : KDTreeType or None
+		Override and allow custom types to be accepted.
+
+	dtype : data-type or None, default=None
+		Storage data-type of the points.
+
+	Attributes
+	----------
+	slices : deque
+		Deque of (start, tree, timestamps) for each live time slice,
+		ordered by start, where `timestamps` maps the key of each point,
+		from `_utils.point_key`, to its timestamp.
+
+	now : float
+		The latest time seen through `insert` or `expire`.
+	"""
+	def __init__(self, window, slice_width=None, k=None, accept=None, dtype=None):
+		if window <= 0:
+			raise ValueError("window must be positive")
+		if slice_width is None:
+			slice_width = window / 8
+		if slice_width <= 0:
+			raise ValueError("slice_width must be positive")
+		self.window = window
+		self.slice_width = slice_width
+		self.k = k
+		self.accept = accept
+		self.dtype = dtype
+		self.slices = deque()
+		self.now = -np.inf
+
+	@property
+	def nodes(self):
+		"""
+		Number of points held by the WindowedKDTree, including
+		those in the oldest slice that may have partially expired.
+		"""
+		return sum(tree.nodes for _, tree, _ in self.slices)
+
+	def insert(self, point, timestamp):
+		"""
+		Insert a point at `timestamp` into the WindowedKDTree,
+		expiring slices that fall out of the window. If the point
+		is already held, it is moved to `timestamp`.
+
+		Parameters
+		----------
+		point : array-like or object
+			The point (KDTreeType if `accept` is used) to be inserted,
+			where the last axis denotes the features.
+
+		timestamp : float
+			Time of the insertion.
+
+		Returns
+		-------
+		tree : WindowedKDTree
+			The WindowedKDTree with `point` inserted.
+		"""
+		if self.accept is None:
+			point = utils.storage_point(point, self.dtype)
+			if point is None:
+				raise ValueError("Point cannot be represented by the dtype of the WindowedKDTree")
+		if self.k is None:
+			self.k = utils.check_dimensionality(point, accept=self.accept)
+		elif self.k != utils.check_dimensionality(point, accept=self.accept):
+			raise ValueError("Point must be same dimensionality as the WindowedKDTree")
+		self.expire(timestamp)
+		if timestamp <= self.now - self.window:
+			return self
+		self._remove(point)
+		start = np.floor(timestamp / self.slice_width) * self.slice_width
+		idx = len(self.slices)
+		while idx > 0 and self.slices[idx-1][0] > start:
+			idx -= 1
+		if idx > 0 and self.slices[idx-1][0] == start:
+			_, tree, timestamps = self.slices[idx-1]
+			self.slices[idx-1] = (start, tree.insert(point), timestamps)
+		else:
+			tree = KDTree.initialize([point], k=self.k, accept=self.accept, dtype=self.dtype)
+			timestamps = {}
+			self.slices.insert(idx, (start, tree, timestamps))
+		timestamps[utils.point_key(point, accept=self.accept)] = timestamp
+		return self
+
+	def _remove(self, point):
+		"""
+		Remove a point from whichever slice holds it.
+
+		Parameters
+		----------
+		point : array-like or object
+			The validated point to be removed.
+		"""
+		key = utils.point_key(point, accept=self.accept)
+		for i, (start, tree, timestamps) in enumerate(self.slices):
+			if key in timestamps:
+				del timestamps[key]
+				tree = tree.delete(point)
+				if tree is None:
+					del self.slices[i]
+				else:
+					self.slices[i] = (start, tree, timestamps)
+				return
+
+	def expire(self, now):
+		"""
+		Advance the WindowedKDTree to `now`, dropping all
+		slices that lie entirely outside the window.
+
+		Parameters
+		----------
+		now : float
+			The current time.
+
+		Returns
+		-------
+		expired : int
+			Number of slices dropped.
+		"""
+		self.now = max(self.now, now)
+		expired = 0
+		while self.slices and self.slices[0][0] + self.slice_width <= self.now - self.window:
+			self.slices.popleft()
+			expired += 1
+		return expired
+
+	def _live(self, timestamps, start):
+		"""
+		Determine the filter restricting a slice to the live window.
+
+		Parameters
+		----------
+		timestamps : dict
+			Timestamps of the points of the slice.
+
+		start : float
+			Start of the slice.
+
+		Returns
+		-------
+		predicate : callable or None
+			Function of a point returning True if it is live.
+			None if the whole slice is live.
+		"""
+		cutoff = self.now - self.window
+		if start > cutoff:
+			return None
+		return lambda value: timestamps[utils.point_key(value, accept=self.accept)] > cutoff
+
+	def collect(self):
+		"""
+		Collect all live values in the WindowedKDTree as a list,
+		ordered from the oldest slice to the newest.
+
+		Returns
+		-------
+		values : list
+			A list of all the live values in the WindowedKDTree.
+		"""
+		values = []
+		for start, tree, timestamps in self.slices:
+			live = self._live(timestamps, start)
+			values += [v for v in tree if live is None or live(v)]
+		return values
+
+	def search(self, point):
+		"""
+		Search the WindowedKDTree for a live point.
+		Returns the KDTree node if found, None otherwise.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The point (KDTreeType if `accept` is used) being searched,
+			where the last axis denotes the features.
+
+		Returns
+		-------
+		tree : KDTree or None
+			The KDTree node whose value matches the point.
+			None if the point was not found in the live window.
+		"""
+		if self.accept is None:
+			point = utils.storage_point(point, self.dtype)
+			if point is None:
+				return None
+		key = utils.point_key(point, accept=self.accept)
+		for start, tree, timestamps in self.slices:
+			if key in timestamps:
+				if timestamps[key] <= self.now - self.window:
+					return None
+				return tree.search(point)
+		return None
+
+	def nearest_neighbor(self, point, n=1):
+		"""
+		Determine the `n` nearest live points to `point` and their distances.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		n : int, default=1
+			The number of neighbors to search for.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n, 2)
+			The array of `n` pairs, referring to `n` nearest neighbors,
+			sorted based on proximity. The first value in the pair is the
+			point, while the second is the distance to `point`.
+		"""
+		values, dists = [], []
+		for start, tree, timestamps in self.slices:
+			neighbors = tree.nearest_neighbor(point, n=n, predicate=self._live(timestamps, start))
+			for value, dist in neighbors:
+				if value is not None:
+					values.append(value)
+					dists.append(dist)
+		return WindowedKDTree._merge(values, dists, n)
+
+	def proximal_neighbor(self, point, d=0):
+		"""
+		Determine the live points that are within `d` distance
+		to `point` and their distances.
+
+		Parameters
+		----------
+		point : array-like or scalar
+			The query point, where the last axis denotes the features.
+
+		d : int, default=0
+			The maximum acceptable distance for neighbors.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n_neighbors, 2)
+			The array of pairs, referring to proximal neighbors within
+			`d` distance from `point`, sorted based on proximity.
+		"""
+		values, dists = [], []
+		for start, tree, timestamps in self.slices:
+			neighbors = tree.proximal_neighbor(point, d=d, predicate=self._live(timestamps, start))
+			for value, dist in neighbors:
+				values.append(value.value if d == 0 else value)
+				dists.append(dist)
+		return WindowedKDTree._merge(values, dists, len(values))
+
+	@staticmethod
+	def _merge(values, dists, n):
+		"""
+		Merge neighbors from all slices into the `n` nearest.
+
+		Parameters
+		----------
+		values : list
+			The neighboring points from all slices.
+
+		dists : list
+			The distances of `values` to the query point.
+
+		n : int
+			The number of neighbors to keep.
+
+		Returns
+		-------
+		neighbors : ndarray, shape (n, 2)
+			The array of pairs of points and their distances, sorted
+			based on proximity and padded with (None, inf).
+		"""
+		order = np.argsort(np.asarray(dists, dtype=float), kind='stable')[:n]
+		neighbors = np.empty((n, 2), dtype=object)
+		neighbors[:, 0] = None
+		neighbors[:, 1] = np.inf
+		for i, j in enumerate(order):
+			neighbors[i, 0] = values[j]
+			neighbors[i, 1] = dists[j]
+		return neighbors
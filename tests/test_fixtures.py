@@ -28,3 +28,7 @@ class KDBadType(KDTreeType):
 class BadType:
 	def __init__(self):
 		self.bad = True
+
+class KDHashType(KDSubType):
+	def __hash__(self):
+		return hash(self.a)
@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+from .test_fixtures import KDSubType
+
+def all_invariant(tree):
+	if tree is None:
+		return True
+	return tree.invariant() and all_invariant(tree.left) and all_invariant(tree.right)
+
+def test_deferred_insert():
+	tree = KDTree.initialize([[0,0]])
+	points = [[i, (i * 7) % 20] for i in range(1, 20)]
+	with tree.deferred_balance() as t:
+		assert t is tree
+		for p in points:
+			assert tree.insert(p) is tree
+		assert not tree.invariant()
+		assert np.all(tree.search([10,10]).value == [10,10])
+	assert all_invariant(tree)
+	assert tree.nodes == 20
+	for p in points:
+		assert tree.search(p) is not None
+
+def test_deferred_delete():
+	points = [[i] for i in range(30)]
+	tree = KDTree.initialize(points)
+	with tree.deferred_balance():
+		for p in points[:20]:
+			assert tree.delete(p) is tree
+	assert all_invariant(tree)
+	assert tree.nodes == 10
+	for p in points[20:]:
+		assert tree.search(p) is not None
+	for p in points[:20]:
+		assert tree.search(p) is None
+
+def test_deferred_nested():
+	tree = KDTree.initialize([[0]])
+	with tree.deferred_balance():
+		with tree.deferred_balance():
+			for i in range(1, 10):
+				tree.insert([i])
+		assert not tree.invariant()
+	assert all_invariant(tree)
+
+def test_balance_sliding_midpoint():
+	tree = KDTree.initialize([[0],[1],[2],[10]], split='sliding_midpoint')
+	assert not tree.invariant()
+	tree = tree.balance()
+	assert all_invariant(tree)
+	assert tree.split == 'sliding_midpoint'
+	tree = tree.insert([3])
+	assert all_invariant(tree)
+
+class KDCountType(KDSubType):
+	calls = 0
+	def __getitem__(self, i):
+		KDCountType.calls += 1
+		return super().__getitem__(i)
+
+def structure(tree):
+	if tree is None:
+		return None
+	return (tuple(tree.coords), tree.axis, structure(tree.left), structure(tree.right))
+
+def test_rebuild_cached_coordinates():
+	tree = KDTree.initialize([KDCountType(2, [i, 7 - i]) for i in range(8)], accept=KDCountType)
+	KDCountType.calls = 0
+	rebuilt = tree._rebuild()
+	assert KDCountType.calls == 0
+	assert structure(rebuilt) == structure(tree)
+	assert rebuilt.config is tree.config
+
+@pytest.mark.parametrize("split", KDTree.SPLITS)
+def test_rebuild_matches_initialize(split):
+	points = np.random.RandomState(0).randint(0, 10, size=(60, 3))
+	tree = KDTree.initialize(points[:20], split=split)
+	for point in points[20:]:
+		tree = tree.insert(point)
+	expected = KDTree.initialize(tree.to_array(), init_axis=tree.axis, split=split)
+	assert structure(tree._rebuild()) == structure(expected)
+
+@pytest.mark.parametrize("coords, median", [
+	([0, 1, 2, 3], 2), ([0, 1, 1, 1], 1), ([0, 0, 0, 1], 3), ([1, 1, 1, 1], 0), ([5], 0),
+])
+def test_split_index(coords, median):
+	assert KDTree._split_index(np.asarray(coords, dtype=float), 'round_robin') == median
+
+def test_invariant_ties():
+	tree = KDTree.initialize([[0, 0], [1, 0], [1, 1], [1, 2], [1, 3], [1, 4]])
+	assert (tree.left.nodes, tree.right.nodes) == (1, 4)
+	assert tree.invariant()
+	tree = KDTree.initialize([[0, 0], [0, 1], [0, 2], [0, 3], [0, 4], [1, 0]])
+	assert (tree.left.nodes, tree.right) == (5, None)
+	assert tree.invariant()
+	with tree.deferred_balance():
+		tree.insert([2, 0])
+		tree.insert([3, 0])
+		assert tree.invariant()
+		for i in range(4, 10):
+			tree.insert([i, 0])
+		assert not tree.invariant()
+
+def test_balance_ties(monkeypatch):
+	rng = np.random.RandomState(0)
+	points = np.c_[rng.randint(3, size=300), rng.rand(300)]
+	tree = KDTree.initialize(points)
+	rebuilt = []
+	rebuild = KDTree._rebuild
+	def counted(self, *args, **kwargs):
+		result = rebuild(self, *args, **kwargs)
+		rebuilt.append(result)
+		assert all_invariant(result)
+		return result
+	monkeypatch.setattr(KDTree, '_rebuild', counted)
+	for point in np.c_[rng.randint(3, size=30), rng.rand(30)]:
+		tree = tree.insert(point)
+	assert all_invariant(tree)
+	assert sum(node.nodes for node in rebuilt) < 5 * len(points)
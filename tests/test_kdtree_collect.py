@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+from .test_fixtures import KDSubType
+
+POINTS = [[4,1],[2,7],[5,3],[7,0],[1,9],[9,2],[3,3],[8,8],[6,5],[0,4]]
+
+def test_collect():
+	tree = KDTree.initialize([[4],[2],[5],[7],[1],[9],[3]])
+	assert [v[0] for v in tree.collect()] == [4, 7, 9, 5, 2, 3, 1]
+
+def test_iter():
+	tree = KDTree.initialize(POINTS)
+	assert [tuple(v) for v in tree] == [tuple(v) for v in tree.collect()]
+	assert sorted(tuple(v) for v in tree) == sorted(map(tuple, POINTS))
+
+def test_to_array():
+	tree = KDTree.initialize(POINTS)
+	values = tree.to_array()
+	assert values.shape == (10, 2)
+	assert np.all(values == np.asarray(tree.collect()))
+
+def test_to_array_promote():
+	tree = KDTree.initialize([[1],[2]])
+	tree = tree.insert([1.5])
+	assert np.all(np.sort(tree.to_array(), axis=0) == [[1],[1.5],[2]])
+
+def test_to_array_dtype():
+	tree = KDTree.initialize(POINTS, dtype=np.float32)
+	assert tree.to_array().dtype == np.float32
+
+def test_to_array_chunks():
+	tree = KDTree.initialize(POINTS)
+	chunks = list(tree.to_array(chunk_size=4))
+	assert [len(c) for c in chunks] == [4, 4, 2]
+	assert np.all(np.concatenate(chunks) == tree.to_array())
+
+def test_to_array_accept():
+	points = [KDSubType(1,1), KDSubType(1,2), KDSubType(1,4)]
+	tree = KDTree.initialize(points, accept=KDSubType)
+	values = tree.to_array()
+	assert values.shape == (3,)
+	assert list(values) == tree.collect()
+
+def test_to_array_chunk_error():
+	tree = KDTree.initialize(POINTS)
+	with pytest.raises(ValueError):
+		tree.to_array(chunk_size=0)
@@ -76,3 +76,55 @@ def test_delete_mismatch():
 	tree = KDTree.initialize([[1],[2]])
 	with pytest.raises(ValueError):
 		tree.delete([0,0])
+
+def test_delete_root(capsys):
+	tree = KDTree.initialize([[4],[2],[5],[3],[7],[1],[9]])
+	root = tree
+	tree = tree.delete([4])
+	assert tree is root
+	tree.visualize()
+	captured = capsys.readouterr()
+	assert captured.out == "[5], axis: 0, nodes: 6\n" + \
+						"\t[7], axis: 0, nodes: 2\n" + \
+						"\t\t[9], axis: 0, nodes: 1\n" + \
+						"\t\t\tNone\n" + "\t\t\tNone\n" + \
+						"\t\tNone\n" + \
+						"\t[2], axis: 0, nodes: 3\n" + \
+						"\t\t[3], axis: 0, nodes: 1\n" + \
+						"\t\t\tNone\n" + "\t\t\tNone\n" + \
+						"\t\t[1], axis: 0, nodes: 1\n" + \
+						"\t\t\tNone\n" + "\t\t\tNone\n"
+
+def test_delete_left_only(capsys):
+	tree = KDTree([2])
+	tree.left = KDTree([1])
+	tree.left.left = KDTree([0])
+	tree.left._recalculate_nodes()
+	tree._recalculate_nodes()
+	tree = tree.delete([2])
+	tree.visualize()
+	captured = capsys.readouterr()
+	assert captured.out == "[0], axis: 0, nodes: 2\n" + \
+						"\t[1], axis: 0, nodes: 1\n" + \
+						"\t\tNone\n" + "\t\tNone\n" + \
+						"\tNone\n"
+
+def test_delete_internal_2D():
+	points = [[i, (i * 7) % 20] for i in range(20)]
+	tree = KDTree.initialize(points)
+	for p in points[::2]:
+		tree = tree.delete(p)
+	assert tree.nodes == 10
+	for p in points[1::2]:
+		assert tree.search(p) is not None
+	for p in points[::2]:
+		assert tree.search(p) is None
+
+@pytest.mark.parametrize("index", [False, True])
+def test_delete_dtype_int(index):
+	tree = KDTree.initialize([[1,2],[3,4],[5,6]], dtype=np.int32, index=index)
+	tree = tree.delete([3.9,4.1])
+	assert tree.nodes == 3
+	assert tree.search([3,4]) is not None
+	tree = tree.delete([3.0,4.0])
+	assert tree.nodes == 2
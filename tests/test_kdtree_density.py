@@ -0,0 +1,143 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+from kdtrees import _utils as utils
+from .test_fixtures import KDSubType
+
+POINTS = [[i, (i * 7) % 20] for i in range(40)]
+QUERIES = [[0, 0], [10, 5], [20, 10], [39.5, 19], [100, 100]]
+
+WEIGHTS = [(i % 5) / 2 for i in range(40)]
+
+def brute_density(points, queries, bandwidth, kernel, weights=None):
+	points = np.asarray(points, dtype=float)
+	weights = np.ones(len(points)) if weights is None else np.asarray(weights, dtype=float)
+	dists = np.linalg.norm(np.asarray(queries)[:,None] - points[None], axis=-1)
+	norm = utils.kernel_norm(points.shape[1], bandwidth, kernel)
+	return (utils.kernel(dists, bandwidth, kernel) * weights).sum(axis=1) * norm / weights.sum()
+
+def test_aggregates():
+	tree = KDTree.initialize(POINTS)
+	assert np.all(tree.lower == [0, 0])
+	assert np.all(tree.upper == [39, 19])
+	assert np.allclose(tree.centroid, np.mean(POINTS, axis=0))
+	for node in [tree.right, tree.left, tree.right.right]:
+		values = np.asarray(list(node))
+		assert np.all(node.lower == values.min(axis=0))
+		assert np.all(node.upper == values.max(axis=0))
+		assert np.allclose(node.total, values.sum(axis=0))
+
+def test_aggregates_lazy():
+	tree = KDTree.initialize(np.asarray(POINTS, dtype=float))
+	assert all(node.aggregates is None for node in [tree, tree.right, tree.left])
+	tree.lower
+	for node in [tree, tree.right, tree.left]:
+		assert node.value is node.coords
+		assert node.aggregates.shape == (3, 2)
+	tree = tree.insert([50.0, -3.0])
+	leaf = tree.search([50, -3])
+	assert tree.aggregates is None
+	assert leaf.aggregates is None and leaf.lower is leaf.coords
+	assert tree.left.aggregates is not None or tree.right.aggregates is not None
+
+def test_aggregates_modified():
+	tree = KDTree.initialize(POINTS)
+	tree.kernel_density([[0, 0]], 1)
+	tree = tree.insert([50, -3])
+	tree = tree.delete([0, 0])
+	tree = tree.update([13, 11], [13.5, 11])
+	values = np.asarray(list(tree))
+	assert np.all(tree.lower == values.min(axis=0))
+	assert np.all(tree.upper == values.max(axis=0))
+	assert np.allclose(tree.total, values.sum(axis=0))
+
+def test_aggregates_accept():
+	tree = KDTree.initialize([KDSubType(1, 0), KDSubType(1, 1)], accept=KDSubType)
+	assert tree.lower is None and tree.total is None
+	assert tree.centroid is None
+
+def test_aggregates_weights():
+	tree = KDTree.initialize(POINTS, weights=WEIGHTS)
+	assert tree.weight_sum == sum(WEIGHTS)
+	assert np.all(tree.lower == [0, 0]) and np.all(tree.upper == [39, 19])
+	assert np.allclose(tree.centroid, np.average(POINTS, axis=0, weights=WEIGHTS))
+	assert tree.aggregates.shape == (3, 3)
+	weights = {tuple(point): weight for point, weight in zip(POINTS, WEIGHTS)}
+	for node in [tree.right, tree.left, tree.right.right]:
+		values = np.asarray(list(node))
+		node_weights = np.asarray([weights[tuple(value)] for value in values.tolist()])
+		assert node.weight_sum == node_weights.sum()
+		assert np.allclose(node.total, (values * node_weights[:,None]).sum(axis=0))
+		assert np.all(node.lower == values.min(axis=0))
+	tree = KDTree.initialize(POINTS)
+	assert tree.weight_sum == len(POINTS) and tree.weight is None
+
+def test_weights_modified():
+	tree = KDTree.initialize(POINTS, weights=WEIGHTS, max_quality=1.2)
+	weights = {tuple(point): weight for point, weight in zip(POINTS, WEIGHTS)}
+	tree.kernel_density([[0, 0]], 1)
+	tree = tree.insert([50, -3], weight=4)
+	tree = tree.insert([51, -3])
+	tree = tree.insert([0, 0], weight=9)
+	tree = tree.delete([1, 7])
+	tree = tree.update([13, 11], [13.5, 11])
+	weights.update({(50, -3): 4, (51, -3): 1, (13.5, 11): weights.pop((13, 11))})
+	del weights[(1, 7)]
+	for point in weights:
+		assert tree.search(point).weight == weights[point]
+	assert np.isclose(tree.weight_sum, sum(weights.values()))
+	points = list(weights)
+	assert np.allclose(tree.kernel_density(QUERIES, 3),
+				brute_density(points, QUERIES, 3, 'gaussian', list(weights.values())))
+
+@pytest.mark.parametrize("weights, weight", [
+	(WEIGHTS[:-1], None),
+	([-1] + WEIGHTS[1:], None),
+	([np.nan] + WEIGHTS[1:], None),
+	(WEIGHTS, -1),
+	(None, 1),
+])
+def test_weights_error(weights, weight):
+	with pytest.raises(ValueError):
+		tree = KDTree.initialize(POINTS, weights=weights)
+		tree.insert([50, -3], weight=weight)
+
+@pytest.mark.parametrize("kernel", utils.KERNELS)
+def test_kernel_density_exact(kernel):
+	tree = KDTree.initialize(POINTS)
+	density = tree.kernel_density(QUERIES, 3, kernel=kernel)
+	assert np.allclose(density, brute_density(POINTS, QUERIES, 3, kernel))
+
+@pytest.mark.parametrize("atol, rtol", [(1e-4, 0), (0, 0.05), (1e-5, 0.01)])
+def test_kernel_density_tolerance(atol, rtol):
+	tree = KDTree.initialize(POINTS)
+	density = tree.kernel_density(QUERIES, 4, atol=atol, rtol=rtol)
+	exact = brute_density(POINTS, QUERIES, 4, 'gaussian')
+	assert np.all(np.abs(density - exact) <= atol + rtol * exact + 1e-12)
+
+@pytest.mark.parametrize("atol, rtol", [(0, 0), (1e-4, 0), (0, 0.05)])
+def test_kernel_density_weights(atol, rtol):
+	tree = KDTree.initialize(POINTS, weights=WEIGHTS)
+	density = tree.kernel_density(QUERIES, 4, atol=atol, rtol=rtol)
+	exact = brute_density(POINTS, QUERIES, 4, 'gaussian', WEIGHTS)
+	assert np.all(np.abs(density - exact) <= atol + rtol * exact + 1e-12)
+	tree = KDTree.initialize(POINTS, weights=np.zeros(len(POINTS)))
+	with pytest.raises(ValueError):
+		tree.kernel_density(QUERIES, 4)
+
+@pytest.mark.parametrize("points, bandwidth, kernel, atol, accept", [
+	(QUERIES, 0, 'gaussian', 0, None),
+	(QUERIES, 1, 'cosine', 0, None),
+	(QUERIES, 1, 'gaussian', -1, None),
+	([[0, 0, 0]], 1, 'gaussian', 0, None),
+	([0, 0], 1, 'gaussian', 0, None),
+	(QUERIES, 1, 'gaussian', 0, KDSubType),
+])
+def test_kernel_density_error(points, bandwidth, kernel, atol, accept):
+	if accept is None:
+		tree = KDTree.initialize(POINTS)
+	else:
+		tree = KDTree.initialize([KDSubType(1, 0)], accept=accept)
+	with pytest.raises(ValueError):
+		tree.kernel_density(points, bandwidth, kernel=kernel, atol=atol)
@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+from kdtrees import _utils as utils
+from .test_fixtures import KDSubType, KDHashType
+
+def nodes_of(tree):
+	if tree is None:
+		return []
+	return [tree] + nodes_of(tree.right) + nodes_of(tree.left)
+
+def assert_index(tree):
+	nodes = nodes_of(tree)
+	assert len(tree.index) == len(nodes)
+	for node in nodes:
+		assert tree.index[utils.point_key(node.value, accept=tree.accept)] is node
+
+def test_index_initialize():
+	tree = KDTree.initialize([[i, (i * 7) % 20] for i in range(20)], index=True)
+	assert_index(tree)
+	assert tree.search([3, 1]) is tree.index[utils.point_key([3, 1])]
+	assert [3, 1] in tree
+	assert [3, 2] not in tree
+	assert np.asarray([3.0, 1.0]) in tree
+
+def test_index_insert_delete():
+	tree = KDTree.initialize([[0]], index=True)
+	for i in range(1, 30):
+		tree = tree.insert([i])
+		assert_index(tree)
+	for i in range(0, 30, 3):
+		tree = tree.delete([i])
+		assert_index(tree)
+		assert [i] not in tree
+	assert tree.delete([0]) is tree
+	assert_index(tree)
+
+def test_index_update():
+	tree = KDTree.initialize([[1],[2],[3],[4],[5],[6],[7]], index=True)
+	tree = tree.update([7], [8])
+	assert_index(tree)
+	tree = tree.update([4], [0])
+	assert_index(tree)
+	assert [8] in tree and [0] in tree and [4] not in tree
+
+def test_index_deferred():
+	tree = KDTree.initialize([[0]], index=True)
+	with tree.deferred_balance():
+		for i in range(1, 20):
+			tree.insert([i])
+		tree.delete([0])
+	assert_index(tree)
+
+def test_index_accept():
+	tree = KDTree.initialize([KDHashType(1,1), KDHashType(1,2), KDHashType(1,4)], accept=KDHashType, index=True)
+	assert_index(tree)
+	assert KDHashType(1,2) in tree
+	tree = tree.delete(KDHashType(1,2))
+	assert KDHashType(1,2) not in tree
+	assert_index(tree)
+
+def test_index_accept_unhashable():
+	with pytest.raises(ValueError):
+		KDTree.initialize([KDSubType(1,1), KDSubType(1,2)], accept=KDSubType, index=True)
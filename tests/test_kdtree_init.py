@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
 
-from kdtrees import KDTree
+from kdtrees import KDTree, KDTreeConfig, _utils as utils
 from .test_fixtures import KDSubType
 
 def test_init():
@@ -22,6 +22,26 @@ def test_init_with_params():
 	assert tree.right == None
 	assert tree.nodes == 1
 
+def test_init_slots():
+	tree = KDTree([0,0], k=2)
+	assert not hasattr(tree, '__dict__')
+	with pytest.raises(AttributeError):
+		tree.extra = 0
+
+def test_init_with_config():
+	config = KDTreeConfig(k=2, dtype=np.float32, index={})
+	tree = KDTree(np.zeros(2), axis=1, config=config)
+	assert tree.config is config
+	assert tree.k == 2
+	assert tree.dtype == np.float32
+	assert len(tree.index) == 1
+
+def test_initialize_shared_config():
+	tree = KDTree.initialize([[0,0],[1,1],[2,0],[3,3],[4,1]])
+	tree = tree.insert([5,5])
+	assert all(node.config is tree.config for node in [tree.right, tree.left, tree.right.right])
+	assert tree.right.k == 2
+
 @pytest.mark.parametrize("points_1d,init_1d_exp", [
 	([[4],[2],[5],[7],[1],[9]], np.asarray([5])),
 	([[1],[2],[3],[4],[5],[6],[7]], np.asarray([4])),
@@ -48,7 +68,7 @@ def test_initialize_2D(points_2d, init_2d_exp, capsys):
 	assert captured.out == init_2d_exp
 
 @pytest.mark.parametrize("points_3d,init_3d_exp", [
-	([[0,0,0],[1,1,1],[0,2,0]], np.asarray([0,2,0])),
+	([[0,0,0],[1,1,1],[0,2,0]], np.asarray([0,0,0])),
 ])
 
 def test_initialize_3D(points_3d, init_3d_exp):
@@ -68,11 +88,12 @@ def test_initialize_accept(points_type, init_type_exp):
 	assert np.all(tree.left.left.value == KDSubType(2, [0,0]))
 
 @pytest.mark.parametrize("points_vis,vis_exp", [
-	([[0,0,0],[1,1,1],[0,2,0]], "[0 2 0], axis: 0, nodes: 3\n" + \
-							"\t[1 1 1], axis: 1, nodes: 1\n" + \
-							"\t\tNone\n" + "\t\tNone\n" + \
-							"\t[0 0 0], axis: 1, nodes: 1\n" + \
-							"\t\tNone\n" + "\t\tNone\n"
+	([[0,0,0],[1,1,1],[0,2,0]], "[0 0 0], axis: 0, nodes: 3\n" + \
+							"\t[0 2 0], axis: 1, nodes: 2\n" + \
+							"\t\tNone\n" + \
+							"\t\t[1 1 1], axis: 2, nodes: 1\n" + \
+							"\t\t\tNone\n" + "\t\t\tNone\n" + \
+							"\tNone\n"
 							),
 	([[4],[2],[5],[7],[1],[9],[3]], "[4], axis: 0, nodes: 7\n" + \
 						"\t[7], axis: 0, nodes: 3\n" + \
@@ -111,3 +132,157 @@ def test_initialize_error():
 			def __init__(self):
 				self.bad = True
 		KDTree.initialize([[0,0,0],[1,1,1],[0,2,0]], accept=BadType)
+
+@pytest.mark.parametrize("n_jobs", [2, 3, 4, -1])
+def test_initialize_n_jobs(n_jobs, capsys):
+	points = [[4,1],[2,7],[5,3],[7,0],[1,9],[9,2],[3,3],[8,8],[6,5],[0,4]]
+	KDTree.initialize(points).visualize()
+	serial = capsys.readouterr().out
+	KDTree.initialize(points, n_jobs=n_jobs).visualize()
+	assert capsys.readouterr().out == serial
+
+def structure(tree):
+	if tree is None:
+		return None
+	return (tuple(tree.coords), tree.axis, tree.nodes, tree.height, tree.path_length,
+				structure(tree.right), structure(tree.left))
+
+@pytest.mark.parametrize("split", KDTree.SPLITS)
+def test_initialize_n_jobs_structure(split):
+	points = np.random.RandomState(0).randint(0, 20, size=(300, 3))
+	serial = KDTree.initialize(points, split=split)
+	tree = KDTree.initialize(points, split=split, n_jobs=3, index=True)
+	assert structure(tree) == structure(serial)
+	assert np.array_equal(tree.lower, serial.lower)
+	assert np.array_equal(tree.total, serial.total)
+	assert len(tree.index) == tree.nodes
+	for value in serial:
+		node = tree.search(value)
+		assert node.config is tree.config
+		assert tree.index[utils.point_key(value)] is node
+
+def test_initialize_n_jobs_accept():
+	points = [KDSubType(1, a) for a in range(20)]
+	tree = KDTree.initialize(points, accept=KDSubType, n_jobs=2)
+	assert tree.nodes == 20
+	assert isinstance(tree.value, KDSubType)
+	assert tree.search(KDSubType(1, 7)) is not None
+
+def test_initialize_n_jobs_error():
+	with pytest.raises(ValueError):
+		KDTree.initialize([[0],[1]], n_jobs=0)
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16, np.int16])
+def test_initialize_dtype(dtype):
+	tree = KDTree.initialize([[0,0],[1,1],[2,0]], dtype=dtype)
+	assert tree.dtype == dtype
+	assert tree.value.dtype == dtype
+	assert tree.left.value.dtype == dtype
+	assert tree.right.value.dtype == dtype
+
+def test_initialize_dtype_accept():
+	with pytest.raises(ValueError):
+		KDTree.initialize([KDSubType(1,0), KDSubType(1,1)], accept=KDSubType, dtype=np.float32)
+
+@pytest.mark.parametrize("index", [False, True])
+def test_initialize_duplicates(index):
+	tree = KDTree.initialize([[1],[1],[2],[-0.0],[0.0]], index=index)
+	assert tree.nodes == 3
+	tree = tree.delete([1])
+	assert tree.nodes == 2
+	assert tree.search([1]) is None
+	assert sorted(v[0] for v in tree.collect()) == [0, 2]
+
+def test_initialize_duplicates_dtype():
+	tree = KDTree.initialize([[1.0],[1],[2]], dtype=np.int32)
+	assert tree.nodes == 2
+
+@pytest.mark.parametrize("points, dtype", [
+	([[1.2],[2]], np.int32), ([[1e10],[0]], np.int32), ([[70000.0],[0]], np.float16),
+])
+def test_initialize_dtype_unrepresentable(points, dtype):
+	with pytest.raises(ValueError):
+		KDTree.initialize(points, dtype=dtype)
+
+def test_initialize_duplicates_accept():
+	points = [KDSubType(1,1), KDSubType(1,1), KDSubType(1,2)]
+	tree = KDTree.initialize(points, accept=KDSubType)
+	assert tree.nodes == 2
+	tree = tree.delete(KDSubType(1,1))
+	assert tree.search(KDSubType(1,1)) is None
+
+@pytest.mark.parametrize("split", KDTree.SPLITS)
+def test_initialize_split(split):
+	rng = np.random.RandomState(0)
+	points = rng.rand(100, 3) * [100, 1, 1]
+	tree = KDTree.initialize(points, split=split)
+	assert tree.nodes == 100
+	assert tree.split == split
+	for p in points:
+		assert tree.search(p) is not None
+
+def test_initialize_max_spread(capsys):
+	tree = KDTree.initialize([[0,0],[1,5],[2,9]], split='max_spread')
+	tree.visualize()
+	captured = capsys.readouterr()
+	assert captured.out == "[1 5], axis: 1, nodes: 3\n" + \
+						"\t[2 9], axis: 0, nodes: 1\n" + \
+						"\t\tNone\n\t\tNone\n" + \
+						"\t[0 0], axis: 0, nodes: 1\n" + \
+						"\t\tNone\n\t\tNone\n"
+
+def test_initialize_sliding_midpoint():
+	tree = KDTree.initialize([[0],[1],[2],[10]], split='sliding_midpoint')
+	assert np.all(tree.value == [10])
+	assert tree.left.nodes == 3
+
+def test_initialize_ties():
+	points = [[i, i % 3] for i in range(12)]
+	tree = KDTree.initialize(points, init_axis=1)
+	for p in points:
+		assert tree.search(p) is not None
+
+def test_initialize_shared_coordinates():
+	points = [[0,1],[0,2],[1,1],[1,2],[2,1],[2,2],[3,1],[1,0]]
+	tree = KDTree.initialize(points)
+	assert tree.nodes == len(points)
+	assert sorted(map(tuple, tree.collect())) == sorted(map(tuple, points))
+	for p in points:
+		assert tree.search(p) is not None
+
+@pytest.mark.parametrize("points", [
+	[[0,0],[1,1],[2,0]],
+	[[0.5,2],[1,1],[2,0]],
+])
+def test_initialize_coords(points):
+	tree = KDTree.initialize(points)
+	for node in [tree, tree.right, tree.left]:
+		assert node.coords is node.value
+
+@pytest.mark.parametrize("dtype", [np.float32, np.int8])
+def test_coords_dtype(dtype):
+	tree = KDTree.initialize([[0,0],[1,1],[2,0]], dtype=dtype)
+	tree = tree.insert([3,3])
+	tree = tree.update([2,0], [-3,1])
+	for value in tree:
+		node = tree.search(value)
+		assert node.coords is node.value
+		assert node.coords.dtype == dtype
+
+def test_coords_dtype_join():
+	tree = KDTree.initialize([[-100, 0], [100, 0]], dtype=np.int8)
+	rows, cols, dists = tree.closest_pairs(tree)
+	assert dists[0] == 200
+
+def test_initialize_coords_accept():
+	tree = KDTree.initialize([KDSubType(1,3), KDSubType(1,1), KDSubType(1,2)], accept=KDSubType)
+	assert tree.coords.dtype == np.float64
+	assert np.all(tree.coords == [2])
+
+def test_initialize_coords_accept_error():
+	with pytest.raises(ValueError):
+		KDTree.initialize([KDSubType(1,'a'), KDSubType(1,'b')], k=1, accept=KDSubType)
+
+def test_initialize_split_error():
+	with pytest.raises(ValueError):
+		KDTree.initialize([[0],[1]], split='median')
@@ -64,3 +64,17 @@ def test_insert_mismatch():
 	tree = KDTree.initialize([[1],[2]])
 	with pytest.raises(ValueError):
 		tree.insert([0,0])
+
+@pytest.mark.parametrize("point, dtype", [
+	([1.7, 2.2], np.int32), ([1e10, 0], np.int32), ([70000, 0], np.float16),
+])
+def test_insert_dtype_unrepresentable(point, dtype):
+	tree = KDTree.initialize([[0,0],[1,1]], dtype=dtype)
+	with pytest.raises(ValueError):
+		tree.insert(point)
+	assert tree.nodes == 2
+
+def test_insert_dtype():
+	tree = KDTree.initialize([[0,0],[1,1]], dtype=np.float32)
+	tree = tree.insert([0.1,0.2])
+	assert tree.search([0.1,0.2]).value.dtype == np.float32
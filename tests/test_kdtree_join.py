@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+from .test_fixtures import KDSubType
+
+POINTS = [[i, (i * 7) % 20] for i in range(30)]
+OTHER = [[(i * 3) % 31 + 0.5, (i * 11) % 17] for i in range(25)]
+
+def brute_distances(tree, other):
+	values, other_values = np.asarray(tree.collect(), dtype=float), np.asarray(other.collect(), dtype=float)
+	return np.linalg.norm(values[:,None] - other_values[None], axis=-1)
+
+@pytest.mark.parametrize("d", [0, 1, 2.5, 6, 100])
+def test_query_tree(d):
+	tree, other = KDTree.initialize(POINTS), KDTree.initialize(OTHER)
+	offsets, indices, distances = tree.query_tree(other, d, return_distance=True)
+	dists = brute_distances(tree, other)
+	assert offsets.shape == (tree.nodes + 1,)
+	for i in range(tree.nodes):
+		row = indices[offsets[i]:offsets[i+1]]
+		assert list(row) == list(np.nonzero(dists[i] <= d)[0])
+		assert np.allclose(distances[offsets[i]:offsets[i+1]], dists[i, row])
+
+def test_query_tree_self():
+	tree = KDTree.initialize(POINTS)
+	offsets, indices = tree.query_tree(tree, 5)
+	dists = brute_distances(tree, tree)
+	np.fill_diagonal(dists, np.inf)
+	for i in range(tree.nodes):
+		assert list(indices[offsets[i]:offsets[i+1]]) == list(np.nonzero(dists[i] <= 5)[0])
+
+@pytest.mark.parametrize("n", [1, 5, 40])
+def test_closest_pairs(n):
+	tree, other = KDTree.initialize(POINTS), KDTree.initialize(OTHER)
+	rows, cols, distances = tree.closest_pairs(other, n=n)
+	dists = brute_distances(tree, other)
+	assert len(rows) == n
+	assert np.allclose(distances, np.sort(dists, axis=None)[:n])
+	assert np.allclose(dists[rows, cols], distances)
+
+def test_closest_pairs_self():
+	tree = KDTree.initialize(POINTS)
+	rows, cols, distances = tree.closest_pairs(tree, n=10)
+	dists = brute_distances(tree, tree)
+	assert np.all(rows < cols)
+	assert np.allclose(distances, np.sort(dists[np.triu_indices(tree.nodes, 1)])[:10])
+
+def test_closest_pairs_all():
+	tree, other = KDTree.initialize(POINTS[:3]), KDTree.initialize(OTHER[:2])
+	rows, cols, distances = tree.closest_pairs(other, n=10)
+	assert len(rows) == 6
+
+@pytest.mark.parametrize("other", [
+	KDTree.initialize([[0, 0, 0]]),
+	KDTree.initialize([KDSubType(2, 0)], accept=KDSubType),
+	[[0, 0]],
+])
+def test_join_error(other):
+	tree = KDTree.initialize(POINTS)
+	with pytest.raises(ValueError):
+		tree.query_tree(other, 1)
+	with pytest.raises(ValueError):
+		tree.closest_pairs(other)
+
+def test_join_parameter_error():
+	tree = KDTree.initialize(POINTS)
+	with pytest.raises(ValueError):
+		tree.query_tree(tree, -1)
+	with pytest.raises(ValueError):
+		tree.closest_pairs(tree, n=0)
@@ -0,0 +1,124 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+
+def check_labels(tree):
+	bits = tree.config.label_bit(tree.label)
+	for child in (tree.right, tree.left):
+		if child:
+			bits |= check_labels(child)
+	assert tree.label_bits == bits
+	return bits
+
+def nodes(tree):
+	stack = [tree]
+	while stack:
+		node = stack.pop()
+		yield node
+		stack += [child for child in (node.left, node.right) if child]
+
+def nearest(points, labels, q, allowed, n):
+	keep = np.isin(labels, list(allowed))
+	dists = np.sort(np.linalg.norm(points[keep] - q, axis=-1))
+	return dists[:n]
+
+def test_KNN_labels():
+	rng = np.random.RandomState(0)
+	points = rng.rand(300, 3)
+	labels = rng.randint(4, size=300)
+	tree = KDTree.initialize(points, labels=labels)
+	check_labels(tree)
+	for q in rng.rand(10, 3):
+		nn = tree.nearest_neighbor(q, n=3, labels={1, 2})
+		assert all(tree.search(p).label in (1, 2) for p in nn[:,0])
+		assert np.allclose(nn[:,1].astype(float), nearest(points, labels, q, {1, 2}, 3))
+
+def test_dPN_labels():
+	rng = np.random.RandomState(1)
+	points = rng.rand(300, 2)
+	labels = np.where(rng.rand(300) < 0.5, 'a', 'b')
+	tree = KDTree.initialize(points, labels=labels)
+	q = rng.rand(2)
+	pn = tree.proximal_neighbor(q, d=0.2, labels=['b'])
+	expected = nearest(points, labels, q, {'b'}, len(points))
+	assert np.allclose(pn[:,1].astype(float), expected[expected <= 0.2])
+
+def test_d0PN_labels():
+	tree = KDTree.initialize([[1],[2],[3]], labels=['a', 'b', 'a'])
+	assert tree.proximal_neighbor([2], labels=['b'])[0][0] is tree.search([2])
+	assert tree.proximal_neighbor([1], labels=['b']) == []
+
+def test_labels_skip(monkeypatch):
+	rng = np.random.RandomState(2)
+	points = rng.rand(1000, 2) * [100, 1]
+	labels = np.where(points[:,0] < 50, 'a', 'b')
+	tree = KDTree.initialize(points, labels=labels)
+	mask = labels == 'b'
+	count = [0]
+	nearest_neighbor = KDTree._nearest_neighbor
+	def counted(self, *args):
+		count[0] += 1
+		return nearest_neighbor(self, *args)
+	monkeypatch.setattr(KDTree, '_nearest_neighbor', counted)
+	queries = rng.rand(10, 2) * [50, 1]
+	visits = {}
+	for name, kwargs in (('mask', {'mask': mask}), ('labels', {'labels': ['b']})):
+		count[0] = 0
+		for q in queries:
+			nn = tree.nearest_neighbor(q, n=2, **kwargs)
+			assert np.allclose(nn[:,1].astype(float), nearest(points, labels, q, {'b'}, 2))
+		visits[name] = count[0]
+	assert visits['labels'] < visits['mask'] / 2
+	assert tree.nearest_neighbor([0, 0], labels=['c'])[0][0] is None
+
+def test_labels_modify():
+	rng = np.random.RandomState(3)
+	points = rng.rand(200, 2)
+	tree = KDTree.initialize(points, labels=[int(p[0] > 0.5) for p in points])
+	for p in rng.rand(50, 2):
+		tree = tree.insert(p, label=2)
+	for p in points[:50]:
+		tree = tree.delete(p)
+	for p, new in zip(points[50:100], rng.rand(50, 2)):
+		tree = tree.update(p, new)
+		assert tree.search(new).label == int(p[0] > 0.5)
+	check_labels(tree)
+	for p in points[100:]:
+		assert tree.search(p).label == int(p[0] > 0.5)
+	nn = tree.nearest_neighbor([0.5, 0.5], n=50, labels=[2])
+	assert len([p for p in nn[:,0] if p is not None]) == 50
+
+def test_labels_deferred():
+	tree = KDTree.initialize([[i] for i in range(20)], labels=[i % 3 for i in range(20)])
+	with tree.deferred_balance():
+		for i in range(20, 60):
+			tree.insert([i], label=i % 3)
+	check_labels(tree)
+	assert all(node.label == node.value[0] % 3 for node in nodes(tree))
+
+def test_labels_n_jobs():
+	rng = np.random.RandomState(4)
+	points = rng.rand(500, 2)
+	labels = rng.randint(5, size=500)
+	tree = KDTree.initialize(points, labels=labels, n_jobs=2)
+	check_labels(tree)
+	for node in nodes(tree):
+		assert node.label == labels[np.flatnonzero((points == node.value).all(axis=1))[0]]
+
+def test_labels_duplicates():
+	tree = KDTree.initialize([[1],[2],[1]], labels=['a', 'b', 'c'])
+	assert tree.nodes == 2
+	assert tree.search([1]).label == 'a'
+
+def test_labels_mismatch():
+	with pytest.raises(ValueError):
+		KDTree.initialize([[1],[2]], labels=['a'])
+
+def test_labels_not_kept():
+	tree = KDTree.initialize([[1],[2]])
+	assert tree.label_bits is None
+	with pytest.raises(ValueError):
+		tree.insert([3], label='a')
+	with pytest.raises(ValueError):
+		tree.nearest_neighbor([0], labels=['a'])
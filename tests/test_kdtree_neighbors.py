@@ -49,3 +49,121 @@ def test_dPN_mismatch():
 	tree = KDTree.initialize([[1],[2]])
 	with pytest.raises(ValueError):
 		assert tree.proximal_neighbor([0,0])
+
+def test_1NN_dtype():
+	tree = KDTree.initialize([[1,1],[5,5],[6,5]], dtype=np.float16)
+	nn = tree.nearest_neighbor([4,5])
+	assert np.all(nn[0][0] == np.asarray([5,5]))
+	assert nn[0][1] == 1
+	assert nn[0][1].dtype == np.float32
+
+def test_incremental():
+	points = [[4,1],[2,7],[5,3],[7,0],[1,9],[9,2],[3,3],[8,8],[6,5],[0,4]]
+	tree = KDTree.initialize(points)
+	dists = [dist for _, dist in tree.incremental_neighbor([5,5])]
+	exp = sorted(np.linalg.norm(np.asarray(points) - [5,5], axis=-1))
+	assert np.allclose(dists, exp)
+
+def test_incremental_lazy():
+	tree = KDTree.initialize([[1],[5],[6],[9]])
+	neighbors = tree.incremental_neighbor([4])
+	assert np.all(next(neighbors)[0] == [5])
+	point, dist = next(neighbors)
+	assert np.all(point == [6]) and dist == 2
+
+def test_incremental_accept():
+	tree = KDTree.initialize([KDSubType(1,1), KDSubType(1,2), KDSubType(1,4)], accept=KDSubType)
+	neighbors = list(tree.incremental_neighbor(KDSubType(1,4)))
+	assert [n[0] for n in neighbors] == [KDSubType(1,4), KDSubType(1,2), KDSubType(1,1)]
+	assert [n[1] for n in neighbors] == [0, 2, 3]
+
+def test_incremental_mismatch():
+	tree = KDTree.initialize([[1],[2]])
+	with pytest.raises(ValueError):
+		tree.incremental_neighbor([0,0])
+
+def test_2NN_predicate():
+	tree = KDTree.initialize([[1],[2],[3],[4],[5],[6]])
+	nn = tree.nearest_neighbor([3], n=2, predicate=lambda p: p[0] % 2 == 0)
+	assert [nn[i][0][0] for i in range(len(nn))] == [2, 4]
+	assert [nn[i][1] for i in range(len(nn))] == [1, 1]
+
+def test_2NN_mask():
+	points = [[1],[2],[3],[4],[5],[6]]
+	tree = KDTree.initialize(points)
+	mask = [p[0] > 3 for p in points]
+	nn = tree.nearest_neighbor([3], n=2, mask=mask)
+	assert [nn[i][0][0] for i in range(len(nn))] == [4, 5]
+
+def test_KNN_mask_mismatch():
+	tree = KDTree.initialize([[1],[2]])
+	with pytest.raises(ValueError):
+		tree.nearest_neighbor([0], mask=[True])
+
+def test_dPN_predicate():
+	tree = KDTree.initialize([[1],[2],[3],[4],[5],[6]])
+	pn = tree.proximal_neighbor([3], d=2, predicate=lambda p: p[0] != 2)
+	assert [pn[i][0][0] for i in range(len(pn))] == [4, 1, 5]
+
+def test_dPN_mask():
+	points = [[1],[2],[3],[4],[5],[6]]
+	tree = KDTree.initialize(points)
+	mask = [p[0] < 3 for p in points]
+	pn = tree.proximal_neighbor([3], d=2, mask=mask)
+	assert [pn[i][0][0] for i in range(len(pn))] == [2, 1]
+
+def test_d0PN_mask():
+	points = [[1],[2],[3]]
+	tree = KDTree.initialize(points)
+	mask = [p[0] != 1 for p in points]
+	assert tree.proximal_neighbor([2], mask=mask)[0][0] is tree.search([2])
+	assert tree.proximal_neighbor([1], mask=mask) == []
+
+def test_KNN_split_visits():
+	rng = np.random.RandomState(0)
+	scale = [100, 1, 1, 1]
+	points = rng.rand(400, 4) * scale
+	queries = rng.rand(10, 4) * scale
+	visits = {}
+	for split in KDTree.SPLITS:
+		tree = KDTree.initialize(points, split=split)
+		count = [0]
+		def predicate(p):
+			count[0] += 1
+			return True
+		for q in queries:
+			nn = tree.nearest_neighbor(q, predicate=predicate)
+			assert np.isclose(nn[0][1], np.min(np.linalg.norm(points - q, axis=-1)))
+		visits[split] = count[0]
+	assert visits['max_spread'] < visits['round_robin'] / 2
+	assert visits['sliding_midpoint'] < visits['round_robin'] / 2
+
+def test_KNN_mask_ids():
+	points = [[1],[2],[3]]
+	tree = KDTree.initialize(points)
+	mask = [p[0] != 2 for p in points]
+	tree = tree.delete([1])
+	# Points keep their IDs, so the mask still excludes [2].
+	assert tree.nearest_neighbor([2], mask=mask)[0][0] == [3]
+	tree = tree.insert([4])
+	assert tree.search([4]).point_id == 3 and tree.next_id == 4
+	with pytest.raises(ValueError):
+		tree.nearest_neighbor([2], mask=mask)
+	mask.append(False)
+	tree = tree.update([3], [2.5])
+	assert tree.nearest_neighbor([2], mask=mask)[0][0] == [2.5]
+	assert tree.nearest_neighbor([5], mask=mask)[0][0] == [2.5]
+
+@pytest.mark.parametrize("n_jobs, background", [(None, None), (2, None), (None, 8)])
+def test_point_ids_rebuilt(n_jobs, background):
+	rng = np.random.RandomState(5)
+	points = rng.rand(200, 2)
+	tree = KDTree.initialize(points[:100], n_jobs=n_jobs, max_quality=1.1, background=background)
+	for point in points[100:][np.argsort(points[100:,0])]:
+		tree = tree.insert(point)
+	tree.wait_rebuilds()
+	tree = tree.insert(points[0])
+	order = np.concatenate([np.arange(100), 100 + np.argsort(points[100:,0])])
+	for point_id, i in enumerate(order):
+		assert tree.search(points[i]).point_id == point_id
+	assert tree.next_id == 201
@@ -0,0 +1,148 @@
+import pytest
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from kdtrees import KDTree
+
+def check_stats(tree):
+	if tree is None:
+		return 0, 0, 0
+	ln, lh, lp = check_stats(tree.left)
+	rn, rh, rp = check_stats(tree.right)
+	assert tree.nodes == ln + rn + 1
+	assert tree.height == max(lh, rh) + 1
+	assert tree.path_length == lp + rp + ln + rn
+	return tree.nodes, tree.height, tree.path_length
+
+@pytest.fixture
+def block():
+	events = []
+	def block(tree):
+		event = threading.Event()
+		tree.config.executor = ThreadPoolExecutor(max_workers=1)
+		tree.config.executor.submit(event.wait)
+		events.append(event)
+		return event
+	yield block
+	for event in events:
+		event.set()
+
+def degrade(tree, points):
+	for i in range(20, 40):
+		tree = tree.insert([i, i])
+		points.append((i, i))
+		if id(tree) in tree.config.pending:
+			return tree
+	raise AssertionError("Rebuild of the root was not scheduled")
+
+def test_stats_balanced():
+	tree = KDTree.initialize([[i] for i in range(7)])
+	assert tree.height == 3
+	assert tree.path_length == 10
+	assert tree.quality == 1
+
+def test_stats_chain():
+	tree = KDTree.initialize([[0]])
+	with tree.deferred_balance():
+		for i in range(1, 5):
+			tree.insert([i])
+		assert tree.height == 5
+		assert tree.path_length == 10
+		assert tree.quality == pytest.approx(15 / 11)
+
+def test_stats_modify():
+	rng = np.random.RandomState(0)
+	points = rng.randint(0, 100, size=(200, 2))
+	tree = KDTree.initialize(points[:50])
+	for point in points[50:150]:
+		tree = tree.insert(point)
+	for point in points[:80]:
+		tree = tree.delete(point)
+	for point, new_point in zip(points[80:100], points[150:]):
+		tree = tree.update(point, new_point)
+	check_stats(tree)
+
+def test_max_quality():
+	points = [[0, 0, 0], [1, 1, 1], [2, 2, 2]]
+	tree = KDTree.initialize(points[:1])
+	for point in points[1:]:
+		tree = tree.insert(point)
+	assert tree.height == 3
+	tree = KDTree.initialize(points[:1], max_quality=1.1)
+	for point in points[1:]:
+		tree = tree.insert(point)
+	assert tree.height == 2
+
+@pytest.mark.parametrize("max_quality, background", [
+	(0.5, None), (None, 8), (1.5, 0), (1.5, 2.5),
+])
+def test_initialize_error(max_quality, background):
+	with pytest.raises(ValueError):
+		KDTree.initialize([[1, 2], [3, 4]], max_quality=max_quality, background=background)
+
+@pytest.mark.parametrize("index", [False, True])
+def test_background(index):
+	rng = np.random.RandomState(1)
+	base = rng.rand(200, 2)
+	stream = np.c_[np.linspace(0.5, 0.6, 200), rng.rand(200)]
+	tree = KDTree.initialize(base, index=index, max_quality=1.05, background=32)
+	for point in stream:
+		tree = tree.insert(point)
+	tree = tree.wait_rebuilds()
+	assert not tree.config.pending
+	assert tree.config.executor is not None
+	assert sorted(map(tuple, tree.collect())) == sorted(map(tuple, np.r_[base, stream]))
+	check_stats(tree)
+	if index:
+		assert len(tree.config.index) == 400
+		for point in stream:
+			assert tree.config.index[tree.search(point).value.tobytes()].config is tree.config
+
+def test_background_replay(block):
+	tree = KDTree.initialize([[i, i] for i in range(16)], max_quality=1.0, background=4)
+	event = block(tree)
+	points = [(i, i) for i in range(16)]
+	tree = degrade(tree, points)
+	log = len(tree.config.pending[id(tree)].log)
+	tree = tree.insert([50, 50])
+	tree = tree.insert([51, 51])
+	tree = tree.delete([3, 3])
+	tree = tree.delete([50, 50])
+	assert len(tree.config.pending[id(tree)].log) == log + 4
+	event.set()
+	root = tree
+	tree = tree.wait_rebuilds()
+	assert tree is not root
+	assert not tree.config.pending
+	expected = sorted([p for p in points if p != (3, 3)] + [(51, 51)])
+	assert sorted(map(tuple, tree.collect())) == expected
+	check_stats(tree)
+
+def test_background_swap(block):
+	tree = KDTree.initialize([[i, i] for i in range(16)], max_quality=1.0, background=4)
+	event = block(tree)
+	points = [(i, i) for i in range(16)]
+	tree = degrade(tree, points)
+	rebuild = tree.config.pending[id(tree)]
+	event.set()
+	rebuild.future.result()
+	root = tree
+	tree = tree.insert([50, 50])
+	assert tree is not root
+	assert id(root) not in tree.config.pending
+	assert sorted(map(tuple, tree.collect())) == sorted(points + [(50, 50)])
+
+def test_background_stale(block):
+	tree = KDTree.initialize([[i, i] for i in range(16)], max_quality=1.0, background=4)
+	event = block(tree)
+	tree = degrade(tree, [])
+	rebuild = tree.config.pending[id(tree)]
+	tree = tree.update([5, 5], [50, 50])
+	assert rebuild.stale
+	event.set()
+	root = tree
+	tree = tree.wait_rebuilds()
+	assert tree is root
+	assert tree.search([50, 50]) is not None
+	assert tree.search([5, 5]) is None
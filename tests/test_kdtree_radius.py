@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+from .test_fixtures import KDSubType
+
+POINTS = [[i, (i * 7) % 20] for i in range(40)]
+QUERIES = [[0, 0], [10, 5], [20.5, 10], [39, 13], [100, 100]]
+
+def brute_distances(tree, queries):
+	values = np.asarray(tree.collect(), dtype=float)
+	return np.linalg.norm(np.asarray(queries, dtype=float)[:,None] - values[None], axis=-1)
+
+@pytest.mark.parametrize("d", [0, 1, 3.5, 8, 1000])
+def test_query_radius(d):
+	tree = KDTree.initialize(POINTS)
+	offsets, indices = tree.query_radius(QUERIES, d)
+	dists = brute_distances(tree, QUERIES)
+	assert offsets.shape == (len(QUERIES) + 1,)
+	for i in range(len(QUERIES)):
+		assert list(indices[offsets[i]:offsets[i+1]]) == list(np.nonzero(dists[i] <= d)[0])
+
+def test_query_radius_per_query():
+	tree = KDTree.initialize(POINTS)
+	d = [0, 2, 5, 9, 150]
+	offsets, indices = tree.query_radius(QUERIES, d)
+	dists = brute_distances(tree, QUERIES)
+	for i in range(len(QUERIES)):
+		assert list(indices[offsets[i]:offsets[i+1]]) == list(np.nonzero(dists[i] <= d[i])[0])
+
+def test_query_radius_sorted():
+	tree = KDTree.initialize(POINTS)
+	offsets, indices, distances = tree.query_radius(QUERIES, 8, return_distance=True, sort_results=True)
+	dists = brute_distances(tree, QUERIES)
+	for i in range(len(QUERIES)):
+		row = slice(offsets[i], offsets[i+1])
+		assert np.all(np.diff(distances[row]) >= 0)
+		assert np.allclose(distances[row], dists[i, indices[row]])
+		assert sorted(indices[row]) == list(np.nonzero(dists[i] <= 8)[0])
+
+def test_query_radius_values():
+	tree = KDTree.initialize(POINTS)
+	offsets, indices = tree.query_radius([[10, 5]], 3)
+	exp = [tuple(p) for p in POINTS if np.linalg.norm(np.subtract(p, [10, 5])) <= 3]
+	assert sorted(map(tuple, tree.to_array()[indices])) == sorted(exp)
+
+@pytest.mark.parametrize("points, d", [
+	([[0, 0, 0]], 1),
+	([0, 0], 1),
+	(QUERIES, -1),
+	(QUERIES, [1, 2]),
+])
+def test_query_radius_error(points, d):
+	tree = KDTree.initialize(POINTS)
+	with pytest.raises(ValueError):
+		tree.query_radius(points, d)
+
+def test_query_radius_accept():
+	tree = KDTree.initialize([KDSubType(1, 0)], accept=KDSubType)
+	with pytest.raises(ValueError):
+		tree.query_radius([[0]], 1)
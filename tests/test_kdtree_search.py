@@ -40,3 +40,12 @@ def test_search_mismatch_accept():
 		tree.search(KDSubType(2,0))
 	with pytest.raises(AttributeError):
 		tree.search(0)
+
+@pytest.mark.parametrize("index", [False, True])
+def test_search_dtype_int(index):
+	tree = KDTree.initialize([[1,2],[3,4],[5,6]], dtype=np.int32, index=index)
+	assert tree.search([1.5,2.7]) is None
+	assert [1.9,2.2] not in tree
+	assert tree.search([1.0,2.0]).value.tolist() == [1,2]
+	assert [2**32 + 1, 2] not in tree
+	assert tree.proximal_neighbor([3.9,4.1]) == []
@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+
+from kdtrees import KDTree
+from .test_fixtures import KDSubType
+
+def test_update_in_place():
+	tree = KDTree.initialize([[1],[2],[3],[4],[5],[6],[7]])
+	node = tree.search([7])
+	tree = tree.update([7], [8])
+	assert tree.search([8]) is node
+	assert tree.search([7]) is None
+	assert tree.nodes == 7
+
+def test_update_reroute():
+	points = [[i, (i * 7) % 20] for i in range(20)]
+	tree = KDTree.initialize(points)
+	tree = tree.update([3, 1], [17, 30])
+	assert tree.nodes == 20
+	assert tree.search([3, 1]) is None
+	assert tree.search([17, 30]) is not None
+	for p in points:
+		if p != [3, 1]:
+			assert tree.search(p) is not None
+
+def test_update_internal():
+	tree = KDTree.initialize([[1],[2],[3],[4],[5],[6],[7]])
+	tree = tree.update([4], [0])
+	assert tree.nodes == 7
+	assert tree.search([4]) is None
+	for p in [[0],[1],[2],[3],[5],[6],[7]]:
+		assert tree.search(p) is not None
+
+def test_update_missing():
+	tree = KDTree.initialize([[1],[2],[3]])
+	assert tree.update([4], [5]) is tree
+	assert tree.search([5]) is None
+
+def test_update_existing():
+	tree = KDTree.initialize([[1],[2],[3]])
+	tree = tree.update([1], [3])
+	assert tree.nodes == 2
+	assert tree.search([1]) is None
+
+def test_update_accept():
+	tree = KDTree.initialize([KDSubType(1,1), KDSubType(1,2), KDSubType(1,4)], accept=KDSubType)
+	tree = tree.update(KDSubType(1,4), KDSubType(1,0))
+	assert tree.search(KDSubType(1,0)) is not None
+	assert tree.search(KDSubType(1,4)) is None
+	assert tree.nodes == 3
+
+def test_update_mismatch():
+	tree = KDTree.initialize([[1],[2]])
+	with pytest.raises(ValueError):
+		tree.update([1], [0,0])
+
+def test_update_dtype_int():
+	tree = KDTree.initialize([[1,1],[5,5],[9,9]], dtype=np.int16)
+	tree = tree.update([5.6,5.2], [7,7])
+	assert tree.search([5,5]) is not None
+	assert tree.search([7,7]) is None
+	tree = tree.update([5,5], [7.0,7.0])
+	assert tree.search([7,7]).value.dtype == np.int16
+	with pytest.raises(ValueError):
+		tree.update([7,7], [7.5,7.5])
+	with pytest.raises(ValueError):
+		tree.update([7,7], [70000,0])
+	assert tree.search([7,7]) is not None
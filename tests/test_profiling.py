@@ -0,0 +1,109 @@
+import pytest
+import json
+import numpy as np
+import threading
+
+from kdtrees import KDTree, Tracer, _utils as utils
+
+def test_restore():
+	insert, initialize, distance = KDTree.insert, KDTree.__dict__['initialize'], utils.distance
+	with Tracer():
+		assert KDTree.insert is not insert
+		assert utils.distance is not distance
+		tree = KDTree.initialize([[1, 2], [3, 4]])
+	assert KDTree.insert is insert
+	assert KDTree.__dict__['initialize'] is initialize
+	assert utils.distance is distance
+	assert tree.insert([5, 6]).nodes == 3
+
+def test_restore_error():
+	insert = KDTree.insert
+	with pytest.raises(ValueError):
+		with Tracer():
+			KDTree.initialize([[1, 2], [3, 4]]).insert([1, 2, 3])
+	assert KDTree.insert is insert
+
+def test_nested_error():
+	with Tracer():
+		with pytest.raises(ValueError):
+			with Tracer():
+				pass
+
+def test_operations_error():
+	with pytest.raises(ValueError):
+		Tracer(operations=['insert', 'missing'])
+
+def test_summary():
+	rng = np.random.RandomState(0)
+	with Tracer() as tracer:
+		tree = KDTree.initialize(rng.rand(50, 2))
+		for point in rng.rand(20, 2):
+			tree = tree.insert(point)
+		tree.nearest_neighbor([0.5, 0.5], n=3)
+	summary = tracer.summary()
+	assert summary['initialize']['count'] == 1
+	assert summary['insert']['count'] == 20
+	assert summary['insert']['phases']['check_dimensionality']['count'] == 20
+	assert summary['nearest_neighbor']['phases']['distance']['count'] > 0
+	for stats in summary.values():
+		if stats['count'] > 0:
+			assert np.isclose(stats['time'], sum(p['time'] for p in stats['phases'].values()))
+
+def test_summary_candidates():
+	rng = np.random.RandomState(1)
+	tree = KDTree.initialize(rng.rand(100, 2))
+	with Tracer() as tracer:
+		tree.nearest_neighbor([0.5, 0.5], n=5)
+		tree.proximal_neighbor([0.5, 0.5], d=0.2)
+	summary = tracer.summary()
+	assert summary['nearest_neighbor']['phases']['candidates']['count'] >= 5
+	assert summary['proximal_neighbor']['phases']['candidates']['count'] > 0
+	assert KDTree._insert_candidate(np.asarray([]), 1, 0.5).tolist() == [[1, 0.5]]
+
+def test_summary_nested():
+	with Tracer() as tracer:
+		tree = KDTree.initialize([[i, i] for i in range(4)])
+		for i in range(4, 12):
+			tree = tree.insert([i, i])
+	summary = tracer.summary()
+	assert summary['insert']['phases']['balance']['count'] == summary['balance']['count']
+	assert summary['balance']['phases']['rebuild']['count'] > 0
+
+def test_operations():
+	with Tracer(operations=['search']) as tracer:
+		tree = KDTree.initialize([[1, 2], [3, 4]])
+		tree.search([3, 4])
+	assert 'initialize' not in tracer.summary()
+	assert tracer.summary()['search']['count'] == 1
+
+def test_other_threads():
+	tree = KDTree.initialize([[1, 2], [3, 4]])
+	with Tracer() as tracer:
+		thread = threading.Thread(target=tree.search, args=([3, 4],))
+		thread.start()
+		thread.join()
+		tree.search([1, 2])
+	assert tracer.summary()['search']['count'] == 1
+	assert {event[4] for event in tracer.events} == {threading.get_ident()}
+
+def test_histogram():
+	with Tracer() as tracer:
+		tree = KDTree.initialize([[1, 2], [3, 4]])
+		for _ in range(5):
+			tree.search([3, 4])
+	counts, edges = tracer.histogram('search', bins=3)
+	assert counts.sum() == 5
+	assert len(edges) == 4
+
+def test_chrome_trace(tmp_path):
+	with Tracer() as tracer:
+		KDTree.initialize([[1, 2], [3, 4]]).search([1, 2])
+	path = tmp_path / 'trace.json'
+	trace = tracer.to_chrome_trace(str(path))
+	with open(path) as f:
+		assert json.load(f) == trace
+	names = [event['name'] for event in trace['traceEvents']]
+	assert 'initialize' in names and 'search' in names
+	for event in trace['traceEvents']:
+		assert event['ph'] == 'X'
+		assert event['dur'] >= 0
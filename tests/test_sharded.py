@@ -0,0 +1,190 @@
+import threading
+import pytest
+import numpy as np
+
+from kdtrees import KDTree, ShardedKDTree, _utils as utils
+from .test_fixtures import KDHashType
+
+def brute_nearest(points, point, n):
+	dists = np.linalg.norm(points - point, axis=-1)
+	return np.sort(dists)[:n]
+
+@pytest.mark.parametrize("partition", ['spatial', 'hash'])
+@pytest.mark.parametrize("n_shards", [1, 3, 4])
+def test_initialize(partition, n_shards):
+	points = np.random.RandomState(0).rand(50, 2)
+	tree = ShardedKDTree.initialize(points, n_shards=n_shards, partition=partition)
+	assert len(tree.shards) == n_shards
+	assert tree.k == 2
+	assert tree.nodes == 50
+	assert sorted(map(tuple, tree.collect())) == sorted(map(tuple, points))
+
+def test_initialize_spatial_split():
+	points = [[i, 0] for i in range(8)]
+	tree = ShardedKDTree.initialize(points, n_shards=4)
+	assert tree.routing == (0, 4, (0, 2, 0, 1), (0, 6, 2, 3))
+	for i, shard in enumerate(tree.shards):
+		assert sorted(v[0] for v in shard.collect()) == [2*i, 2*i+1]
+
+def test_initialize_spatial_ties():
+	points = [[0, 0], [1, 0], [1, 1], [1, 2], [1, 3], [2, 0]]
+	tree = ShardedKDTree.initialize(points, n_shards=2)
+	axis, threshold, _, _ = tree.routing
+	for value in tree.shards[0].collect():
+		assert value[axis] < threshold
+	for value in tree.shards[1].collect():
+		assert value[axis] >= threshold
+
+@pytest.mark.parametrize("n_shards, partition", [
+	(0, 'spatial'), (-1, 'hash'), (2.5, 'spatial'), (2, 'random'),
+])
+def test_initialize_error(n_shards, partition):
+	with pytest.raises(ValueError):
+		ShardedKDTree.initialize([[1, 2], [3, 4]], n_shards=n_shards, partition=partition)
+
+@pytest.mark.parametrize("partition", ['spatial', 'hash'])
+def test_insert_delete_search(partition):
+	tree = ShardedKDTree.initialize([[0, 0], [5, 5], [9, 9]], n_shards=4, partition=partition)
+	tree.insert([3, 7])
+	assert tree.nodes == 4
+	assert tree.search([3, 7]).value.tolist() == [3, 7]
+	tree.delete([5, 5])
+	assert tree.nodes == 3
+	assert tree.search([5, 5]) is None
+	assert tree.search([2, 2]) is None
+
+@pytest.mark.parametrize("partition", ['spatial', 'hash'])
+def test_dtype_int(partition):
+	tree = ShardedKDTree.initialize([[1, 2], [3, 4], [5, 6]], n_shards=2, partition=partition,
+				dtype=np.int32)
+	assert tree.search([1.5, 2.7]) is None
+	tree.delete([3.9, 4.1])
+	assert tree.nodes == 3
+	tree.insert([7.0, 8.0])
+	assert tree.search([7, 8]) is not None
+	neighbors = tree.nearest_neighbor([1.5, 2.0])
+	assert neighbors[0,1] == pytest.approx(0.5)
+	with pytest.raises(ValueError):
+		tree.insert([7.5, 8.0])
+	with pytest.raises(ValueError):
+		ShardedKDTree.initialize([[1.5, 2], [3, 4]], dtype=np.int32, partition=partition)
+
+def test_insert_empty_shard():
+	tree = ShardedKDTree.initialize([[0, 0], [1, 1]], n_shards=4)
+	assert tree.shards.count(None) == 2
+	tree.delete([0, 0])
+	assert tree.shards.count(None) == 3
+	tree.insert([0, 0])
+	assert tree.nodes == 2
+	assert tree.search([0, 0]) is not None
+
+def test_insert_error():
+	tree = ShardedKDTree.initialize([[1, 2], [3, 4]])
+	with pytest.raises(ValueError):
+		tree.insert([1, 2, 3])
+
+@pytest.mark.parametrize("partition", ['spatial', 'hash'])
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_nearest_neighbor(partition, n_jobs, monkeypatch):
+	# Query on threads as on free-threaded builds of Python.
+	monkeypatch.setattr(utils, 'gil_enabled', lambda: False)
+	rng = np.random.RandomState(1)
+	points = rng.rand(200, 3)
+	tree = ShardedKDTree.initialize(points, n_shards=5, partition=partition, n_jobs=n_jobs)
+	for point in rng.rand(20, 3):
+		neighbors = tree.nearest_neighbor(point, n=4)
+		assert neighbors.shape == (4, 2)
+		assert np.allclose(neighbors[:,1].astype(float), brute_nearest(points, point, 4))
+	tree.close()
+
+def test_n_jobs_gil(monkeypatch):
+	monkeypatch.setattr(utils, 'gil_enabled', lambda: True)
+	with pytest.warns(RuntimeWarning):
+		tree = ShardedKDTree.initialize(np.random.RandomState(0).rand(50, 2), n_shards=2, n_jobs=2)
+	assert tree._executor is None
+	assert tree.nodes == 50
+
+def test_query_during_modification(monkeypatch):
+	tree = ShardedKDTree.initialize(np.random.RandomState(4).rand(50, 2), n_shards=1)
+	point = tree.collect()[0]
+	results, blocked = [], []
+	recalculate = KDTree._recalculate_nodes
+	def query_meanwhile(node):
+		# Query from another thread while the shard is modified in place.
+		if not blocked:
+			query = threading.Thread(target=lambda: results.append(tree.nearest_neighbor(point)))
+			query.start()
+			query.join(0.2)
+			blocked.append(query)
+			blocked.append(query.is_alive())
+		recalculate(node)
+	monkeypatch.setattr(KDTree, '_recalculate_nodes', query_meanwhile)
+	tree.insert([2, 2])
+	blocked[0].join()
+	assert blocked[1]
+	assert np.all(results[0][0,0] == point)
+
+def test_query_during_rebuild(monkeypatch):
+	tree = ShardedKDTree.initialize(np.random.RandomState(5).rand(50, 2), n_shards=1)
+	point = tree.collect()[0]
+	results = []
+	rebuild = KDTree._rebuild
+	def query_meanwhile(node, split=None):
+		# Queries continue on the previous shard during the rebuild.
+		query = threading.Thread(target=lambda: results.append(tree.search(point)))
+		query.start()
+		query.join(5)
+		assert not query.is_alive()
+		return rebuild(node, split)
+	monkeypatch.setattr(KDTree, '_rebuild', query_meanwhile)
+	shard = tree.shards[0]
+	tree.rebuild(0)
+	assert results[0] is shard.search(point)
+
+def test_nearest_neighbor_pad():
+	tree = ShardedKDTree.initialize([[1, 2], [3, 4]], n_shards=2)
+	neighbors = tree.nearest_neighbor([0, 0], n=3)
+	assert neighbors[2,0] is None
+	assert neighbors[2,1] == np.inf
+
+@pytest.mark.parametrize("partition", ['spatial', 'hash'])
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_proximal_neighbor(partition, n_jobs, monkeypatch):
+	# Query on threads as on free-threaded builds of Python.
+	monkeypatch.setattr(utils, 'gil_enabled', lambda: False)
+	rng = np.random.RandomState(2)
+	points = rng.rand(200, 2)
+	tree = ShardedKDTree.initialize(points, n_shards=4, partition=partition, n_jobs=n_jobs)
+	single = KDTree.initialize(points)
+	for point in rng.rand(20, 2):
+		neighbors = tree.proximal_neighbor(point, d=0.2)
+		expected = single.proximal_neighbor(point, d=0.2)
+		assert len(neighbors) == len(expected)
+		assert np.allclose(neighbors[:,1].astype(float), np.asarray(expected)[:,1].astype(float))
+	tree.close()
+
+def test_proximal_neighbor_exact():
+	tree = ShardedKDTree.initialize([[1, 2], [3, 4], [5, 6]], n_shards=2)
+	neighbors = tree.proximal_neighbor([3, 4])
+	assert neighbors[0][0].value.tolist() == [3, 4]
+	assert tree.proximal_neighbor([2, 2]) == []
+
+def test_rebuild():
+	tree = ShardedKDTree.initialize(np.random.RandomState(3).rand(40, 2), n_shards=2)
+	for i in range(20):
+		tree.insert([2 + i, 2 + i])
+	before = sorted(map(tuple, tree.collect()))
+	shard = tree.shards[1]
+	tree.rebuild(1)
+	assert tree.shards[1] is not shard
+	assert tree.shards[1].nodes == shard.nodes
+	assert sorted(map(tuple, tree.collect())) == before
+
+def test_accept():
+	points = [KDHashType(1, a) for a in [1, 4, 6, 9, 12]]
+	for partition in ['spatial', 'hash']:
+		tree = ShardedKDTree.initialize(points, n_shards=2, partition=partition, accept=KDHashType)
+		assert tree.nodes == 5
+		assert tree.search(points[2]) is not None
+		neighbors = tree.nearest_neighbor(KDHashType(1, 5), n=2)
+		assert sorted(neighbors[:,1]) == [1, 1]
@@ -45,3 +45,15 @@ def test_check_dimensionality_no_shape():
 def test_check_dimensionality_mismatch_accept():
 	with pytest.raises(ValueError):
 		utils.check_dimensionality(KDSubType(1,1), KDSubType(2,1), accept=KDSubType)
+
+def test_coordinates():
+	coords = utils.coordinates([1,2], 2)
+	assert coords.dtype == np.float64
+	assert np.all(coords == [1,2])
+
+def test_coordinates_accept():
+	assert np.all(utils.coordinates(KDSubType(3,2), 3, accept=KDSubType) == [2,2,2])
+
+def test_coordinates_accept_error():
+	with pytest.raises(ValueError):
+		utils.coordinates(KDSubType(1,'a'), 1, accept=KDSubType)
@@ -20,3 +20,21 @@ def test_distance_accept():
 def test_distance_accept_mismatch():
 	with pytest.raises(ValueError):
 		utils.distance(KDSubType(1,1), 0, accept=KDSubType)
+
+@pytest.mark.parametrize("dtype,dtype_exp", [
+	(np.float16, np.float32),
+	(np.float32, np.float32),
+	(np.float64, np.float64),
+	(np.int64, np.float64),
+])
+
+def test_distance_dtype(dtype, dtype_exp):
+	dist = utils.distance(np.asarray([3,4], dtype=dtype), np.asarray([0,0], dtype=dtype), dtype=dtype)
+	assert dist == 5
+	assert dist.dtype == dtype_exp
+
+def test_box_distances():
+	near, far = utils.box_distances(np.array([0, 0]), np.array([1, 1]), np.array([4, 5]), np.array([4, 6]))
+	assert np.isclose(near, 5) and np.isclose(far, np.sqrt(16 + 36))
+	near, far = utils.box_distances(np.array([0, 0]), np.array([2, 2]), np.array([1, 1]), np.array([1, 1]))
+	assert near == 0 and np.isclose(far, np.sqrt(2))
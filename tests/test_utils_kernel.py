@@ -0,0 +1,30 @@
+import pytest
+import numpy as np
+
+from kdtrees import _utils as utils
+
+@pytest.mark.parametrize("kernel", utils.KERNELS)
+def test_kernel_peak(kernel):
+	assert utils.kernel(0, 2, kernel) == 1
+
+@pytest.mark.parametrize("kernel", utils.KERNELS)
+def test_kernel_nonincreasing(kernel):
+	values = utils.kernel(np.linspace(0, 5, 51), 1.5, kernel)
+	assert np.all(np.diff(values) <= 0)
+
+@pytest.mark.parametrize("kernel", ['tophat', 'epanechnikov', 'linear'])
+def test_kernel_support(kernel):
+	assert utils.kernel(2, 2, kernel) == 0
+
+@pytest.mark.parametrize("kernel", utils.KERNELS)
+def test_kernel_norm_1D(kernel):
+	step = 1e-3
+	grid = np.arange(-20, 20, step) + step / 2
+	values = utils.kernel(np.abs(grid), 0.7, kernel) * utils.kernel_norm(1, 0.7, kernel)
+	assert np.isclose(values.sum() * step, 1, atol=1e-4)
+
+def test_kernel_error():
+	with pytest.raises(ValueError):
+		utils.kernel(1, 1, 'cosine')
+	with pytest.raises(ValueError):
+		utils.kernel_norm(1, 1, 'cosine')
@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+from kdtrees import _utils as utils
+
+@pytest.mark.parametrize("n_jobs,n_jobs_exp", [
+	(None, 1),
+	(1, 1),
+	(4, 4),
+	(-1, os.cpu_count()),
+])
+
+def test_effective_n_jobs(n_jobs, n_jobs_exp):
+	assert utils.effective_n_jobs(n_jobs) == n_jobs_exp
+
+def test_effective_n_jobs_error():
+	with pytest.raises(ValueError):
+		utils.effective_n_jobs(0)
+	with pytest.raises(ValueError):
+		utils.effective_n_jobs(1.5)
+
+def test_gil_enabled():
+	assert utils.gil_enabled() is getattr(sys, '_is_gil_enabled', lambda: True)()
@@ -0,0 +1,25 @@
+import pytest
+import numpy as np
+
+from kdtrees import _utils as utils
+from .test_fixtures import KDHashType
+
+def test_point_key():
+	assert utils.point_key([1, 2]) == utils.point_key(np.asarray([1.0, 2.0]))
+	assert utils.point_key([1, 2]) != utils.point_key([2, 1])
+
+def test_point_key_negative_zero():
+	assert utils.point_key([-0.0]) == utils.point_key([0.0])
+
+def test_point_key_accept():
+	assert utils.point_key(KDHashType(1,1), accept=KDHashType) == KDHashType(1,1)
+
+def test_storage_point():
+	assert utils.storage_point([1.5, 2.0], np.int32) is None
+	assert utils.storage_point([300], np.int8) is None
+	assert utils.storage_point([-1], np.uint8) is None
+	assert utils.storage_point([1.0, 2.0], np.int32).dtype == np.int32
+	assert utils.storage_point([0.1], np.float32).dtype == np.float32
+	assert utils.storage_point([0.1]).dtype == np.float64
+	assert utils.storage_point([70000.0], np.float16) is None
+	assert np.isinf(utils.storage_point([np.inf], np.float16)[0])
@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+
+from kdtrees import VPTree
+from .test_fixtures import KDSubType
+
+POINTS = [[4,1],[2,7],[5,3],[7,0],[1,9],[9,2],[3,3],[8,8],[6,5],[0,4]]
+
+def test_init():
+	tree = VPTree([0,0], k=2)
+	assert tree.value == [0,0]
+	assert tree.k == 2
+	assert tree.mu == 0
+	assert tree.inside is None
+	assert tree.outside is None
+	assert tree.nodes == 1
+
+def test_initialize():
+	tree = VPTree.initialize(POINTS)
+	assert tree.nodes == len(POINTS)
+	assert np.all(tree.value == POINTS[0])
+	assert sorted(map(tuple, tree.collect())) == sorted(map(tuple, POINTS))
+
+def test_visualize(capsys):
+	tree = VPTree.initialize([[0],[1],[3]])
+	tree.visualize()
+	captured = capsys.readouterr()
+	assert captured.out == "[0], mu: 2.0, nodes: 3\n" + \
+						"\t[3], mu: 0.0, nodes: 1\n" + \
+						"\t\tNone\n" + "\t\tNone\n" + \
+						"\t[1], mu: 0.0, nodes: 1\n" + \
+						"\t\tNone\n" + "\t\tNone\n"
+
+def test_initialize_error():
+	with pytest.raises(ValueError):
+		class BadType:
+			pass
+		VPTree.initialize([[0],[1]], accept=BadType)
+
+def test_search():
+	tree = VPTree.initialize(POINTS)
+	for p in POINTS:
+		assert np.all(tree.search(p).value == p)
+	assert tree.search([5,5]) is None
+
+def test_search_random():
+	rng = np.random.RandomState(0)
+	for _ in range(5):
+		points = rng.rand(501, 37)
+		tree = VPTree.initialize(points)
+		for p in points:
+			assert tree.search(p) is not None
+			assert len(tree.proximal_neighbor(p)) == 1
+
+def test_initialize_duplicates():
+	tree = VPTree.initialize(np.zeros((1500, 2)))
+	assert tree.nodes == 1
+	points = np.repeat(np.random.RandomState(1).rand(50, 3), 30, axis=0)
+	tree = VPTree.initialize(points)
+	assert tree.nodes == 50
+	assert all(tree.search(p) is not None for p in points)
+
+def test_KNN():
+	tree = VPTree.initialize(POINTS)
+	nn = tree.nearest_neighbor([5,5], n=3)
+	exp = sorted(np.linalg.norm(np.asarray(POINTS) - [5,5], axis=-1))[:3]
+	assert np.allclose(list(nn[:,1]), exp)
+	assert np.all(nn[0][0] == [6,5])
+
+def test_KNN_accept():
+	points = [KDSubType(1,1), KDSubType(1,2), KDSubType(1,4), KDSubType(1,8)]
+	tree = VPTree.initialize(points, accept=KDSubType)
+	nn = tree.nearest_neighbor(KDSubType(1,3), n=2)
+	assert [nn[i][1] for i in range(2)] == [1, 1]
+	assert nn[0][0] == KDSubType(1,2)
+	assert nn[1][0] == KDSubType(1,4)
+
+def test_KNN_mismatch():
+	tree = VPTree.initialize([[1],[2]])
+	with pytest.raises(ValueError):
+		tree.nearest_neighbor([0,0])
+
+def test_dPN():
+	tree = VPTree.initialize(POINTS)
+	pn = tree.proximal_neighbor([5,5], d=2.5)
+	assert [tuple(p) for p in pn[:,0]] == [(6,5), (5,3)]
+	assert np.allclose(list(pn[:,1]), [1, 2])
+
+def test_d0PN():
+	tree = VPTree.initialize(POINTS)
+	assert tree.proximal_neighbor([6,5])[0][0] is tree.search([6,5])
+	assert tree.proximal_neighbor([5,5]) == []
+
+def test_KNN_random():
+	rng = np.random.RandomState(0)
+	points = rng.rand(200, 8)
+	tree = VPTree.initialize(points)
+	for query in rng.rand(5, 8):
+		nn = tree.nearest_neighbor(query, n=5)
+		exp = np.sort(np.linalg.norm(points - query, axis=-1))[:5]
+		assert np.allclose(list(nn[:,1]), exp)
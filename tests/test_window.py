@@ -0,0 +1,136 @@
+import pytest
+import numpy as np
+
+from kdtrees import WindowedKDTree
+from .test_fixtures import KDHashType
+
+def test_init():
+	tree = WindowedKDTree(10)
+	assert tree.window == 10
+	assert tree.slice_width == 10 / 8
+	assert tree.k is None
+	assert len(tree.slices) == 0
+	assert tree.nodes == 0
+
+@pytest.mark.parametrize("window, slice_width", [
+	(0, None), (-1, None), (10, 0), (10, -2),
+])
+def test_init_error(window, slice_width):
+	with pytest.raises(ValueError):
+		WindowedKDTree(window, slice_width=slice_width)
+
+def test_insert():
+	tree = WindowedKDTree(10, slice_width=2)
+	for t in range(6):
+		tree.insert([t, t], t)
+	assert tree.k == 2
+	assert tree.nodes == 6
+	assert [s[0] for s in tree.slices] == [0, 2, 4]
+	assert sorted(map(tuple, tree.collect())) == [(t, t) for t in range(6)]
+
+def test_insert_out_of_order():
+	tree = WindowedKDTree(10, slice_width=2)
+	tree.insert([5, 5], 5)
+	tree.insert([1, 1], 1)
+	tree.insert([3, 3], 3)
+	assert [s[0] for s in tree.slices] == [0, 2, 4]
+
+def test_insert_error():
+	tree = WindowedKDTree(10)
+	tree.insert([0, 0], 0)
+	with pytest.raises(ValueError):
+		tree.insert([0, 0, 0], 1)
+
+def test_insert_existing():
+	tree = WindowedKDTree(10, slice_width=2)
+	tree.insert([0, 0], 0)
+	tree.insert([1, 1], 1)
+	tree.insert([0, 0], 5)
+	assert tree.nodes == 2
+	assert [s[0] for s in tree.slices] == [0, 4]
+	tree.expire(12)
+	assert len(tree.collect()) == 1
+	assert np.all(tree.collect()[0] == [0, 0])
+
+def test_insert_expired():
+	tree = WindowedKDTree(10, slice_width=2)
+	tree.insert([0, 0], 20)
+	tree.insert([1, 1], 5)
+	assert tree.nodes == 1
+
+def test_expire():
+	tree = WindowedKDTree(10, slice_width=2)
+	for t in range(20):
+		tree.insert([t], t)
+	assert tree.slices[0][0] == 8
+	assert tree.expire(21) == 1
+	assert tree.slices[0][0] == 10
+	assert tree.expire(21) == 0
+	assert tree.expire(100) == 5
+	assert tree.nodes == 0
+
+def test_expire_partial_slice():
+	tree = WindowedKDTree(10, slice_width=4)
+	for t in range(12):
+		tree.insert([t], t)
+	tree.expire(13)
+	assert tree.nodes == 12
+	assert sorted(v[0] for v in tree.collect()) == list(range(4, 12))
+	assert tree.search([3]) is None
+	assert tree.search([4]) is not None
+
+def test_search():
+	tree = WindowedKDTree(10, slice_width=2)
+	for t in range(6):
+		tree.insert([t, 2*t], t)
+	for t in range(6):
+		assert np.all(tree.search([t, 2*t]).value == [t, 2*t])
+	assert tree.search([1, 1]) is None
+
+def test_search_dtype_int():
+	tree = WindowedKDTree(10, dtype=np.int32)
+	tree.insert([1, 2], 0)
+	assert tree.search([1.5, 2.7]) is None
+	assert tree.search([1.0, 2.0]) is not None
+	with pytest.raises(ValueError):
+		tree.insert([1.5, 2.0], 1)
+	assert tree.nodes == 1
+
+def test_KNN():
+	tree = WindowedKDTree(10, slice_width=2)
+	for t in range(30):
+		tree.insert([t, (t * 7) % 20], t)
+	live = np.asarray([[t, (t * 7) % 20] for t in range(21, 30)])
+	nn = tree.nearest_neighbor([25, 5], n=3)
+	exp = sorted(np.linalg.norm(live - [25, 5], axis=-1))[:3]
+	assert np.allclose(list(nn[:,1]), exp)
+	assert all(v[0] > 20 for v in nn[:,0])
+
+def test_KNN_padded():
+	tree = WindowedKDTree(10, slice_width=2)
+	tree.insert([0, 0], 0)
+	tree.insert([1, 1], 3)
+	nn = tree.nearest_neighbor([0, 0], n=3)
+	assert np.all(nn[0,0] == [0, 0])
+	assert nn[2,0] is None and nn[2,1] == np.inf
+
+def test_proximal():
+	tree = WindowedKDTree(10, slice_width=2)
+	for t in range(30):
+		tree.insert([t, (t * 7) % 20], t)
+	live = np.asarray([[t, (t * 7) % 20] for t in range(21, 30)])
+	pn = tree.proximal_neighbor([25, 5], d=6)
+	dists = np.linalg.norm(live - [25, 5], axis=-1)
+	exp = sorted(dists[(dists <= 6) & (dists > 0)])
+	assert np.allclose(list(pn[:,1]), exp)
+	assert len(tree.proximal_neighbor([27, 9], d=0)) == 1
+	assert len(tree.proximal_neighbor([0, 0], d=0)) == 0
+
+def test_accept():
+	tree = WindowedKDTree(10, slice_width=2, accept=KDHashType)
+	for t in range(6):
+		tree.insert(KDHashType(1, t), t)
+	tree.insert(KDHashType(1, 1), 7)
+	assert tree.nodes == 6
+	tree.expire(13)
+	assert sorted(v.a for v in tree.collect()) == [1, 4, 5]